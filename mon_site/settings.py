@@ -88,6 +88,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Attendre le verrou d'écriture au lieu d'échouer avec "database
+            # is locked" sous forte concurrence. Transactions en mode DEFERRED
+            # par défaut : celles qui écrivent commencent par leur écriture
+            # (Inscription.save : UPDATE conditionnel de la place), un SQLite
+            # ne pouvant pas faire attendre la promotion d'un verrou de lecture
+            'timeout': 20,
+        },
+        'TEST': {
+            # Base de test sur fichier : les tests de concurrence ouvrent
+            # une connexion par thread
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -146,4 +159,24 @@ AUTH_USER_MODEL = 'tutorat.User'
 # URLs de redirection pour l'authentification
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'login'
-LOGOUT_REDIRECT_URL = 'login'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'login'
+
+# Cache partagé par tous les processus : les compteurs de notifications y
+# sont invalidés par signaux, ce qu'un cache en mémoire locale ne ferait que
+# dans le processus de l'écriture (tutorat.notifications ne met alors rien
+# en cache). Table à créer avec : python manage.py createcachetable
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'tutorat_cache',
+    }
+}
+
+# Durée de vie (secondes) des compteurs de notifications en cache
+# (tutorat.notifications), invalidés par signaux entre-temps
+NOTIFICATIONS_CACHE_DUREE = 300
+
+# Diffuseur des événements temps réel (tutorat.diffusion) : en mémoire, limité
+# à un processus ; remplacer par une classe adossée à un bus partagé (Redis...)
+# quand plusieurs workers ASGI servent les flux
+DIFFUSEUR = 'tutorat.diffusion.DiffuseurMemoire'
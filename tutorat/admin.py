@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import User, Matiere, Seance, Inscription, Sujet, Reponse, BannissementTuteur
+from . import recherche
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -56,7 +57,8 @@ class InscriptionAdmin(admin.ModelAdmin):
 class SujetAdmin(admin.ModelAdmin):
     list_display = ['titre', 'matiere', 'auteur', 'nombre_reponses', 'est_resolu', 'date_creation']
     list_filter = ['matiere', 'est_resolu', 'date_creation']
-    search_fields = ['titre', 'contenu', 'auteur__username']
+    # Titre et contenu sont cherchés dans l'index plein texte (get_search_results)
+    search_fields = ['auteur__username']
     date_hierarchy = 'date_creation'
     
     fieldsets = (
@@ -67,6 +69,13 @@ class SujetAdmin(admin.ModelAdmin):
             'fields': ('est_resolu',)
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        resultats, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            # Sur le queryset reçu : les filtres de la liste restent appliqués
+            resultats |= queryset.filter(recherche.condition(search_term, 'sujet'))
+        return resultats, may_have_duplicates
 
 @admin.register(Reponse)
 class ReponseAdmin(admin.ModelAdmin):
@@ -1,52 +1,26 @@
-from django.utils import timezone
-from datetime import timedelta
-from .models import Message, Sujet, Reponse
+from functools import cache
+
+from django.utils.functional import lazy
+
+from .notifications import compteurs
 
 def notifications(request):
     """
-    Context processor pour afficher les notifications dans toute l'application
+    Context processor pour afficher les notifications dans toute l'application.
+
+    Les valeurs sont paresseuses : le cache (ou la base) n'est consulté que si
+    le gabarit lit effectivement un compteur, une seule fois par rendu.
     """
-    notifications_data = {
-        'nb_messages_non_lus': 0,
-        'nb_nouveaux_sujets': 0,
-    }
-    
-    if request.user.is_authenticated:
-        # Compter les messages non lus
-        notifications_data['nb_messages_non_lus'] = Message.objects.filter(
-            conversation__participants=request.user,
-            is_read=False
-        ).exclude(sender=request.user).count()
-        
-        # Compter les nouveaux sujets + nouvelles réponses sur MES sujets
-        nb_nouveaux_sujets = 0
-        nb_nouvelles_reponses = 0
-        
-        if request.user.derniere_visite_forum:
-            # Nouveaux sujets depuis la dernière visite
-            nb_nouveaux_sujets = Sujet.objects.filter(
-                date_creation__gt=request.user.derniere_visite_forum
-            ).exclude(auteur=request.user).count()
-            
-            # Nouvelles réponses sur MES sujets depuis la dernière visite
-            nb_nouvelles_reponses = Reponse.objects.filter(
-                sujet__auteur=request.user,  # Sur MES sujets
-                date_creation__gt=request.user.derniere_visite_forum
-            ).exclude(auteur=request.user).count()  # Pas mes propres réponses
-        else:
-            # Première visite, compter tous les sujets récents (24h)
-            il_y_a_24h = timezone.now() - timedelta(days=1)
-            nb_nouveaux_sujets = Sujet.objects.filter(
-                date_creation__gte=il_y_a_24h
-            ).exclude(auteur=request.user).count()
-            
-            # Réponses récentes sur mes sujets (24h)
-            nb_nouvelles_reponses = Reponse.objects.filter(
-                sujet__auteur=request.user,
-                date_creation__gte=il_y_a_24h
-            ).exclude(auteur=request.user).count()
-        
-        # Total des notifications forum = nouveaux sujets + nouvelles réponses sur mes sujets
-        notifications_data['nb_nouveaux_sujets'] = nb_nouveaux_sujets + nb_nouvelles_reponses
+    @cache
+    def _compteurs():
+        # Compteurs en cache par utilisateur, invalidés par les signaux
+        # (voir tutorat.notifications). Forum : sujets jamais lus + réponses
+        # non lues sur MES sujets
+        if not request.user.is_authenticated:
+            return 0, 0
+        return compteurs(request.user)
     
-    return notifications_data
\ No newline at end of file
+    return {
+        'nb_messages_non_lus': lazy(lambda: _compteurs()[0], int)(),
+        'nb_nouveaux_sujets': lazy(lambda: _compteurs()[1], int)(),
+    }
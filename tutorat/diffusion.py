@@ -0,0 +1,158 @@
+"""
+Diffusion d'événements temps réel (publication / abonnement) vers les flux
+ouverts (Server-Sent Events, voir views.flux_notifications et
+views.flux_conversation).
+
+La publication est synchrone (signaux, vues) ; l'abonnement est asynchrone
+et ne coûte qu'une file asyncio par connexion, sans thread ni connexion à la
+base : un worker ASGI tient ainsi des milliers de flux inactifs.
+
+Le diffuseur est choisi par le réglage DIFFUSEUR (chemin d'une classe
+implémentant Diffuseur). DiffuseurMemoire ne relie que les connexions d'un
+même processus ; un déploiement à plusieurs workers fournit une classe
+adossée à un bus partagé (Redis pub/sub, PostgreSQL LISTEN/NOTIFY...).
+"""
+import asyncio
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Canal reçu par tous les utilisateurs connectés
+CANAL_FORUM = 'forum'
+
+# Événements en attente par connexion au-delà desquels on resynchronise
+TAILLE_FILE = 100
+
+# Événement demandant au flux de recalculer ses compteurs
+RESYNCHRONISER = {'resync': True}
+
+_diffuseur = None
+_verrou_diffuseur = threading.Lock()
+
+
+def canal_utilisateur(pk):
+    return f'utilisateur:{pk}'
+
+
+def canal_conversation(pk):
+    """Canal des pages ouvertes sur une conversation"""
+    return f'conversation:{pk}'
+
+
+class Diffuseur:
+    """Interface d'un diffuseur"""
+
+    def publier(self, canal, evenement):
+        """Envoie un événement (dict sérialisable en JSON) aux abonnés du canal"""
+        raise NotImplementedError
+
+    def abonner(self, canaux):
+        """
+        Abonne la connexion courante (appelé dans la boucle asyncio) et
+        retourne un objet exposant `await recevoir(delai)` et `fermer()`
+        """
+        raise NotImplementedError
+
+    def desabonner(self, abonnement):
+        """Retire un abonnement de ses canaux (appelé par Abonnement.fermer)"""
+        raise NotImplementedError
+
+
+class Abonnement:
+    """Abonnement d'une connexion : une file bornée dans sa boucle asyncio"""
+
+    def __init__(self, diffuseur, canaux):
+        self.diffuseur = diffuseur
+        self.canaux = canaux
+        self.boucle = asyncio.get_running_loop()
+        self.file = asyncio.Queue(maxsize=TAILLE_FILE)
+
+    def deposer(self, evenement):
+        """Dépose un événement (dans la boucle de l'abonnement)"""
+        if self.file.full():
+            # Client trop lent : les événements en attente sont remplacés par
+            # une resynchronisation complète
+            while not self.file.empty():
+                self.file.get_nowait()
+            evenement = RESYNCHRONISER
+        self.file.put_nowait(evenement)
+
+    async def recevoir(self, delai):
+        """Prochain événement, ou None si rien n'arrive pendant `delai` secondes"""
+        try:
+            return await asyncio.wait_for(self.file.get(), delai)
+        except asyncio.TimeoutError:
+            return None
+
+    def fermer(self):
+        self.diffuseur.desabonner(self)
+
+
+class DiffuseurMemoire(Diffuseur):
+    """Diffuseur en mémoire, limité au processus courant"""
+
+    def __init__(self):
+        self._abonnes = {}
+        self._verrou = threading.Lock()
+
+    def publier(self, canal, evenement):
+        with self._verrou:
+            abonnes = list(self._abonnes.get(canal, ()))
+        for abonnement in abonnes:
+            try:
+                abonnement.boucle.call_soon_threadsafe(abonnement.deposer, evenement)
+            except RuntimeError:
+                # Boucle fermée : connexion terminée sans désabonnement
+                self.desabonner(abonnement)
+
+    def abonner(self, canaux):
+        abonnement = Abonnement(self, canaux)
+        with self._verrou:
+            for canal in canaux:
+                self._abonnes.setdefault(canal, set()).add(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement):
+        with self._verrou:
+            for canal in abonnement.canaux:
+                abonnes = self._abonnes.get(canal)
+                if abonnes is not None:
+                    abonnes.discard(abonnement)
+                    if not abonnes:
+                        del self._abonnes[canal]
+
+    def nombre_abonnes(self, canal):
+        with self._verrou:
+            return len(self._abonnes.get(canal, ()))
+
+
+def get_diffuseur():
+    """Diffuseur du processus, instancié au premier usage d'après DIFFUSEUR"""
+    global _diffuseur
+    if _diffuseur is None:
+        with _verrou_diffuseur:
+            if _diffuseur is None:
+                classe = getattr(settings, 'DIFFUSEUR', 'tutorat.diffusion.DiffuseurMemoire')
+                _diffuseur = import_string(classe)()
+    return _diffuseur
+
+
+def diffuser(canal, evenement):
+    """Publie l'événement après validation de la transaction en cours"""
+    def publier():
+        try:
+            get_diffuseur().publier(canal, evenement)
+        except Exception:
+            logger.exception("Échec de la diffusion sur le canal %s", canal)
+    transaction.on_commit(publier)
+
+
+def resynchroniser(*pks):
+    """Demande aux flux des utilisateurs donnés de recalculer leurs compteurs"""
+    for pk in pks:
+        diffuser(canal_utilisateur(pk), RESYNCHRONISER)
@@ -1,10 +1,14 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from .models import Seance, Matiere, Sujet, Reponse, User
+from . import recherche
 from django.contrib.auth.forms import SetPasswordForm, PasswordChangeForm
-from datetime import date, timedelta, time
+from datetime import date, datetime, timedelta, time
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
 
 
@@ -14,6 +18,24 @@ class SeanceForm(forms.ModelForm):
     """
     Formulaire de création/modification de séance
     """
+    REPETITION_CHOICES = (
+        ('', 'Aucune (séance unique)'),
+        ('hebdomadaire', 'Chaque semaine'),
+        ('bihebdomadaire', 'Toutes les deux semaines'),
+    )
+    
+    # Création d'une série (uniquement à la création)
+    repetition = forms.ChoiceField(
+        choices=REPETITION_CHOICES,
+        required=False,
+        label='Répétition',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    date_fin_repetition = forms.DateField(
+        required=False,
+        label="Répéter jusqu'au",
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d')
+    )
     
     def __init__(self, *args, **kwargs):
         self.tuteur = kwargs.pop('tuteur', None)
@@ -78,12 +100,20 @@ class SeanceForm(forms.ModelForm):
                 self.initial['heure_debut'] = self.instance.heure_debut.strftime('%H:%M')
             if self.instance.heure_fin:
                 self.initial['heure_fin'] = self.instance.heure_fin.strftime('%H:%M')
+            
+            # Une séance existante ne peut pas devenir une série
+            del self.fields['repetition']
+            del self.fields['date_fin_repetition']
         else:
             # CRÉATION : seulement Planifiée (par défaut)
             self.fields['statut'].choices = [
                 ('planifiee', 'Planifiée'),
             ]
             self.fields['statut'].initial = 'planifiee'
+            self.fields['date_fin_repetition'].widget.attrs.update({
+                'min': today.strftime('%Y-%m-%d'),
+                'max': max_date.strftime('%Y-%m-%d')
+            })
     
     def clean_date(self):
         """
@@ -171,32 +201,145 @@ class SeanceForm(forms.ModelForm):
             if heure_fin <= heure_debut:
                 raise ValidationError("L'heure de fin doit être après l'heure de début.")
         
-        # Validation 2 : pas de chevauchement avec d'autres séances
+        # Validation 2 : série cohérente (mêmes règles que clean_date pour chaque occurrence)
+        if cleaned_data.get('repetition') and date_seance:
+            date_fin_repetition = cleaned_data.get('date_fin_repetition')
+            if not date_fin_repetition:
+                raise ValidationError("Indiquez jusqu'à quelle date répéter la séance.")
+            if date_fin_repetition < date_seance:
+                raise ValidationError("La fin de la répétition doit être après la première séance.")
+            if date_fin_repetition > date.today() + timedelta(days=180):
+                raise ValidationError("La série ne peut pas dépasser 6 mois dans le futur.")
+            if any(jour.weekday() == 6 for jour in self.dates_occurrences()):
+                raise ValidationError("Les séances ne peuvent pas être planifiées le dimanche.")
+        
+        # Validation 3 : pas de chevauchement avec d'autres séances
         if self.tuteur and date_seance and heure_debut and heure_fin:
-            # Récupérer toutes les séances du tuteur pour cette date
-            seances_meme_jour = Seance.objects.filter(
+            dates = self.dates_occurrences()
+            
+            # Une seule requête pour toutes les occurrences. Deux séances se chevauchent si :
+            # - La nouvelle commence avant que l'ancienne ne finisse ET
+            # - La nouvelle finit après que l'ancienne ne commence
+            # (un intervalle sur debut par occurrence : index tuteur/debut)
+            chevauchements = Q()
+            for jour in dates:
+                occurrence = Seance(date=jour, heure_debut=heure_debut, heure_fin=heure_fin)
+                occurrence.calculer_horaires()
+                chevauchements |= Q(debut__lt=occurrence.fin, fin__gt=occurrence.debut)
+            conflits = Seance.objects.filter(
+                chevauchements,
                 tuteur=self.tuteur,
-                date=date_seance,
-                statut__in=['planifiee', 'en_cours']  # Exclure les annulées et terminées
+                statut__in=['planifiee', 'en_cours'],  # Exclure les annulées et terminées
             )
             
             # Si on modifie une séance existante, l'exclure de la vérification
             if self.instance and self.instance.pk:
-                seances_meme_jour = seances_meme_jour.exclude(pk=self.instance.pk)
+                conflits = conflits.exclude(pk=self.instance.pk)
             
-            # Vérifier les chevauchements
-            for seance in seances_meme_jour:
-                # Deux séances se chevauchent si :
-                # - La nouvelle commence avant que l'ancienne ne finisse ET
-                # - La nouvelle finit après que l'ancienne ne commence
-                if (heure_debut < seance.heure_fin and heure_fin > seance.heure_debut):
-                    raise ValidationError(
-                        f"Cette séance chevauche une autre séance déjà planifiée : "
-                        f"'{seance.titre}' de {seance.heure_debut.strftime('%H:%M')} "
-                        f"à {seance.heure_fin.strftime('%H:%M')}."
-                    )
+            seance = conflits.order_by('debut').first()
+            if seance:
+                jour = f" le {seance.date.strftime('%d/%m/%Y')}" if len(dates) > 1 else ""
+                raise ValidationError(
+                    f"Cette séance chevauche une autre séance déjà planifiée{jour} : "
+                    f"'{seance.titre}' de {seance.heure_debut.strftime('%H:%M')} "
+                    f"à {seance.heure_fin.strftime('%H:%M')}."
+                )
         
         return cleaned_data
+    
+    def dates_occurrences(self):
+        """
+        Dates de toutes les occurrences à créer (une seule hors série)
+        """
+        date_seance = self.cleaned_data.get('date')
+        repetition = self.cleaned_data.get('repetition')
+        date_fin_repetition = self.cleaned_data.get('date_fin_repetition')
+        
+        if not date_seance:
+            return []
+        if not repetition or not date_fin_repetition:
+            return [date_seance]
+        
+        pas = timedelta(weeks=2 if repetition == 'bihebdomadaire' else 1)
+        dates = []
+        jour = date_seance
+        while jour <= date_fin_repetition:
+            dates.append(jour)
+            jour += pas
+        return dates
+    
+    def save_serie(self, tuteur):
+        """
+        Crée toutes les occurrences de la série en une transaction (bulk_create)
+        """
+        modele = self.save(commit=False)
+        champs = {nom: getattr(modele, nom) for nom in self.Meta.fields if nom != 'date'}
+        seances = [
+            Seance(tuteur=tuteur, date=jour, **champs)
+            for jour in self.dates_occurrences()
+        ]
+        # bulk_create ne passe pas par save() : debut/fin calculés ici
+        for seance in seances:
+            seance.calculer_horaires()
+        with transaction.atomic():
+            seances = Seance.objects.bulk_create(seances)
+            # bulk_create n'émet pas post_save : indexation explicite
+            recherche.indexer(seances)
+        return seances
+
+
+class FiltreSeancesForm(forms.Form):
+    """
+    Filtres (GET) de la liste des séances disponibles pour un étudiant
+    """
+    matiere = forms.ModelChoiceField(
+        queryset=Matiere.objects.all(),
+        required=False,
+        empty_label='Toutes les matières',
+        label='Matière',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    tuteur = forms.ModelChoiceField(
+        queryset=User.objects.filter(role='tuteur').order_by('first_name', 'last_name', 'username'),
+        required=False,
+        empty_label='Tous les tuteurs',
+        label='Tuteur',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    date_min = forms.DateField(
+        required=False,
+        label='Du',
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d')
+    )
+    date_max = forms.DateField(
+        required=False,
+        label='Au',
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d')
+    )
+    places_libres = forms.BooleanField(
+        required=False,
+        label='Places libres uniquement',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    
+    def filtrer(self, seances):
+        """
+        Applique les filtres valides au queryset (annoté par disponibles_pour)
+        """
+        if not self.is_valid():
+            return seances
+        donnees = self.cleaned_data
+        if donnees['matiere']:
+            seances = seances.filter(matiere=donnees['matiere'])
+        if donnees['tuteur']:
+            seances = seances.filter(tuteur=donnees['tuteur'])
+        if donnees['date_min']:
+            seances = seances.filter(debut__gte=Seance.instant(donnees['date_min']))
+        if donnees['date_max']:
+            seances = seances.filter(debut__lt=Seance.instant(donnees['date_max'] + timedelta(days=1)))
+        if donnees['places_libres']:
+            seances = seances.filter(places_libres__gt=0)
+        return seances
 
 
 # ========== FORMULAIRES FORUM ==========
@@ -240,6 +383,83 @@ class ReponseForm(forms.ModelForm):
         }
 
 
+class FiltreModerationForm(forms.Form):
+    """
+    Filtres (GET) de la file de modération du forum
+    """
+    sans_reponse = forms.BooleanField(
+        required=False,
+        label='Sans réponse uniquement',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    matiere = forms.ModelChoiceField(
+        queryset=Matiere.objects.all(),
+        required=False,
+        empty_label='Toutes les matières',
+        label='Matière',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    auteur = forms.CharField(
+        required=False,
+        label='Auteur',
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': "Nom d'utilisateur"})
+    )
+    date_min = forms.DateField(
+        required=False,
+        label='Du',
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d')
+    )
+    date_max = forms.DateField(
+        required=False,
+        label='Au',
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d')
+    )
+    
+    def filtrer(self, sujets):
+        """
+        Applique les filtres valides au queryset. Les dates sont converties
+        en bornes sur date_creation pour rester sur les index du forum.
+        """
+        if not self.is_valid():
+            return sujets
+        donnees = self.cleaned_data
+        if donnees['sans_reponse']:
+            sujets = sujets.filter(nb_reponses=0)
+        if donnees['matiere']:
+            sujets = sujets.filter(matiere=donnees['matiere'])
+        if donnees['auteur']:
+            sujets = sujets.filter(auteur__username__iexact=donnees['auteur'].strip())
+        if donnees['date_min']:
+            sujets = sujets.filter(date_creation__gte=_debut_journee(donnees['date_min']))
+        if donnees['date_max']:
+            sujets = sujets.filter(date_creation__lt=_debut_journee(donnees['date_max'] + timedelta(days=1)))
+        return sujets
+
+
+def _debut_journee(jour):
+    return timezone.make_aware(datetime.combine(jour, time.min))
+
+
+class ActionModerationForm(forms.Form):
+    """
+    Action groupée sur une sélection de sujets (file de modération)
+    """
+    ACTION_CHOICES = (
+        ('resoudre', 'Marquer comme résolus'),
+        ('deplacer', 'Déplacer vers la matière'),
+        ('supprimer', 'Supprimer'),
+    )
+    
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    sujets = forms.ModelMultipleChoiceField(queryset=Sujet.objects.all())
+    matiere = forms.ModelChoiceField(
+        queryset=Matiere.objects.all(),
+        required=False,
+        empty_label='Annonce générale',
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+
+
 # ========== FORMULAIRE INSCRIPTION ÉTUDIANT ==========
 
 class InscriptionEtudiantForm(UserCreationForm):
@@ -0,0 +1,99 @@
+"""
+Génération de flux iCalendar (RFC 5545) pour les séances de tutorat
+"""
+from datetime import timezone as dt_timezone
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+
+def echapper(texte):
+    """Échappe un texte pour une valeur de propriété iCalendar"""
+    return (
+        (texte or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def plier(ligne):
+    """Plie une ligne de contenu à 75 octets (continuation par une espace)"""
+    octets = ligne.encode('utf-8')
+    if len(octets) <= 75:
+        return ligne + '\r\n'
+
+    morceaux = []
+    courant = ''
+    limite = 75
+    for caractere in ligne:
+        if len((courant + caractere).encode('utf-8')) > limite:
+            morceaux.append(courant)
+            courant = ' '
+            limite = 75
+        courant += caractere
+    morceaux.append(courant)
+    return '\r\n'.join(morceaux) + '\r\n'
+
+
+def format_utc(moment):
+    """Formate un datetime en temps UTC iCalendar (AAAAMMJJTHHMMSSZ)"""
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def evenement(seance, domaine, avec_tuteur=False):
+    """Lignes VEVENT d'une séance"""
+    description = seance.description
+    if avec_tuteur:
+        tuteur = seance.tuteur.get_full_name() or seance.tuteur.username
+        description = f"Tuteur : {tuteur}\n{description}".strip()
+
+    lignes = [
+        'BEGIN:VEVENT',
+        f'UID:seance-{seance.pk}@{domaine}',
+        f'DTSTAMP:{format_utc(seance.date_modification)}',
+        f'LAST-MODIFIED:{format_utc(seance.date_modification)}',
+        f'DTSTART:{format_utc(seance.debut)}',
+        f'DTEND:{format_utc(seance.fin)}',
+        f'SUMMARY:{echapper(seance.titre)}',
+        f'LOCATION:{echapper(seance.lieu)}',
+        f'DESCRIPTION:{echapper(description)}',
+        f'CATEGORIES:{echapper(seance.matiere.nom)}',
+        'STATUS:CANCELLED' if seance.statut == 'annulee' else 'STATUS:CONFIRMED',
+        'END:VEVENT',
+    ]
+    return ''.join(plier(ligne) for ligne in lignes)
+
+
+def generer_calendrier(seances, nom, domaine, avec_tuteur=False, taille_lot=500):
+    """
+    Générateur du flux complet : les séances sont parcourues avec
+    iterator() (curseur côté serveur sous PostgreSQL) et émises au fil de
+    l'eau, sans charger tout l'historique en mémoire
+    """
+    yield (
+        plier('BEGIN:VCALENDAR')
+        + plier('VERSION:2.0')
+        + plier('PRODID:-//Tutorat Paris Nanterre//Séances//FR')
+        + plier('CALSCALE:GREGORIAN')
+        + plier('METHOD:PUBLISH')
+        + plier(f'X-WR-CALNAME:{echapper(nom)}')
+    )
+    for seance in seances.iterator(chunk_size=taille_lot):
+        yield evenement(seance, domaine, avec_tuteur)
+    yield plier('END:VCALENDAR')
+
+
+async def generer_calendrier_async(seances, nom, domaine, avec_tuteur=False, taille_lot=500):
+    """
+    Variante asynchrone pour ASGI, où StreamingHttpResponse consommerait un
+    générateur synchrone d'un bloc (sync_to_async(list)) : le flux
+    synchrone est lu par lots de `taille_lot` séances, chaque lot dans le
+    thread de la requête (celui qui détient le curseur)
+    """
+    morceaux = generer_calendrier(seances, nom, domaine, avec_tuteur, taille_lot)
+    lire_lot = sync_to_async(lambda: ''.join(islice(morceaux, taille_lot)))
+    while lot := await lire_lot():
+        yield lot
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tutorat.models import Seance
+
+
+class Command(BaseCommand):
+    """
+    Met à jour le statut des séances (planifiee -> en_cours -> terminee)
+    en quelques UPDATE ensemblistes.
+
+    À lancer périodiquement (cron, timer systemd...) ou en continu avec --intervalle.
+    """
+    help = "Actualise le statut des séances et des inscriptions associées"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalle',
+            type=int,
+            default=0,
+            help="Relancer l'actualisation toutes les N secondes (0 = une seule passe)",
+        )
+
+    def handle(self, *args, **options):
+        intervalle = options['intervalle']
+
+        while True:
+            resultat = Seance.objects.actualiser_statuts()
+            self.stdout.write(
+                f"{resultat['en_cours']} séance(s) en cours, "
+                f"{resultat['terminee']} terminée(s), "
+                f"{resultat['planifiee']} replanifiée(s), "
+                f"{resultat['inscriptions_annulees']} inscription(s) annulée(s), "
+                f"{resultat['inscriptions_reactivees']} réactivée(s)"
+            )
+
+            if intervalle <= 0:
+                break
+            time.sleep(intervalle)
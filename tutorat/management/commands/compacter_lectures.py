@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tutorat import notifications
+from tutorat.models import LectureSujet
+
+
+class Command(BaseCommand):
+    """
+    Replie les pointeurs de lecture du forum plus anciens que --jours dans le
+    filigrane de chaque utilisateur (User.derniere_visite_forum), pour que la
+    table LectureSujet reste petite. Sans perte : le filigrane s'arrête juste
+    avant le premier sujet ou la première réponse non lus.
+
+    À lancer périodiquement (cron, timer systemd...).
+    """
+    help = "Compacte les pointeurs de lecture du forum (sans marquer de non lu comme lu)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--jours',
+            type=int,
+            default=30,
+            help="Âge (en jours) au-delà duquel les pointeurs sont repliés (défaut : 30)",
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options['jours'])
+        utilisateurs, pointeurs = LectureSujet.compacter(limite)
+        # Les filigranes avancés peuvent changer les compteurs du forum
+        notifications.invalider_forum()
+        self.stdout.write(self.style.SUCCESS(
+            f"{pointeurs} pointeur(s) supprimé(s), {utilisateurs} filigrane(s) avancé(s)."
+        ))
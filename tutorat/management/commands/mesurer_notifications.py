@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+
+from tutorat import notifications, urls
+from tutorat.context_processors import notifications as notifications_paresseuses
+from tutorat.models import User, Seance, Inscription, BannissementTuteur, Sujet, Reponse, Conversation
+
+PROCESSEUR = 'tutorat.context_processors.notifications'
+PROCESSEUR_IMMEDIAT = 'tutorat.management.commands.mesurer_notifications.notifications_immediates'
+
+# Objet utilisé pour les routes à paramètre <int:pk>, selon la vue
+OBJETS = {
+    'modifier_seance': lambda u: Seance.objects.filter(tuteur=u),
+    'supprimer_seance': lambda u: Seance.objects.filter(tuteur=u),
+    'voir_inscrits': lambda u: Seance.objects.filter(tuteur=u),
+    'exclure_etudiant': lambda u: Inscription.objects.filter(seance__tuteur=u),
+    'debannir_etudiant': lambda u: BannissementTuteur.objects.filter(tuteur=u),
+    'debannir_admin': lambda u: BannissementTuteur.objects.all(),
+    'inscrire_seance': lambda u: Seance.objects.filter(statut='planifiee'),
+    'desinscrire_seance': lambda u: Inscription.objects.filter(etudiant=u),
+    'forum_sujet': lambda u: Sujet.objects.all(),
+    'forum_sujet_reponses': lambda u: Sujet.objects.all(),
+    'forum_supprimer_sujet': lambda u: Sujet.objects.filter(auteur=u),
+    'forum_supprimer_reponse': lambda u: Reponse.objects.filter(auteur=u),
+    'messagerie_conversation_detail': lambda u: Conversation.objects.filter(participants=u),
+}
+
+# Routes qui fermeraient la session de mesure
+IGNOREES = {'logout'}
+
+
+def notifications_immediates(request):
+    """Ancien comportement, pour comparaison : compteurs évalués à chaque rendu"""
+    contexte = notifications_paresseuses(request)
+    return {cle: int(valeur) for cle, valeur in contexte.items()}
+
+
+class Command(BaseCommand):
+    """
+    Compare, pour chaque route de tutorat/urls.py, le nombre de requêtes SQL
+    d'un GET avec les compteurs de notifications évalués immédiatement (ancien
+    comportement) et paresseusement, cache des compteurs vide (pire cas).
+
+    Chaque requête est exécutée dans une transaction annulée : la base n'est
+    pas modifiée.
+    """
+    help = "Mesure le coût des notifications par vue (immédiat vs paresseux)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'utilisateurs',
+            nargs='*',
+            help="Noms d'utilisateur à simuler (défaut : un utilisateur par rôle)",
+        )
+
+    def handle(self, *args, **options):
+        if options['utilisateurs']:
+            utilisateurs = list(User.objects.filter(username__in=options['utilisateurs']))
+        else:
+            utilisateurs = [
+                utilisateur
+                for role, _ in User.ROLE_CHOICES
+                for utilisateur in User.objects.filter(role=role).order_by('pk')[:1]
+            ]
+        if not utilisateurs:
+            raise CommandError("Aucun utilisateur à simuler.")
+
+        processeurs = settings.TEMPLATES[0]['OPTIONS']['context_processors']
+        immediats = [PROCESSEUR_IMMEDIAT if p == PROCESSEUR else p for p in processeurs]
+        templates_immediats = [{
+            **settings.TEMPLATES[0],
+            'OPTIONS': {**settings.TEMPLATES[0]['OPTIONS'], 'context_processors': immediats},
+        }]
+
+        total_immediat = total_paresseux = 0
+        for utilisateur in utilisateurs:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\n{utilisateur.username} ({utilisateur.get_role_display()})"
+            ))
+            self.stdout.write(f"{'Route':<40} {'Statut':>6} {'Immédiat':>9} {'Paresseux':>10}")
+            client = Client()
+            client.force_login(utilisateur)
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for nom, url in self._routes(utilisateur):
+                    with override_settings(TEMPLATES=templates_immediats):
+                        statut, immediat = self._mesurer(client, utilisateur, url)
+                    _, paresseux = self._mesurer(client, utilisateur, url)
+                    total_immediat += immediat
+                    total_paresseux += paresseux
+                    ligne = f"{nom:<40} {statut:>6} {immediat:>9} {paresseux:>10}"
+                    self.stdout.write(self.style.SUCCESS(ligne) if paresseux < immediat else ligne)
+            client.logout()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\nTotal : {total_immediat} requête(s) en immédiat, "
+            f"{total_paresseux} en paresseux ({total_immediat - total_paresseux} évitée(s))."
+        ))
+
+    def _routes(self, utilisateur):
+        """(nom, URL) de chaque route de tutorat, paramètres renseignés si possible"""
+        for motif in urls.urlpatterns:
+            if not isinstance(motif, URLPattern) or motif.name in IGNOREES:
+                continue
+            parametres = motif.pattern.converters
+            if not parametres:
+                yield motif.name, reverse(motif.name)
+            elif 'jeton' in parametres:
+                if utilisateur.jeton_calendrier:
+                    yield motif.name, reverse(motif.name, args=[utilisateur.jeton_calendrier])
+            elif motif.name in OBJETS:
+                objet = OBJETS[motif.name](utilisateur).order_by('pk').first()
+                if objet is not None:
+                    yield motif.name, reverse(motif.name, args=[objet.pk])
+
+    def _mesurer(self, client, utilisateur, url):
+        """Statut HTTP et nombre de requêtes d'un GET, cache des compteurs vidé"""
+        notifications.invalider_messages(utilisateur.pk)
+        notifications.invalider_forum(utilisateur)
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as requetes:
+                reponse = client.get(url)
+            transaction.set_rollback(True)
+        # Requêtes de la transaction englobante exclues
+        nombre = sum(
+            1 for requete in requetes.captured_queries
+            if not requete['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK'))
+        )
+        return reponse.status_code, nombre
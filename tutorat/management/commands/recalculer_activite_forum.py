@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from tutorat.models import Sujet
+
+
+class Command(BaseCommand):
+    """
+    Recalcule les champs d'activité dénormalisés des sujets du forum
+    (nombre de réponses, dernière réponse, dernier répondant, dernière
+    activité) en une seule requête.
+    """
+    help = "Recalcule l'activité dénormalisée des sujets du forum"
+
+    def handle(self, *args, **options):
+        nb = Sujet.objects.all().recalculer_activite()
+        self.stdout.write(self.style.SUCCESS(f"{nb} sujet(s) recalculé(s)."))
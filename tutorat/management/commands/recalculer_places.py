@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tutorat.models import Seance
+
+
+class Command(BaseCommand):
+    """
+    Recalcule le compteur dénormalisé Seance.nb_inscrits de toutes les
+    séances en une seule requête agrégée.
+    """
+    help = "Recalcule le nombre d'inscriptions confirmées de chaque séance"
+
+    def handle(self, *args, **options):
+        nb = Seance.objects.all().recalculer_places()
+        self.stdout.write(self.style.SUCCESS(f"{nb} séance(s) recalculée(s)."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from tutorat import recherche
+
+
+class Command(BaseCommand):
+    """
+    Reconstruit l'index plein texte FTS5 (séances, sujets et réponses du
+    forum) à partir des tables, puis l'optimise.
+    """
+    help = "Reconstruit l'index de recherche plein texte"
+
+    def handle(self, *args, **options):
+        if not recherche.index_fts_disponible():
+            self.stdout.write(self.style.WARNING(
+                "Index FTS5 indisponible (moteur autre que SQLite ou migration non appliquée) : "
+                "rien à reconstruire."
+            ))
+            return
+        totaux = recherche.reconstruire()
+        detail = ', '.join(f"{nb} {type}(s)" for type, nb in totaux.items())
+        self.stdout.write(self.style.SUCCESS(f"Index reconstruit : {detail}."))
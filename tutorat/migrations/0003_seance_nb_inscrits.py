@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:04
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def initialiser_nb_inscrits(apps, schema_editor):
+    Seance = apps.get_model('tutorat', 'Seance')
+    Inscription = apps.get_model('tutorat', 'Inscription')
+    confirmees = Inscription.objects.filter(
+        seance=models.OuterRef('pk'),
+        statut='confirmee'
+    ).order_by().values('seance').annotate(total=models.Count('pk')).values('total')
+    Seance.objects.update(nb_inscrits=Coalesce(models.Subquery(confirmees), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0002_user_derniere_visite_forum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seance',
+            name='nb_inscrits',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Inscriptions confirmées'),
+        ),
+        migrations.RunPython(initialiser_nb_inscrits, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0003_seance_nb_inscrits'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='seance',
+            index=models.Index(fields=['tuteur', 'date'], name='seance_tuteur_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seance',
+            index=models.Index(fields=['date', 'heure_debut'], name='seance_date_heure_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0004_seance_indexes_calendrier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='jeton_calendrier',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True, verbose_name="Jeton d'abonnement au calendrier"),
+        ),
+    ]
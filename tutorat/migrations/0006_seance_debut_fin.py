@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:20
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def initialiser_debut_fin(apps, schema_editor):
+    Seance = apps.get_model('tutorat', 'Seance')
+    fuseau = ZoneInfo(settings.TIME_ZONE)
+    seances = list(Seance.objects.only('date', 'heure_debut', 'heure_fin'))
+    for seance in seances:
+        seance.debut = timezone.make_aware(datetime.combine(seance.date, seance.heure_debut), fuseau)
+        seance.fin = timezone.make_aware(datetime.combine(seance.date, seance.heure_fin), fuseau)
+    Seance.objects.bulk_update(seances, ['debut', 'fin'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0005_user_jeton_calendrier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seance',
+            name='debut',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Début'),
+        ),
+        migrations.AddField(
+            model_name='seance',
+            name='fin',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Fin'),
+        ),
+        migrations.RunPython(initialiser_debut_fin, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='seance',
+            name='debut',
+            field=models.DateTimeField(editable=False, verbose_name='Début'),
+        ),
+        migrations.AlterField(
+            model_name='seance',
+            name='fin',
+            field=models.DateTimeField(editable=False, verbose_name='Fin'),
+        ),
+        migrations.AddIndex(
+            model_name='seance',
+            index=models.Index(fields=['tuteur', 'debut'], name='seance_tuteur_debut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seance',
+            index=models.Index(fields=['statut', 'debut'], name='seance_statut_debut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seance',
+            index=models.Index(fields=['statut', 'fin'], name='seance_statut_fin_idx'),
+        ),
+    ]
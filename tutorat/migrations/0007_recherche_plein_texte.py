@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:40
+
+from django.db import migrations, OperationalError
+
+
+def creer_index(apps, schema_editor):
+    """
+    Table FTS5 (SQLite uniquement) et remplissage initial.
+    Sans FTS5 ou sur un autre moteur, la recherche utilise un repli.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE tutorat_recherche USING fts5("
+            "titre, contenu, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    except OperationalError:
+        return
+    schema_editor.execute(
+        "INSERT INTO tutorat_recherche (rowid, titre, contenu) "
+        "SELECT id * 4 + 1, titre, description FROM tutorat_seance"
+    )
+    schema_editor.execute(
+        "INSERT INTO tutorat_recherche (rowid, titre, contenu) "
+        "SELECT id * 4 + 2, titre, contenu FROM tutorat_sujet"
+    )
+    schema_editor.execute(
+        "INSERT INTO tutorat_recherche (rowid, titre, contenu) "
+        "SELECT id * 4 + 3, '', contenu FROM tutorat_reponse"
+    )
+
+
+def supprimer_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS tutorat_recherche")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0006_seance_debut_fin'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_index, supprimer_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0007_recherche_plein_texte'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reponse',
+            index=models.Index(fields=['sujet', 'date_creation'], name='reponse_sujet_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sujet',
+            index=models.Index(fields=['date_creation', 'id'], name='sujet_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sujet',
+            index=models.Index(fields=['matiere', 'date_creation', 'id'], name='sujet_matiere_date_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0008_forum_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LectureSujet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_lecture', models.DateTimeField(verbose_name="Lu jusqu'au")),
+                ('sujet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lectures', to='tutorat.sujet', verbose_name='Sujet')),
+                ('utilisateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lectures_sujets', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Lecture de sujet',
+                'verbose_name_plural': 'Lectures de sujets',
+                'indexes': [models.Index(fields=['date_lecture'], name='lecture_sujet_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('utilisateur', 'sujet'), name='lecture_sujet_unique')],
+            },
+        ),
+    ]
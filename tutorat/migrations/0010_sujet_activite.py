@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def initialiser_activite(apps, schema_editor):
+    Sujet = apps.get_model('tutorat', 'Sujet')
+    Reponse = apps.get_model('tutorat', 'Reponse')
+    reponses = Reponse.objects.filter(sujet=models.OuterRef('pk')).order_by()
+    total = reponses.values('sujet').annotate(n=models.Count('pk')).values('n')
+    derniere = reponses.order_by('-date_creation', '-pk')
+    Sujet.objects.update(
+        nb_reponses=Coalesce(models.Subquery(total), 0),
+        derniere_reponse_date=models.Subquery(derniere.values('date_creation')[:1]),
+        dernier_repondant=models.Subquery(derniere.values('auteur')[:1]),
+        derniere_activite=Coalesce(
+            models.Subquery(derniere.values('date_creation')[:1]),
+            models.F('date_creation')
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0009_lecture_sujet'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sujet',
+            name='dernier_repondant',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Dernier répondant'),
+        ),
+        migrations.AddField(
+            model_name='sujet',
+            name='derniere_activite',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Dernière activité'),
+        ),
+        migrations.AddField(
+            model_name='sujet',
+            name='derniere_reponse_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Dernière réponse'),
+        ),
+        migrations.AddField(
+            model_name='sujet',
+            name='nb_reponses',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Nombre de réponses'),
+        ),
+        migrations.RunPython(initialiser_activite, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='sujet',
+            index=models.Index(fields=['derniere_activite', 'id'], name='sujet_activite_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sujet',
+            index=models.Index(fields=['matiere', 'derniere_activite', 'id'], name='sujet_matiere_activite_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sujet',
+            index=models.Index(fields=['nb_reponses', 'derniere_activite', 'id'], name='sujet_sans_reponse_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:48
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Substr
+
+
+def initialiser_activite(apps, schema_editor):
+    Conversation = apps.get_model('tutorat', 'Conversation')
+    Message = apps.get_model('tutorat', 'Message')
+    dernier = Message.objects.filter(conversation=models.OuterRef('pk')).order_by('-created_at', '-pk')
+    Conversation.objects.update(
+        derniere_activite=Coalesce(
+            models.Subquery(dernier.values('created_at')[:1]),
+            models.F('created_at')
+        ),
+        dernier_apercu=Coalesce(
+            Substr(models.Subquery(dernier.values('content')[:1]), 1, 200),
+            models.Value('')
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0010_sujet_activite'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='derniere_activite',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Dernière activité'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='dernier_apercu',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='Aperçu du dernier message'),
+        ),
+        migrations.RunPython(initialiser_activite, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['derniere_activite', 'id'], name='conversation_activite_idx'),
+        ),
+    ]
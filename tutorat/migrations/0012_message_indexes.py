@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0011_conversation_activite'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'created_at', 'id'], name='message_conv_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['conversation', 'created_at'], name='message_non_lu_idx'),
+        ),
+    ]
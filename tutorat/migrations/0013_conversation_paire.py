@@ -0,0 +1,82 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Substr
+
+
+def fusionner_doublons(apps, schema_editor):
+    """
+    Renseigne la paire canonique des conversations à deux participants et
+    fusionne les doublons dans la plus ancienne conversation de chaque paire
+    """
+    Conversation = apps.get_model('tutorat', 'Conversation')
+    Message = apps.get_model('tutorat', 'Message')
+    Participant = Conversation.participants.through
+
+    membres = {}
+    for conversation_id, user_id in Participant.objects.order_by('user_id').values_list('conversation_id', 'user_id'):
+        membres.setdefault(conversation_id, []).append(user_id)
+
+    conservees = {}
+    doublons = {}
+    for pk in Conversation.objects.order_by('created_at', 'pk').values_list('pk', flat=True):
+        paire = tuple(membres.get(pk, ()))
+        if len(paire) != 2:
+            continue
+        if paire in conservees:
+            doublons[pk] = conservees[paire]
+        else:
+            conservees[paire] = pk
+
+    for doublon, cible in doublons.items():
+        Message.objects.filter(conversation_id=doublon).update(conversation_id=cible)
+    Conversation.objects.filter(pk__in=list(doublons)).delete()
+
+    Conversation.objects.bulk_update(
+        [
+            Conversation(pk=pk, participant_min_id=premier, participant_max_id=second)
+            for (premier, second), pk in conservees.items()
+        ],
+        ['participant_min', 'participant_max'],
+        batch_size=500,
+    )
+
+    # Dernier message des conversations ayant reçu ceux de leurs doublons
+    dernier = Message.objects.filter(conversation=models.OuterRef('pk')).order_by('-created_at', '-pk')
+    Conversation.objects.filter(pk__in=set(doublons.values())).update(
+        derniere_activite=Coalesce(
+            models.Subquery(dernier.values('created_at')[:1]),
+            models.F('created_at')
+        ),
+        dernier_apercu=Coalesce(
+            Substr(models.Subquery(dernier.values('content')[:1]), 1, 200),
+            models.Value('')
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0012_message_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='participant_max',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Second participant'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='participant_min',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Premier participant'),
+        ),
+        migrations.RunPython(fusionner_doublons, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('participant_min', 'participant_max'), name='conversation_paire_unique'),
+        ),
+    ]
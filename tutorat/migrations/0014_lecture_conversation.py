@@ -0,0 +1,86 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def creer_pointeurs(apps, schema_editor):
+    """
+    Un pointeur par participant, d'après les drapeaux is_read : lu jusqu'au
+    message précédant le premier non lu reçu (ou jusqu'au dernier message)
+    """
+    Conversation = apps.get_model('tutorat', 'Conversation')
+    Message = apps.get_model('tutorat', 'Message')
+    LectureConversation = apps.get_model('tutorat', 'LectureConversation')
+    Participant = Conversation.participants.through
+
+    messages = Message.objects.filter(conversation=models.OuterRef('conversation_id')).order_by()
+    non_lus = messages.filter(is_read=False).exclude(sender=models.OuterRef('user_id'))
+    participants = Participant.objects.annotate(
+        nb_non_lus=Coalesce(
+            models.Subquery(non_lus.values('conversation').annotate(n=models.Count('pk')).values('n')),
+            0
+        ),
+        premier_non_lu=models.Subquery(non_lus.values('conversation').annotate(m=models.Min('pk')).values('m')),
+        dernier=models.Subquery(messages.values('conversation').annotate(m=models.Max('pk')).values('m')),
+    )
+    lectures = []
+    for participant in participants.iterator(chunk_size=1000):
+        if participant.premier_non_lu is not None:
+            dernier_lu = participant.premier_non_lu - 1
+        else:
+            dernier_lu = participant.dernier or 0
+        lectures.append(LectureConversation(
+            conversation_id=participant.conversation_id,
+            utilisateur_id=participant.user_id,
+            dernier_lu=dernier_lu,
+            nb_non_lus=participant.nb_non_lus,
+        ))
+    LectureConversation.objects.bulk_create(lectures, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0013_conversation_paire'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LectureConversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dernier_lu', models.PositiveBigIntegerField(default=0, verbose_name='Dernier message lu')),
+                ('nb_non_lus', models.PositiveIntegerField(default=0, verbose_name='Messages non lus')),
+            ],
+            options={
+                'verbose_name': 'Lecture de conversation',
+                'verbose_name_plural': 'Lectures de conversations',
+            },
+        ),
+        migrations.AddField(
+            model_name='lectureconversation',
+            name='conversation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lectures', to='tutorat.conversation', verbose_name='Conversation'),
+        ),
+        migrations.AddField(
+            model_name='lectureconversation',
+            name='utilisateur',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='lectures_conversations', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur'),
+        ),
+        migrations.AddConstraint(
+            model_name='lectureconversation',
+            constraint=models.UniqueConstraint(fields=('utilisateur', 'conversation'), name='lecture_conversation_unique'),
+        ),
+        migrations.RunPython(creer_pointeurs, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='message_non_lu_idx',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:08
+
+import django.db.models.functions.text
+import tutorat.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tutorat', '0014_lecture_conversation'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', tutorat.models.UtilisateurManager()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='user_username_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('first_name'), name='user_prenom_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('last_name'), name='user_nom_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+def creer_table_cache(apps, schema_editor):
+    # Table du DatabaseCache de CACHES (compteurs de notifications partagés
+    # entre les processus) ; sans effet si elle existe ou pour un autre backend
+    call_command('createcachetable', database=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0015_user_recherche'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_table_cache, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorat', '0016_cache_notifications'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='seance',
+            options={'ordering': ['debut'], 'verbose_name': 'Séance', 'verbose_name_plural': 'Séances'},
+        ),
+        migrations.RemoveIndex(
+            model_name='seance',
+            name='seance_tuteur_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='seance',
+            name='seance_date_heure_idx',
+        ),
+        migrations.AddIndex(
+            model_name='seance',
+            index=models.Index(fields=['debut'], name='seance_debut_idx'),
+        ),
+    ]
@@ -1,12 +1,65 @@
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce, Greatest, Lower, RowNumber, Substr
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
+import secrets
 
 # ========== MODÈLE UTILISATEUR ==========
 
+class UserQuerySet(models.QuerySet):
+    """
+    Recherche de destinataires pour la messagerie
+    """
+    # Champs comparés à la recherche, chacun couvert par un index sur LOWER()
+    CHAMPS_RECHERCHE = ('username', 'first_name', 'last_name')
+    
+    def destinataires(self, utilisateur):
+        """
+        Utilisateurs que `utilisateur` peut contacter : les tuteurs pour un
+        étudiant, tout le monde sauf lui-même sinon
+        """
+        if utilisateur.is_etudiant():
+            return self.filter(role='tuteur')
+        return self.exclude(pk=utilisateur.pk)
+    
+    def prefixe(self, recherche):
+        """
+        Utilisateurs dont chaque mot de la recherche commence le nom
+        d'utilisateur, le prénom ou le nom. Le préfixe est un intervalle sur
+        LOWER(champ) plutôt qu'un istartswith : un LIKE insensible à la casse
+        n'utilise pas d'index (ni SQLite ni PostgreSQL), l'intervalle si.
+
+        Sous SQLite, LOWER() ne replie que l'ASCII : la recherche ignore la
+        casse des lettres A-Z mais pas des lettres accentuées (« élodie » ne
+        trouve pas « Élodie »). Le mot est passé au même LOWER() que l'index,
+        les deux côtés restent donc cohérents ; PostgreSQL replie toute la
+        casse selon la collation de la base.
+        """
+        queryset = self.alias(**{
+            f'{champ}_min': Lower(champ) for champ in self.CHAMPS_RECHERCHE
+        })
+        for mot in recherche.split()[:3]:
+            # Minuscules calculées par la base, comme pour les champs
+            debut = Lower(models.Value(mot))
+            fin = Lower(models.Value(mot + '\uffff'))
+            condition = models.Q()
+            for champ in self.CHAMPS_RECHERCHE:
+                condition |= models.Q(**{
+                    f'{champ}_min__gte': debut,
+                    f'{champ}_min__lt': fin,
+                })
+            queryset = queryset.filter(condition)
+        return queryset
+
+
+class UtilisateurManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     """
     Modèle utilisateur personnalisé avec rôles
@@ -46,10 +99,27 @@ class User(AbstractUser):
         blank=True,
         verbose_name='Dernière visite du forum'
     )
+    
+    jeton_calendrier = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Jeton d\'abonnement au calendrier'
+    )
+
+    objects = UtilisateurManager()
 
     class Meta:
         verbose_name = 'Utilisateur'
         verbose_name_plural = 'Utilisateurs'
+        indexes = [
+            # Autocomplétion des destinataires (UserQuerySet.prefixe)
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+            models.Index(Lower('first_name'), name='user_prenom_lower_idx'),
+            models.Index(Lower('last_name'), name='user_nom_lower_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_full_name()} ({self.get_role_display()})"
@@ -62,6 +132,22 @@ class User(AbstractUser):
     
     def is_etudiant(self):
         return self.role == 'etudiant'
+    
+    def get_jeton_calendrier(self):
+        """
+        Retourne le jeton du flux iCalendar, créé à la première demande
+        """
+        if not self.jeton_calendrier:
+            self.jeton_calendrier = secrets.token_urlsafe(32)
+            self.save(update_fields=['jeton_calendrier'])
+        return self.jeton_calendrier
+    
+    def filigrane_forum(self):
+        """
+        Limite en deçà de laquelle tout le forum est lu par l'utilisateur :
+        sa dernière visite enregistrée, ou les dernières 24 h à la première visite
+        """
+        return self.derniere_visite_forum or timezone.now() - timedelta(days=1)
 
 
 # ========== MODÈLE MATIÈRE ==========
@@ -85,6 +171,149 @@ class Matiere(models.Model):
 
 # ========== MODÈLE SÉANCE ==========
 
+class SeanceComplete(Exception):
+    """
+    Levée quand une inscription confirmée dépasserait places_max
+    """
+
+
+class DejaInscrit(Exception):
+    """
+    Levée quand l'étudiant possède déjà une inscription à la séance
+    """
+
+
+class SeanceQuerySet(models.QuerySet):
+    """
+    Requêtes ensemblistes sur les séances
+    """
+
+    def actualiser_statuts(self, maintenant=None):
+        """
+        Fait passer les séances planifiee -> en_cours -> terminee avec quelques
+        UPDATE ensemblistes au lieu d'un save() par séance.
+        Retourne le nombre de lignes modifiées pour chaque transition.
+        """
+        maintenant = maintenant or timezone.now()
+
+        seances = self.exclude(statut='annulee')
+        resultat = {
+            'terminee': seances.filter(fin__lt=maintenant).exclude(statut='terminee').update(
+                statut='terminee', date_modification=maintenant
+            ),
+            'en_cours': seances.filter(debut__lte=maintenant, fin__gte=maintenant).exclude(
+                statut='en_cours'
+            ).update(statut='en_cours', date_modification=maintenant),
+            'planifiee': seances.filter(debut__gt=maintenant, statut='en_cours').update(
+                statut='planifiee', date_modification=maintenant
+            ),
+        }
+
+        # Aligner les inscriptions sur le statut de leur séance
+        # (équivalent ensembliste de Inscription.actualiser_statut_selon_seance)
+        inscriptions = Inscription.objects.filter(seance__in=self)
+        a_annuler = inscriptions.filter(
+            seance__statut='annulee'
+        ).exclude(statut='annulee')
+        a_reactiver = inscriptions.filter(
+            seance__statut__in=['planifiee', 'en_cours'],
+            statut='annulee'
+        )
+        seances_touchees = set(a_annuler.values_list('seance_id', flat=True))
+        seances_touchees |= set(a_reactiver.values_list('seance_id', flat=True))
+
+        with transaction.atomic():
+            resultat['inscriptions_annulees'] = a_annuler.update(statut='annulee')
+            # Réactiver dans la limite des places libres, les plus anciennes
+            # d'abord : les autres restent annulées
+            dans_la_limite = a_reactiver.annotate(
+                rang=models.Window(RowNumber(), partition_by='seance', order_by='pk'),
+            ).filter(rang__lte=models.F('seance__places_max') - models.F('seance__nb_inscrits'))
+            resultat['inscriptions_reactivees'] = Inscription.objects.filter(
+                pk__in=list(dans_la_limite.values_list('pk', flat=True))
+            ).update(statut='confirmee')
+            # Les update() ne passent pas par Inscription.save() : recompter les places
+            if seances_touchees:
+                Seance.objects.filter(pk__in=seances_touchees).recalculer_places()
+
+        return resultat
+
+    def empreinte(self, maintenant=None, **agregats):
+        """
+        Résumé de l'état des séances calculé en une seule requête agrégée.
+        Sert de validateur HTTP (ETag) : il change dès qu'une séance est
+        créée, modifiée, supprimée, change de nombre d'inscrits ou de statut
+        horaire (commencée / terminée). Sa derniere_modification seule ne
+        ferait pas un Last-Modified : les inscriptions ne la font pas avancer
+        et une suppression peut la faire reculer.
+        """
+        maintenant = maintenant or timezone.now()
+
+        return self.order_by().aggregate(
+            nombre=models.Count('pk'),
+            derniere_modification=models.Max('date_modification'),
+            inscrits=models.Sum('nb_inscrits'),
+            commencees=models.Count('pk', filter=models.Q(debut__lte=maintenant)),
+            terminees=models.Count('pk', filter=models.Q(fin__lt=maintenant)),
+            **agregats
+        )
+
+    def avec_statut_reel(self, maintenant=None):
+        """
+        Annote chaque séance avec son statut réel (statut_reel) calculé en SQL
+        à partir de debut/fin : utilisable dans filter() et order_by()
+        """
+        maintenant = maintenant or timezone.now()
+        return self.annotate(
+            statut_reel=models.Case(
+                models.When(statut='annulee', then=models.Value('annulee')),
+                models.When(fin__lt=maintenant, then=models.Value('terminee')),
+                models.When(debut__lte=maintenant, then=models.Value('en_cours')),
+                default=models.Value('planifiee'),
+                output_field=models.CharField(max_length=20),
+            )
+        )
+
+    def recalculer_places(self):
+        """
+        Recalcule le compteur nb_inscrits de chaque séance en une seule
+        requête agrégée (réparation après incohérence ou import)
+        """
+        confirmees = Inscription.objects.filter(
+            seance=models.OuterRef('pk'),
+            statut='confirmee'
+        ).order_by().values('seance').annotate(total=models.Count('pk')).values('total')
+
+        return self.update(
+            nb_inscrits=Coalesce(models.Subquery(confirmees), 0)
+        )
+
+    def disponibles_pour(self, etudiant, maintenant=None):
+        """
+        Séances planifiées à venir ouvertes à l'étudiant, en une requête :
+        anti-jointures NOT EXISTS sur les bannissements et les inscriptions
+        confirmées, places restantes annotées (places_libres)
+        """
+        maintenant = maintenant or timezone.now()
+        banni = BannissementTuteur.objects.filter(
+            tuteur=models.OuterRef('tuteur'),
+            etudiant=etudiant
+        )
+        inscrit = Inscription.objects.filter(
+            seance=models.OuterRef('pk'),
+            etudiant=etudiant,
+            statut='confirmee'
+        )
+        return self.filter(
+            ~models.Exists(banni),
+            ~models.Exists(inscrit),
+            statut='planifiee',
+            debut__gte=maintenant,
+        ).annotate(
+            places_libres=models.F('places_max') - models.F('nb_inscrits')
+        )
+
+
 class Seance(models.Model):
     """
     Modèle représentant une séance de tutorat
@@ -118,6 +347,11 @@ class Seance(models.Model):
     heure_debut = models.TimeField(verbose_name='Heure de début')
     heure_fin = models.TimeField(verbose_name='Heure de fin')
     
+    # Début et fin absolus (avec fuseau), recalculés à chaque save() à partir
+    # de date/heure_debut/heure_fin saisis en heure locale (TIME_ZONE)
+    debut = models.DateTimeField(editable=False, verbose_name='Début')
+    fin = models.DateTimeField(editable=False, verbose_name='Fin')
+    
     lieu = models.CharField(max_length=100, verbose_name='Lieu')
     
     places_max = models.PositiveIntegerField(
@@ -133,63 +367,92 @@ class Seance(models.Model):
         verbose_name='Statut'
     )
     
+    # Compteur dénormalisé des inscriptions confirmées, maintenu par
+    # Inscription.save() et le signal post_delete (voir signals.py)
+    nb_inscrits = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Inscriptions confirmées'
+    )
+    
     date_creation = models.DateTimeField(auto_now_add=True, verbose_name='Date de création')
     date_modification = models.DateTimeField(auto_now=True, verbose_name='Dernière modification')
     
+    objects = SeanceQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Séance'
         verbose_name_plural = 'Séances'
-        ordering = ['date', 'heure_debut']
+        ordering = ['debut']
+        indexes = [
+            # Listes triées par horaire (administration)
+            models.Index(fields=['debut'], name='seance_debut_idx'),
+            # Fenêtre du calendrier, chevauchements et séances d'un tuteur
+            models.Index(fields=['tuteur', 'debut'], name='seance_tuteur_debut_idx'),
+            # Statut réel calculé en SQL (actualiser_statuts, avec_statut_reel)
+            models.Index(fields=['statut', 'debut'], name='seance_statut_debut_idx'),
+            models.Index(fields=['statut', 'fin'], name='seance_statut_fin_idx'),
+        ]
+
+    @staticmethod
+    def instant(jour, heure=None):
+        """
+        Datetime avec fuseau d'un jour et d'une heure saisis en heure locale
+        (TIME_ZONE), minuit par défaut : borne comparable à debut/fin
+        """
+        moment = datetime.combine(jour, heure or datetime.min.time())
+        return timezone.make_aware(moment, timezone.get_default_timezone())
 
+    def calculer_horaires(self):
+        """
+        Synchronise debut/fin avec date, heure_debut et heure_fin.
+        À appeler avant un bulk_create (save() s'en charge sinon).
+        """
+        self.debut = self.instant(self.date, self.heure_debut)
+        self.fin = self.instant(self.date, self.heure_fin)
+    
+    def save(self, *args, **kwargs):
+        self.calculer_horaires()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'debut', 'fin'}
+        super().save(*args, **kwargs)
+    
     def actualiser_statut(self):
         """
         Met à jour automatiquement le statut selon la date/heure
         """
-        if self.statut == 'annulee':
-            return
-        
-        maintenant = timezone.now()
-        date_aujourd_hui = maintenant.date()
-        heure_actuelle = maintenant.time()
-        
-        datetime_debut = datetime.combine(self.date, self.heure_debut)
-        datetime_fin = datetime.combine(self.date, self.heure_fin)
-        datetime_actuel = datetime.combine(date_aujourd_hui, heure_actuelle)
-        
-        if datetime_actuel > datetime_fin:
-            if self.statut != 'terminee':
-                self.statut = 'terminee'
-                self.save()
-        elif datetime_debut <= datetime_actuel <= datetime_fin:
-            if self.statut != 'en_cours':
-                self.statut = 'en_cours'
-                self.save()
-        elif self.statut == 'en_cours' and datetime_actuel < datetime_debut:
-            self.statut = 'planifiee'
-            self.save()
+        statut = self.statut_actuel
+        if statut != self.statut:
+            self.statut = statut
+            self.save(update_fields=['statut', 'date_modification'])
     
     @property
     def statut_actuel(self):
         """
-        Retourne le statut actualisé sans sauvegarder
+        Retourne le statut actualisé sans sauvegarder.
+        Utilise l'annotation SQL statut_reel quand la séance vient de
+        SeanceQuerySet.avec_statut_reel()
         """
+        if hasattr(self, 'statut_reel'):
+            return self.statut_reel
+        
         if self.statut == 'annulee':
             return self.statut
         
         maintenant = timezone.now()
-        date_aujourd_hui = maintenant.date()
-        heure_actuelle = maintenant.time()
-        
-        datetime_debut = datetime.combine(self.date, self.heure_debut)
-        datetime_fin = datetime.combine(self.date, self.heure_fin)
-        datetime_actuel = datetime.combine(date_aujourd_hui, heure_actuelle)
-        
-        if datetime_actuel > datetime_fin:
+        if maintenant > self.fin:
             return 'terminee'
-        elif datetime_debut <= datetime_actuel <= datetime_fin:
+        elif self.debut <= maintenant:
             return 'en_cours'
         else:
-            return self.statut
+            return 'planifiee'
+    
+    def get_statut_actuel_display(self):
+        """
+        Retourne le libellé du statut actualisé
+        """
+        return dict(self.STATUT_CHOICES).get(self.statut_actuel, self.statut_actuel)
     
     def __str__(self):
         return f"{self.titre} - {self.date} à {self.heure_debut}"
@@ -199,7 +462,7 @@ class Seance(models.Model):
         """
         Calcule le nombre de places restantes
         """
-        return self.places_max - self.inscriptions.filter(statut='confirmee').count()
+        return self.places_max - self.nb_inscrits
     
     @property
     def est_complet(self):
@@ -251,6 +514,81 @@ class Inscription(models.Model):
         ordering = ['-date_inscription']
         unique_together = ['etudiant', 'seance']
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Mémoriser l'état chargé pour ajuster le compteur de la séance au save()
+        instance._etat_initial = {
+            champ: valeur for champ, valeur in zip(field_names, values)
+            if champ in ('seance_id', 'statut')
+        }
+        return instance
+    
+    def _etat_enregistre(self):
+        """
+        seance_id et statut en base : ceux chargés par from_db, relus si
+        l'un d'eux manque (objet construit à la main, .only() ou .defer())
+        """
+        ancien = getattr(self, '_etat_initial', None) or {}
+        if 'seance_id' in ancien and 'statut' in ancien:
+            return ancien
+        return Inscription.objects.filter(pk=self.pk).values('seance_id', 'statut').first()
+    
+    def clean(self):
+        """
+        Refuser une inscription confirmée sur une séance complète
+        (formulaires de l'admin Django)
+        """
+        super().clean()
+        if self.statut != 'confirmee' or not self.seance_id:
+            return
+        
+        ancien = {} if self._state.adding else (self._etat_enregistre() or {})
+        deja_comptee = (
+            not self._state.adding
+            and ancien.get('statut') == 'confirmee'
+            and ancien.get('seance_id') == self.seance_id
+        )
+        if not deja_comptee and self.seance.est_complet:
+            raise ValidationError("Cette séance est complète.")
+    
+    def save(self, *args, **kwargs):
+        """
+        Enregistre l'inscription et met à jour Seance.nb_inscrits
+        dans la même transaction.
+        Lève SeanceComplete si la séance n'a plus de place.
+        """
+        ancien = None if self._state.adding else self._etat_enregistre()
+        
+        deltas = {}
+        if ancien and ancien.get('statut') == 'confirmee':
+            deltas[ancien['seance_id']] = deltas.get(ancien['seance_id'], 0) - 1
+        if self.statut == 'confirmee':
+            deltas[self.seance_id] = deltas.get(self.seance_id, 0) + 1
+        
+        with transaction.atomic():
+            # Réserver la place AVANT l'insertion : l'UPDATE conditionnel est
+            # atomique, deux inscriptions concurrentes ne peuvent pas prendre
+            # la dernière place (le verrou de ligne/base sérialise les écritures)
+            for seance_id, delta in deltas.items():
+                if delta > 0:
+                    reservee = Seance.objects.filter(
+                        pk=seance_id,
+                        nb_inscrits__lte=models.F('places_max') - delta
+                    ).update(nb_inscrits=models.F('nb_inscrits') + delta)
+                    if not reservee:
+                        raise SeanceComplete("Cette séance est complète.")
+            
+            super().save(*args, **kwargs)
+            
+            for seance_id, delta in deltas.items():
+                if delta < 0:
+                    Seance.objects.filter(pk=seance_id).update(
+                        nb_inscrits=models.F('nb_inscrits') + delta
+                    )
+        
+        self._etat_initial = {'seance_id': self.seance_id, 'statut': self.statut}
+    
     def actualiser_statut_selon_seance(self):
         """
         Met à jour le statut de l'inscription selon le statut de la séance
@@ -297,6 +635,101 @@ class Inscription(models.Model):
 
 # ========== MODÈLE SUJET DE FORUM ==========
 
+class SujetQuerySet(models.QuerySet):
+    """
+    Requêtes du forum.
+    Un sujet est lu par un utilisateur jusqu'au plus récent de son filigrane
+    (User.derniere_visite_forum) et de son pointeur LectureSujet sur ce sujet.
+    """
+
+    def avec_lecture(self, utilisateur, filigrane):
+        """
+        Jointure gauche sur le pointeur de lecture de l'utilisateur
+        (index unique utilisateur/sujet) et annotation lu_jusqu_a
+        """
+        filigrane = models.Value(filigrane, output_field=models.DateTimeField())
+        return self.annotate(
+            lecture=models.FilteredRelation(
+                'lectures', condition=models.Q(lectures__utilisateur=utilisateur)
+            ),
+            lu_jusqu_a=Greatest(Coalesce('lecture__date_lecture', filigrane), filigrane),
+        )
+
+    def avec_compteurs(self, utilisateur, filigrane=None):
+        """
+        Annote chaque sujet avec nb_nouvelles_reponses (réponses des autres
+        non lues) et non_lu (sujet d'un autre jamais lu). La sous-requête de
+        comptage n'est évaluée que pour les sujets de la page dont la
+        dernière activité est postérieure à la lecture.
+        """
+        if filigrane is None:
+            return self.annotate(
+                nb_nouvelles_reponses=models.Value(0),
+                non_lu=models.Value(False),
+            )
+        
+        nouvelles = Reponse.objects.filter(
+            sujet=models.OuterRef('pk'),
+            date_creation__gt=models.OuterRef('lu_jusqu_a')
+        ).exclude(auteur=utilisateur).order_by().values('sujet').annotate(n=models.Count('pk')).values('n')
+        return self.avec_lecture(utilisateur, filigrane).annotate(
+            nb_nouvelles_reponses=models.Case(
+                models.When(
+                    derniere_activite__gt=models.F('lu_jusqu_a'),
+                    then=Coalesce(models.Subquery(nouvelles), 0),
+                ),
+                default=models.Value(0),
+            ),
+            non_lu=models.Case(
+                models.When(
+                    ~models.Q(auteur=utilisateur) & models.Q(date_creation__gt=models.F('lu_jusqu_a')),
+                    then=models.Value(True),
+                ),
+                default=models.Value(False),
+            ),
+        )
+
+    def recalculer_activite(self):
+        """
+        Recalcule les champs d'activité dénormalisés (nb_reponses,
+        dernière réponse, dernier répondant, dernière activité) en un UPDATE
+        """
+        reponses = Reponse.objects.filter(sujet=models.OuterRef('pk')).order_by()
+        total = reponses.values('sujet').annotate(n=models.Count('pk')).values('n')
+        derniere = reponses.order_by('-date_creation', '-pk')
+        return self.update(
+            nb_reponses=Coalesce(models.Subquery(total), 0),
+            derniere_reponse_date=models.Subquery(derniere.values('date_creation')[:1]),
+            dernier_repondant=models.Subquery(derniere.values('auteur')[:1]),
+            derniere_activite=Coalesce(
+                models.Subquery(derniere.values('date_creation')[:1]),
+                models.F('date_creation')
+            ),
+        )
+
+    def compter_non_lus(self, utilisateur, filigrane):
+        """
+        Compteurs du badge de navigation, une jointure indexée chacun :
+        sujets des autres jamais lus et réponses non lues sur mes sujets
+        """
+        nouveaux_sujets = self.avec_lecture(utilisateur, filigrane).filter(
+            date_creation__gt=models.F('lu_jusqu_a')
+        ).exclude(auteur=utilisateur).count()
+        
+        valeur = models.Value(filigrane, output_field=models.DateTimeField())
+        nouvelles_reponses = Reponse.objects.annotate(
+            lecture=models.FilteredRelation(
+                'sujet__lectures', condition=models.Q(sujet__lectures__utilisateur=utilisateur)
+            ),
+            lu_jusqu_a=Greatest(Coalesce('lecture__date_lecture', valeur), valeur),
+        ).filter(
+            sujet__auteur=utilisateur,
+            date_creation__gt=models.F('lu_jusqu_a'),
+        ).exclude(auteur=utilisateur).count()
+        
+        return nouveaux_sujets, nouvelles_reponses
+
+
 class Sujet(models.Model):
     """
     Modèle représentant un sujet de discussion dans le forum
@@ -326,18 +759,50 @@ class Sujet(models.Model):
     
     est_resolu = models.BooleanField(default=False, verbose_name='Résolu')
     
+    # Activité dénormalisée, tenue à jour par Reponse.save() et le signal
+    # post_delete des réponses (même transaction que l'écriture de la réponse)
+    nb_reponses = models.PositiveIntegerField(default=0, editable=False, verbose_name='Nombre de réponses')
+    derniere_reponse_date = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Dernière réponse'
+    )
+    dernier_repondant = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+        verbose_name='Dernier répondant'
+    )
+    # Date de la dernière réponse, ou de création sans réponse
+    derniere_activite = models.DateTimeField(default=timezone.now, editable=False, verbose_name='Dernière activité')
+    
+    objects = SujetQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Sujet'
         verbose_name_plural = 'Sujets'
         ordering = ['-date_creation']
+        indexes = [
+            # Index du forum paginé par curseur sur (date_creation, id)
+            models.Index(fields=['date_creation', 'id'], name='sujet_date_idx'),
+            models.Index(fields=['matiere', 'date_creation', 'id'], name='sujet_matiere_date_idx'),
+            # Tri par dernière activité et filtre "sans réponse"
+            models.Index(fields=['derniere_activite', 'id'], name='sujet_activite_idx'),
+            models.Index(fields=['matiere', 'derniere_activite', 'id'], name='sujet_matiere_activite_idx'),
+            models.Index(fields=['nb_reponses', 'derniere_activite', 'id'], name='sujet_sans_reponse_idx'),
+        ]
     
     def __str__(self):
         return f"{self.titre} - {self.auteur.username}"
     
     @property
     def nombre_reponses(self):
-        """Retourne le nombre de réponses au sujet"""
-        return self.reponses.count()
+        """Retourne le nombre de réponses au sujet (compteur dénormalisé)"""
+        return self.nb_reponses
 
 
 # ========== MODÈLE RÉPONSE DE FORUM ==========
@@ -369,9 +834,167 @@ class Reponse(models.Model):
         verbose_name = 'Réponse'
         verbose_name_plural = 'Réponses'
         ordering = ['date_creation']
+        indexes = [
+            # Réponses récentes d'un sujet (compteur de nouvelles réponses)
+            models.Index(fields=['sujet', 'date_creation'], name='reponse_sujet_date_idx'),
+        ]
     
     def __str__(self):
         return f"Réponse de {self.auteur.username} sur {self.sujet.titre}"
+    
+    def save(self, *args, **kwargs):
+        """
+        À la création, met à jour l'activité du sujet dans la même transaction
+        """
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Deux réponses peuvent être validées dans l'ordre inverse de leur
+            # date : l'activité du sujet ne recule jamais
+            date = models.Value(self.date_creation)
+            plus_recente = models.Q(derniere_reponse_date__isnull=True) | models.Q(
+                derniere_reponse_date__lte=date
+            )
+            Sujet.objects.filter(pk=self.sujet_id).update(
+                nb_reponses=models.F('nb_reponses') + 1,
+                derniere_reponse_date=models.Case(
+                    models.When(plus_recente, then=date),
+                    default=models.F('derniere_reponse_date'),
+                ),
+                dernier_repondant=models.Case(
+                    models.When(plus_recente, then=models.Value(self.auteur_id)),
+                    default=models.F('dernier_repondant'),
+                    output_field=models.BigIntegerField(),
+                ),
+                derniere_activite=Greatest(models.F('derniere_activite'), date),
+            )
+
+
+# ========== MODÈLE LECTURE DE SUJET ==========
+
+class LectureSujet(models.Model):
+    """
+    Pointeur de lecture d'un sujet : tout ce qui a été publié sur le sujet
+    avant date_lecture est lu par l'utilisateur. Les pointeurs antérieurs au
+    filigrane User.derniere_visite_forum sont superflus et supprimés par la
+    commande compacter_lectures.
+    """
+    utilisateur = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='lectures_sujets',
+        verbose_name='Utilisateur'
+    )
+    
+    sujet = models.ForeignKey(
+        Sujet,
+        on_delete=models.CASCADE,
+        related_name='lectures',
+        verbose_name='Sujet'
+    )
+    
+    date_lecture = models.DateTimeField(verbose_name='Lu jusqu\'au')
+    
+    class Meta:
+        verbose_name = 'Lecture de sujet'
+        verbose_name_plural = 'Lectures de sujets'
+        constraints = [
+            models.UniqueConstraint(fields=['utilisateur', 'sujet'], name='lecture_sujet_unique'),
+        ]
+        indexes = [
+            # Compactage des pointeurs anciens
+            models.Index(fields=['date_lecture'], name='lecture_sujet_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.utilisateur} a lu {self.sujet} le {self.date_lecture}"
+    
+    @classmethod
+    def marquer_lu(cls, utilisateur, sujet, derniere_activite, filigrane=None, moment=None, lu_jusqu_a=None):
+        """
+        Avance le pointeur de lecture (UPSERT sur la contrainte unique),
+        sans écriture si rien n'a été publié depuis la dernière lecture.
+        `lu_jusqu_a` (annotation de SujetQuerySet.avec_lecture) évite de relire le pointeur.
+        """
+        if lu_jusqu_a is not None:
+            if lu_jusqu_a >= derniere_activite:
+                return False
+        else:
+            if filigrane and filigrane >= derniere_activite:
+                return False
+            deja_lu = cls.objects.filter(
+                utilisateur=utilisateur,
+                sujet=sujet,
+                date_lecture__gte=derniere_activite
+            ).exists()
+            if deja_lu:
+                return False
+        cls.objects.bulk_create(
+            [cls(utilisateur=utilisateur, sujet=sujet, date_lecture=moment or timezone.now())],
+            update_conflicts=True,
+            unique_fields=['utilisateur', 'sujet'],
+            update_fields=['date_lecture'],
+        )
+        return True
+    
+    @classmethod
+    def compacter(cls, limite):
+        """
+        Replie les pointeurs antérieurs à `limite` dans le filigrane, sans
+        rien marquer comme lu : le filigrane de chaque utilisateur concerné
+        avance jusqu'à `limite`, mais reste juste avant le premier sujet ou la
+        première réponse d'un autre qu'il n'a pas encore lu. Les pointeurs
+        devenus inférieurs au filigrane, donc superflus, sont ensuite
+        supprimés. Retourne (utilisateurs mis à jour, pointeurs supprimés).
+        """
+        anciens = cls.objects.filter(
+            utilisateur=models.OuterRef('pk'),
+            date_lecture__lt=limite
+        )
+        concernes = User.objects.filter(models.Exists(anciens)).filter(
+            models.Q(derniere_visite_forum__isnull=True) | models.Q(derniere_visite_forum__lt=limite)
+        )
+        utilisateurs = 0
+        with transaction.atomic():
+            for utilisateur in concernes.only('pk', 'derniere_visite_forum'):
+                filigrane = utilisateur.filigrane_forum()
+                nouveau = max(filigrane, min(limite, cls._premier_non_lu(utilisateur, filigrane, limite)))
+                if nouveau != utilisateur.derniere_visite_forum:
+                    User.objects.filter(pk=utilisateur.pk).update(derniere_visite_forum=nouveau)
+                    utilisateurs += 1
+            supprimes, _ = cls.objects.filter(
+                date_lecture__lte=models.F('utilisateur__derniere_visite_forum')
+            ).delete()
+        return utilisateurs, supprimes
+
+    @staticmethod
+    def _premier_non_lu(utilisateur, filigrane, limite):
+        """
+        Dernier instant avant le premier contenu d'un autre non lu par
+        l'utilisateur et antérieur à `limite` (`limite` s'il n'y en a pas)
+        """
+        sujets = Sujet.objects.avec_lecture(utilisateur, filigrane).filter(
+            date_creation__gt=models.F('lu_jusqu_a'),
+            date_creation__lt=limite
+        ).exclude(auteur=utilisateur).aggregate(date=models.Min('date_creation'))['date']
+
+        valeur = models.Value(filigrane, output_field=models.DateTimeField())
+        reponses = Reponse.objects.annotate(
+            lecture=models.FilteredRelation(
+                'sujet__lectures', condition=models.Q(sujet__lectures__utilisateur=utilisateur)
+            ),
+            lu_jusqu_a=Greatest(Coalesce('lecture__date_lecture', valeur), valeur),
+        ).filter(
+            sujet__derniere_activite__gt=filigrane,
+            date_creation__gt=models.F('lu_jusqu_a'),
+            date_creation__lt=limite
+        ).exclude(auteur=utilisateur).aggregate(date=models.Min('date_creation'))['date']
+
+        premier = min((d for d in (sujets, reponses) if d), default=None)
+        # Les comparaisons de lecture sont strictes : une microseconde avant
+        # le premier contenu non lu, celui-ci le reste
+        return premier - timedelta(microseconds=1) if premier else limite
 
 
 # ========== MODÈLE BANNISSEMENT ==========
@@ -412,10 +1035,78 @@ class BannissementTuteur(models.Model):
 
 # ========== MODÈLES MESSAGERIE ==========
 
+class ConversationQuerySet(models.QuerySet):
+    """
+    Requêtes de la messagerie
+    """
+    
+    def boite_de_reception(self, utilisateur):
+        """
+        Conversations de l'utilisateur annotées de l'autre participant
+        (autre_id) et du nombre de messages reçus non lus (nb_non_lus, lu
+        sur son pointeur de lecture) ; le dernier message vient des champs
+        dénormalisés
+        """
+        Participant = Conversation.participants.through
+        autres = Participant.objects.filter(
+            conversation=models.OuterRef('pk')
+        ).exclude(user=utilisateur).order_by('pk').values('user')[:1]
+        return self.filter(lectures__utilisateur=utilisateur).annotate(
+            autre_id=models.Subquery(autres),
+            nb_non_lus=models.F('lectures__nb_non_lus'),
+        )
+    
+    def entre(self, utilisateur, autre):
+        """
+        Conversation 1-to-1 entre deux utilisateurs : une lecture de l'index
+        unique sur la paire (participant_min, participant_max)
+        """
+        return self.filter(**Conversation.cle_paire(utilisateur, autre))
+    
+    def obtenir_ou_creer(self, utilisateur, autre):
+        """
+        Retourne (conversation, créée) pour la paire d'utilisateurs, sans
+        condition de course : si une requête concurrente crée la même
+        conversation, la contrainte d'unicité l'emporte et on relit la sienne
+        """
+        cle = Conversation.cle_paire(utilisateur, autre)
+        conversation = self.filter(**cle).first()
+        if conversation is not None:
+            return conversation, False
+        try:
+            with transaction.atomic():
+                conversation = self.create(**cle)
+                conversation.participants.add(utilisateur, autre)
+        except IntegrityError:
+            return self.get(**cle), False
+        return conversation, True
+    
+    def recalculer_activite(self):
+        """
+        Recalcule la date et l'aperçu du dernier message en un UPDATE
+        """
+        dernier = Message.objects.filter(
+            conversation=models.OuterRef('pk')
+        ).order_by('-created_at', '-pk')
+        return self.update(
+            derniere_activite=Coalesce(
+                models.Subquery(dernier.values('created_at')[:1]),
+                models.F('created_at')
+            ),
+            dernier_apercu=Coalesce(
+                Substr(models.Subquery(dernier.values('content')[:1]), 1, Conversation.LONGUEUR_APERCU),
+                models.Value('')
+            ),
+        )
+
+
 class Conversation(models.Model):
     """
     Modèle représentant une conversation entre utilisateurs
     """
+    # Longueur de l'aperçu du dernier message conservé sur la conversation
+    LONGUEUR_APERCU = 200
+    
     participants = models.ManyToManyField(
         settings.AUTH_USER_MODEL,
         related_name="conversations",
@@ -425,16 +1116,72 @@ class Conversation(models.Model):
         auto_now_add=True,
         verbose_name="Date de création"
     )
+    
+    # Dernier message dénormalisé, tenu à jour par Message.save() et le
+    # signal post_delete des messages
+    derniere_activite = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        verbose_name='Dernière activité'
+    )
+    dernier_apercu = models.CharField(
+        max_length=LONGUEUR_APERCU,
+        blank=True,
+        editable=False,
+        verbose_name='Aperçu du dernier message'
+    )
+    
+    # Paire canonique des participants d'une conversation 1-to-1 (plus petit
+    # puis plus grand identifiant), unique : voir ConversationQuerySet.entre
+    participant_min = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+        # Couvert par la contrainte d'unicité, dont il est la première colonne
+        db_index=False,
+        verbose_name='Premier participant'
+    )
+    participant_max = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+        verbose_name='Second participant'
+    )
+    
+    objects = ConversationQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Conversation'
         verbose_name_plural = 'Conversations'
         ordering = ['-created_at']
+        indexes = [
+            # Boîte de réception paginée par curseur sur (derniere_activite, id)
+            models.Index(fields=['derniere_activite', 'id'], name='conversation_activite_idx'),
+        ]
+        constraints = [
+            # Une seule conversation par paire d'utilisateurs
+            models.UniqueConstraint(
+                fields=['participant_min', 'participant_max'],
+                name='conversation_paire_unique'
+            ),
+        ]
 
     def __str__(self):
         noms = [p.get_full_name() or p.username for p in self.participants.all()]
         return " / ".join(noms)
 
+    @staticmethod
+    def cle_paire(utilisateur, autre):
+        """Filtre sur la paire canonique de deux utilisateurs"""
+        premier, second = sorted((utilisateur.pk, autre.pk))
+        return {'participant_min_id': premier, 'participant_max_id': second}
+
     def last_message(self):
         """Retourne le dernier message de la conversation"""
         return self.messages.order_by('-created_at').first()
@@ -467,15 +1214,134 @@ class Message(models.Model):
         auto_now_add=True,
         verbose_name='Date d\'envoi'
     )
-    is_read = models.BooleanField(
-        default=False,
-        verbose_name='Lu'
-    )
 
     class Meta:
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
         ordering = ['created_at']
+        indexes = [
+            # Historique d'une conversation paginé par curseur sur (created_at, id)
+            models.Index(fields=['conversation', 'created_at', 'id'], name='message_conv_date_idx'),
+        ]
 
     def __str__(self):
-        return f"Message de {self.sender} dans {self.conversation}"
\ No newline at end of file
+        return f"Message de {self.sender} dans {self.conversation}"
+
+    def save(self, *args, **kwargs):
+        """
+        À la création, met à jour le dernier message de la conversation et
+        le compteur de non lus des destinataires dans la même transaction
+        """
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Deux messages peuvent être validés dans l'ordre inverse de leur
+            # date : le dernier message de la conversation ne recule jamais
+            date = models.Value(self.created_at)
+            Conversation.objects.filter(pk=self.conversation_id).update(
+                derniere_activite=Greatest(models.F('derniere_activite'), date),
+                dernier_apercu=models.Case(
+                    models.When(
+                        derniere_activite__lte=date,
+                        then=models.Value(self.content[:Conversation.LONGUEUR_APERCU]),
+                    ),
+                    default=models.F('dernier_apercu'),
+                ),
+            )
+            LectureConversation.objects.filter(
+                conversation_id=self.conversation_id
+            ).exclude(utilisateur_id=self.sender_id).update(
+                nb_non_lus=models.F('nb_non_lus') + 1
+            )
+
+
+class LectureConversation(models.Model):
+    """
+    Pointeur de lecture d'une conversation par un participant : les messages
+    jusqu'à dernier_lu (identifiant) sont lus, et nb_non_lus compte les
+    messages reçus après lui. Créé pour chaque participant (signal
+    m2m_changed), incrémenté par Message.save, remis à jour par marquer_lu.
+    """
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='lectures',
+        verbose_name='Conversation'
+    )
+    utilisateur = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='lectures_conversations',
+        # Couvert par la contrainte d'unicité, dont il est la première colonne
+        db_index=False,
+        verbose_name='Utilisateur'
+    )
+    dernier_lu = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Dernier message lu'
+    )
+    nb_non_lus = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Messages non lus'
+    )
+
+    class Meta:
+        verbose_name = 'Lecture de conversation'
+        verbose_name_plural = 'Lectures de conversations'
+        constraints = [
+            # Boîte de réception et total des non lus d'un utilisateur
+            models.UniqueConstraint(
+                fields=['utilisateur', 'conversation'],
+                name='lecture_conversation_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.utilisateur} a lu {self.conversation} jusqu'au message {self.dernier_lu}"
+
+    @classmethod
+    def ouvrir(cls, paires):
+        """
+        Crée les pointeurs des paires (conversation, utilisateur) données :
+        un nouveau participant a lu la conversation jusqu'au dernier message
+        """
+        conversations = {conversation_id for conversation_id, _ in paires}
+        derniers = dict(
+            Message.objects.filter(conversation__in=conversations).order_by().values(
+                'conversation'
+            ).annotate(dernier=models.Max('pk')).values_list('conversation', 'dernier')
+        )
+        cls.objects.bulk_create(
+            [
+                cls(
+                    conversation_id=conversation_id,
+                    utilisateur_id=utilisateur_id,
+                    dernier_lu=derniers.get(conversation_id, 0)
+                )
+                for conversation_id, utilisateur_id in paires
+            ],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def marquer_lu(cls, utilisateur, conversation, message):
+        """
+        Avance le pointeur jusqu'à `message` en un UPDATE d'une ligne ; le
+        compteur ne garde que les messages reçus après lui. Sans écriture si
+        le pointeur est déjà au-delà. Retourne True si le pointeur a avancé.
+        """
+        suivants = Message.objects.filter(
+            conversation=conversation,
+            pk__gt=message.pk
+        ).exclude(sender=utilisateur).order_by().values('conversation').annotate(
+            n=models.Count('pk')
+        ).values('n')
+        return cls.objects.filter(
+            utilisateur=utilisateur,
+            conversation=conversation,
+            dernier_lu__lt=message.pk
+        ).update(
+            dernier_lu=message.pk,
+            nb_non_lus=Coalesce(models.Subquery(suivants), 0)
+        ) > 0
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+Compteurs de notifications (messages non lus, activité du forum) mis en
+cache par utilisateur et recalculés à la demande après invalidation.
+
+Messages : somme des pointeurs LectureConversation de l'utilisateur ;
+l'entrée est supprimée quand un message lui est adressé ou retiré, et quand
+il lit une conversation.
+Forum : un nouveau sujet ou une nouvelle réponse concerne tous les
+utilisateurs ; plutôt que de supprimer une entrée par utilisateur, la clé
+contient une version globale incrémentée à chaque écriture. Les lectures
+d'un utilisateur (pointeur, filigrane) ne suppriment que son entrée.
+
+Les invalidations sont différées après validation de la transaction en
+cours (comme diffusion.diffuser) : avant, un compteurs() concurrent relirait
+l'état non encore validé et remettrait en cache une valeur périmée.
+
+Le cache doit être partagé entre les processus (CACHES : base de données,
+Redis...) : avec un cache en mémoire locale, une invalidation n'atteindrait
+que le processus de l'écriture et les autres serviraient des compteurs
+périmés ; les compteurs sont alors recalculés à chaque requête.
+
+NOTIFICATIONS_CACHE_DUREE borne la durée de vie d'une entrée (filet de
+sécurité pour les écritures qui ne passent pas par les signaux).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from .models import LectureConversation, Sujet
+
+PREFIXE_CLE = 'tutorat:notifications:'
+CLE_VERSION_FORUM = f'{PREFIXE_CLE}version_forum'
+
+
+def _duree():
+    return getattr(settings, 'NOTIFICATIONS_CACHE_DUREE', 300)
+
+
+def _cle_messages(pk):
+    return f'{PREFIXE_CLE}messages:{pk}'
+
+
+def _cle_forum(pk, version):
+    return f'{PREFIXE_CLE}forum:{pk}:{version}'
+
+
+def _version_forum():
+    version = cache.get(CLE_VERSION_FORUM)
+    if version is None:
+        # Départ horodaté : une clé perdue ne fait pas ressurgir d'anciennes entrées
+        cache.add(CLE_VERSION_FORUM, int(time.time() * 1000), None)
+        version = cache.get(CLE_VERSION_FORUM)
+    return version
+
+
+def compter_messages_non_lus(utilisateur):
+    """Somme des compteurs des pointeurs de lecture de l'utilisateur"""
+    return LectureConversation.objects.filter(utilisateur=utilisateur).aggregate(
+        total=Coalesce(Sum('nb_non_lus'), 0)
+    )['total']
+
+
+def compter_forum(utilisateur):
+    """Sujets jamais lus + réponses non lues sur les sujets de l'utilisateur"""
+    nb_nouveaux_sujets, nb_nouvelles_reponses = Sujet.objects.compter_non_lus(
+        utilisateur,
+        utilisateur.filigrane_forum()
+    )
+    return nb_nouveaux_sujets + nb_nouvelles_reponses
+
+
+def cache_partage():
+    """Faux si le cache est local au processus (invalidation impossible ailleurs)"""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def compteurs(utilisateur):
+    """
+    (messages non lus, notifications forum) de l'utilisateur, depuis le
+    cache ; seuls les compteurs absents sont recalculés
+    """
+    if not cache_partage():
+        return compter_messages_non_lus(utilisateur), compter_forum(utilisateur)
+    cle_messages = _cle_messages(utilisateur.pk)
+    cle_forum = _cle_forum(utilisateur.pk, _version_forum())
+    valeurs = cache.get_many([cle_messages, cle_forum])
+    manquantes = {}
+    if cle_messages not in valeurs:
+        manquantes[cle_messages] = compter_messages_non_lus(utilisateur)
+    if cle_forum not in valeurs:
+        manquantes[cle_forum] = compter_forum(utilisateur)
+    if manquantes:
+        cache.set_many(manquantes, _duree())
+        valeurs.update(manquantes)
+    return valeurs[cle_messages], valeurs[cle_forum]
+
+
+def invalider_messages(*pks):
+    """
+    Supprime le compteur de messages des utilisateurs donnés (clés
+    primaires), après validation de la transaction en cours
+    """
+    cles = [_cle_messages(pk) for pk in pks]
+    transaction.on_commit(lambda: cache.delete_many(cles))
+
+
+def invalider_forum(utilisateur=None):
+    """
+    Invalide le compteur forum d'un utilisateur, ou de tous (changement de
+    version) si aucun n'est donné, après validation de la transaction en cours
+    """
+    def invalider():
+        if utilisateur is not None:
+            cache.delete(_cle_forum(utilisateur.pk, _version_forum()))
+            return
+        try:
+            cache.incr(CLE_VERSION_FORUM)
+        except ValueError:
+            _version_forum()
+    transaction.on_commit(invalider)
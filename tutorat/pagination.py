@@ -0,0 +1,112 @@
+"""
+Pagination par curseur (keyset) : la page suivante est lue à partir des
+valeurs de tri du dernier élément affiché, sans OFFSET, ce qui garde un coût
+constant quelle que soit la profondeur de la page.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class CurseurInvalide(ValueError):
+    """Curseur illisible ou ne correspondant pas à l'ordre de tri"""
+
+
+class PageCurseur:
+    """Une page de résultats et le curseur de la page suivante (None à la fin)"""
+
+    def __init__(self, elements, curseur_suivant):
+        self.elements = elements
+        self.curseur_suivant = curseur_suivant
+
+    @property
+    def a_suivante(self):
+        return self.curseur_suivant is not None
+
+    def __iter__(self):
+        return iter(self.elements)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __bool__(self):
+        return bool(self.elements)
+
+
+def _nom(champ):
+    return champ.lstrip('-')
+
+
+def _champ_modele(modele, nom):
+    if nom == 'pk':
+        return modele._meta.pk
+    return modele._meta.get_field(nom)
+
+
+def encoder_curseur(valeurs):
+    """Encode les valeurs de tri en une chaîne utilisable dans une URL"""
+    brut = json.dumps([str(v) for v in valeurs])
+    return base64.urlsafe_b64encode(brut.encode()).decode().rstrip('=')
+
+
+def decoder_curseur(curseur, modele, champs):
+    """
+    Décode un curseur en valeurs typées selon les champs du modèle.
+    Lève CurseurInvalide si le curseur est mal formé.
+    """
+    try:
+        brut = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4))
+        valeurs = json.loads(brut)
+    except (binascii.Error, ValueError) as exc:
+        raise CurseurInvalide(str(exc))
+    if not isinstance(valeurs, list) or len(valeurs) != len(champs):
+        raise CurseurInvalide("Curseur incompatible avec l'ordre de tri")
+    # Toujours des chaînes (voir encoder_curseur) : null ou liste = curseur forgé
+    if not all(isinstance(valeur, str) for valeur in valeurs):
+        raise CurseurInvalide('Valeur de curseur invalide')
+    try:
+        return [
+            _champ_modele(modele, _nom(champ)).to_python(valeur)
+            for champ, valeur in zip(champs, valeurs)
+        ]
+    except (FieldDoesNotExist, ValidationError) as exc:
+        raise CurseurInvalide(str(exc))
+
+
+def condition_apres(champs, valeurs):
+    """
+    Condition « strictement après » pour un tri composite :
+    (a > va) OR (a = va AND b > vb) OR ... (< pour un champ préfixé par '-')
+    """
+    condition = Q()
+    for i, champ in enumerate(champs):
+        operateur = 'lt' if champ.startswith('-') else 'gt'
+        terme = Q(**{f'{_nom(champ)}__{operateur}': valeurs[i]})
+        for precedent, valeur in zip(champs[:i], valeurs[:i]):
+            terme &= Q(**{_nom(precedent): valeur})
+        condition |= terme
+    return condition
+
+
+def paginer(queryset, champs, curseur=None, taille=20):
+    """
+    Retourne une PageCurseur de `taille` éléments triés selon `champs`.
+    Les champs de tri sont non nuls et le dernier doit rendre l'ordre
+    total (en général 'pk').
+    """
+    queryset = queryset.order_by(*champs)
+    if curseur:
+        valeurs = decoder_curseur(curseur, queryset.model, champs)
+        queryset = queryset.filter(condition_apres(champs, valeurs))
+
+    # Un élément de plus pour savoir s'il existe une page suivante
+    elements = list(queryset[:taille + 1])
+    curseur_suivant = None
+    if len(elements) > taille:
+        elements = elements[:taille]
+        dernier = elements[-1]
+        curseur_suivant = encoder_curseur([getattr(dernier, _nom(champ)) for champ in champs])
+    return PageCurseur(elements, curseur_suivant)
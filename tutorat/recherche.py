@@ -0,0 +1,255 @@
+"""
+Recherche plein texte sur les séances et le forum.
+
+SQLite : table virtuelle FTS5 (tutorat_recherche) classée par bm25, tenue à
+jour par les signaux. Le rowid encode le type et la clé primaire
+(pk * 4 + code) pour que la mise à jour d'un objet reste un accès direct.
+Autres moteurs : repli sur icontains (sans index plein texte).
+"""
+import re
+
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Seance, Sujet, Reponse
+
+TABLE = 'tutorat_recherche'
+
+# Code du type dans le rowid, champs (titre, contenu) indexés
+TYPES = {
+    'seance': (1, Seance, 'titre', 'description'),
+    'sujet': (2, Sujet, 'titre', 'contenu'),
+    'reponse': (3, Reponse, None, 'contenu'),
+}
+TYPE_PAR_CODE = {code: nom for nom, (code, *_) in TYPES.items()}
+TYPE_PAR_MODELE = {modele: nom for nom, (_, modele, *_) in TYPES.items()}
+
+# Marqueurs de surlignage, remplacés par <mark> après échappement HTML
+DEBUT_MARQUE, FIN_MARQUE = '\x02', '\x03'
+
+_disponible = {}
+
+
+class Resultat:
+    """Un résultat de recherche : l'objet trouvé, son type et un extrait"""
+
+    def __init__(self, type_objet, objet, extrait):
+        self.type_objet = type_objet
+        self.objet = objet
+        self.extrait = extrait
+
+
+def index_fts_disponible():
+    """Vrai si la base est SQLite et que la table FTS5 existe"""
+    if connection.vendor != 'sqlite':
+        return False
+    cle = connection.settings_dict['NAME']
+    if cle not in _disponible:
+        _disponible[cle] = TABLE in connection.introspection.table_names()
+    return _disponible[cle]
+
+
+def type_modele(objet):
+    return objet._meta.concrete_model
+
+
+def _rowid(type_objet, pk):
+    return pk * 4 + TYPES[type_objet][0]
+
+
+def _textes(type_objet, objet):
+    _, _, champ_titre, champ_contenu = TYPES[type_objet]
+    titre = getattr(objet, champ_titre) if champ_titre else ''
+    return titre or '', getattr(objet, champ_contenu) or ''
+
+
+def champs_indexes(type_objet):
+    """Noms des champs du modèle repris dans l'index"""
+    return {champ for champ in TYPES[type_objet][2:] if champ}
+
+
+# ========== MISE À JOUR DE L'INDEX (SQLite) ==========
+
+def indexer(objets):
+    """(Ré)indexe une liste d'objets Seance, Sujet ou Reponse"""
+    if not objets or not index_fts_disponible():
+        return
+    lignes = []
+    for objet in objets:
+        type_objet = TYPE_PAR_MODELE[type_modele(objet)]
+        lignes.append((_rowid(type_objet, objet.pk), *_textes(type_objet, objet)))
+    with connection.cursor() as curseur:
+        curseur.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(l[0],) for l in lignes])
+        curseur.executemany(
+            f'INSERT INTO {TABLE} (rowid, titre, contenu) VALUES (%s, %s, %s)', lignes
+        )
+
+
+def desindexer(objet):
+    """Retire un objet de l'index"""
+    if not index_fts_disponible():
+        return
+    type_objet = TYPE_PAR_MODELE[type_modele(objet)]
+    with connection.cursor() as curseur:
+        curseur.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [_rowid(type_objet, objet.pk)])
+
+
+def desindexer_requete(queryset):
+    """Retire de l'index tous les objets d'un queryset, en un seul DELETE"""
+    if not index_fts_disponible():
+        return
+    code = TYPES[TYPE_PAR_MODELE[queryset.model._meta.concrete_model]][0]
+    rowids = queryset.order_by().annotate(rowid_fts=F('pk') * 4 + code).values('rowid_fts')
+    sql, params = rowids.query.sql_with_params()
+    with connection.cursor() as curseur:
+        curseur.execute(f'DELETE FROM {TABLE} WHERE rowid IN ({sql})', params)
+
+
+def reconstruire():
+    """
+    Vide et reconstruit l'index en SQL (INSERT ... SELECT), puis l'optimise.
+    Retourne le nombre de lignes indexées par type.
+    """
+    if not index_fts_disponible():
+        return {}
+    totaux = {}
+    with connection.cursor() as curseur:
+        curseur.execute(f'DELETE FROM {TABLE}')
+        for type_objet, (code, modele, champ_titre, champ_contenu) in TYPES.items():
+            table = modele._meta.db_table
+            titre = champ_titre or "''"
+            curseur.execute(
+                f'INSERT INTO {TABLE} (rowid, titre, contenu) '
+                f'SELECT id * 4 + {code}, {titre}, {champ_contenu} FROM {table}'
+            )
+            totaux[type_objet] = curseur.rowcount
+        curseur.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return totaux
+
+
+# ========== RECHERCHE ==========
+
+def _termes(texte):
+    return re.findall(r'\w+', texte or '')
+
+
+def requete_fts(texte):
+    """
+    Convertit une saisie libre en requête FTS5 sûre : chaque mot entre
+    guillemets (ET implicite), préfixe sur le dernier mot
+    """
+    termes = _termes(texte)
+    if not termes:
+        return ''
+    return ' '.join(f'"{terme}"' for terme in termes) + '*'
+
+
+def _surligner(extrait):
+    extrait = escape(extrait)
+    return mark_safe(extrait.replace(DEBUT_MARQUE, '<mark>').replace(FIN_MARQUE, '</mark>'))
+
+
+def _charger(trouves):
+    """
+    Charge les objets des couples (type, pk, extrait) en une requête par type,
+    dans l'ordre du classement
+    """
+    objets = {}
+    for type_objet, (_, modele, *_) in TYPES.items():
+        pks = [pk for t, pk, _ in trouves if t == type_objet]
+        if not pks:
+            continue
+        queryset = modele.objects.all()
+        if modele is Seance:
+            queryset = queryset.select_related('matiere', 'tuteur')
+        elif modele is Sujet:
+            queryset = queryset.select_related('matiere', 'auteur')
+        else:
+            queryset = queryset.select_related('sujet', 'auteur')
+        objets[type_objet] = queryset.in_bulk(pks)
+    return [
+        Resultat(type_objet, objets[type_objet][pk], _surligner(extrait))
+        for type_objet, pk, extrait in trouves
+        if pk in objets.get(type_objet, {})
+    ]
+
+
+def _rechercher_fts(texte, types, limite, decalage):
+    requete = requete_fts(texte)
+    if not requete:
+        return []
+    codes = ', '.join(str(TYPES[type_objet][0]) for type_objet in types)
+    with connection.cursor() as curseur:
+        curseur.execute(
+            f'SELECT rowid, snippet({TABLE}, -1, %s, %s, %s, 16) '
+            f'FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid %% 4 IN ({codes}) '
+            f'ORDER BY bm25({TABLE}, 10.0, 1.0) LIMIT %s OFFSET %s',
+            [DEBUT_MARQUE, FIN_MARQUE, '…', requete, limite, decalage]
+        )
+        return [(TYPE_PAR_CODE[rowid % 4], rowid // 4, extrait) for rowid, extrait in curseur.fetchall()]
+
+
+def _rechercher_icontains(texte, types, limite, decalage):
+    termes = _termes(texte)
+    if not termes:
+        return []
+    candidats = []
+    for type_objet in types:
+        _, modele, champ_titre, champ_contenu = TYPES[type_objet]
+        queryset = modele.objects.all()
+        for terme in termes:
+            condition = Q(**{f'{champ_contenu}__icontains': terme})
+            if champ_titre:
+                condition |= Q(**{f'{champ_titre}__icontains': terme})
+            queryset = queryset.filter(condition)
+        lignes = queryset.order_by('-pk').values_list('pk', champ_contenu)[:decalage + limite]
+        candidats += [(type_objet, pk, contenu[:160]) for pk, contenu in lignes]
+    return candidats[decalage:decalage + limite]
+
+
+def _trouver(texte, types, limite, decalage):
+    """Couples (type, pk, extrait) classés, selon le moteur disponible"""
+    if index_fts_disponible():
+        return _rechercher_fts(texte, types, limite, decalage)
+    return _rechercher_icontains(texte, types, limite, decalage)
+
+
+def rechercher(texte, types=None, limite=20, decalage=0):
+    """
+    Recherche classée par pertinence. Retourne une liste de Resultat.
+    `types` restreint aux types donnés ('seance', 'sujet', 'reponse').
+    """
+    types = [type_objet for type_objet in (types or TYPES) if type_objet in TYPES]
+    if not types:
+        return []
+    return _charger(_trouver(texte, types, limite, decalage))
+
+
+def condition(texte, type_objet):
+    """
+    Filtre (Q) des objets d'un type correspondant à la recherche, sans
+    classement ni limite : une sous-requête évaluée par la base, pour
+    combiner la recherche avec d'autres filtres (admin)
+    """
+    code, modele, champ_titre, champ_contenu = TYPES[type_objet]
+    if index_fts_disponible():
+        requete = requete_fts(texte)
+        if not requete:
+            return Q(pk__in=[])
+        return Q(pk__in=RawSQL(
+            f'SELECT rowid / 4 FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid %% 4 = %s',
+            [requete, code]
+        ))
+    termes = _termes(texte)
+    if not termes:
+        return Q(pk__in=[])
+    resultat = Q()
+    for terme in termes:
+        condition_terme = Q(**{f'{champ_contenu}__icontains': terme})
+        if champ_titre:
+            condition_terme |= Q(**{f'{champ_titre}__icontains': terme})
+        resultat &= condition_terme
+    return resultat
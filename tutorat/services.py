@@ -0,0 +1,47 @@
+from django.db import IntegrityError, transaction
+
+from .models import Inscription, DejaInscrit, Reponse, LectureSujet
+from . import diffusion, notifications, recherche
+
+
+def inscrire_etudiant(etudiant, seance):
+    """
+    Inscrit un étudiant à une séance sans condition de course.
+
+    La vérification de capacité et l'insertion forment une seule opération
+    atomique (UPDATE conditionnel sur Seance.nb_inscrits puis INSERT, voir
+    Inscription.save). Fonctionne à l'identique sous SQLite et PostgreSQL.
+
+    Lève SeanceComplete si la séance est pleine et DejaInscrit si une
+    inscription existe déjà (y compris quand une requête concurrente l'a
+    créée entre-temps).
+    """
+    try:
+        with transaction.atomic():
+            return Inscription.objects.create(
+                etudiant=etudiant,
+                seance=seance,
+                statut='confirmee'
+            )
+    except IntegrityError:
+        raise DejaInscrit("Vous êtes déjà inscrit à cette séance.")
+
+
+def supprimer_sujets(sujets):
+    """
+    Supprime en masse les sujets d'un queryset avec leurs réponses (en
+    cascade) et pointeurs de lecture. L'index de recherche, les compteurs du
+    forum et les flux sont traités une fois pour le lot : les receveurs
+    post_delete s'effacent quand l'origine est un queryset de sujets.
+    Retourne le nombre de sujets supprimés.
+    """
+    sujets = sujets.order_by()
+    pks = sujets.values('pk')
+    with transaction.atomic():
+        recherche.desindexer_requete(Reponse.objects.filter(sujet__in=pks))
+        recherche.desindexer_requete(sujets)
+        LectureSujet.objects.filter(sujet__in=pks).delete()
+        _, supprimes = sujets.delete()
+    notifications.invalider_forum()
+    diffusion.diffuser(diffusion.CANAL_FORUM, diffusion.RESYNCHRONISER)
+    return supprimes.get(sujets.model._meta.label, 0)
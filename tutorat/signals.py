@@ -0,0 +1,171 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import diffusion, notifications, recherche
+from .models import Inscription, Seance, Sujet, Reponse, Conversation, Message, LectureConversation
+
+
+@receiver(post_delete, sender=Inscription)
+def inscription_supprimee(sender, instance, **kwargs):
+    """
+    Libère la place d'une inscription confirmée supprimée.
+    Exécuté dans la transaction du Collector, y compris pour les
+    suppressions en masse (queryset.delete()) et les cascades.
+    """
+    if instance.statut == 'confirmee':
+        Seance.objects.filter(pk=instance.seance_id).update(
+            nb_inscrits=F('nb_inscrits') - 1
+        )
+
+
+@receiver(post_delete, sender=Reponse)
+def reponse_supprimee(sender, instance, origin=None, **kwargs):
+    """
+    Recalcule l'activité du sujet d'une réponse supprimée, dans la
+    transaction du Collector. Inutile quand c'est le sujet lui-même
+    qui est supprimé (cascade).
+    """
+    sujet_supprime = (
+        isinstance(origin, Sujet) and origin.pk == instance.sujet_id
+    ) or getattr(origin, 'model', None) is Sujet
+    if not sujet_supprime:
+        Sujet.objects.filter(pk=instance.sujet_id).recalculer_activite()
+
+
+def _sujets_supprimes_en_masse(origin):
+    """
+    Suppression par un queryset de sujets (services.supprimer_sujets, qui
+    traite l'index et les compteurs une fois pour le lot)
+    """
+    return getattr(origin, 'model', None) is Sujet
+
+
+def _conversation_supprimee(message, origin):
+    return (
+        isinstance(origin, Conversation) and origin.pk == message.conversation_id
+    ) or getattr(origin, 'model', None) is Conversation
+
+
+@receiver(post_delete, sender=Message)
+def message_retire(sender, instance, origin=None, **kwargs):
+    """
+    Recalcule le dernier message de la conversation d'un message supprimé,
+    sauf quand c'est la conversation elle-même qui est supprimée (cascade)
+    """
+    if not _conversation_supprimee(instance, origin):
+        Conversation.objects.filter(pk=instance.conversation_id).recalculer_activite()
+
+
+@receiver(post_save, sender=Seance)
+@receiver(post_save, sender=Sujet)
+@receiver(post_save, sender=Reponse)
+def indexer_recherche(sender, instance, update_fields=None, **kwargs):
+    """
+    Met à jour l'index plein texte, sauf si l'enregistrement ne touche
+    aucun champ indexé (ex. save(update_fields=['statut']))
+    """
+    type_objet = recherche.TYPE_PAR_MODELE[sender]
+    if update_fields and not set(update_fields) & recherche.champs_indexes(type_objet):
+        return
+    recherche.indexer([instance])
+
+
+@receiver(post_delete, sender=Seance)
+@receiver(post_delete, sender=Sujet)
+@receiver(post_delete, sender=Reponse)
+def desindexer_recherche(sender, instance, origin=None, **kwargs):
+    """Retire de l'index plein texte un objet supprimé"""
+    if _sujets_supprimes_en_masse(origin):
+        return
+    recherche.desindexer(instance)
+
+
+@receiver(post_save, sender=Sujet)
+@receiver(post_save, sender=Reponse)
+def forum_modifie(sender, instance, created, **kwargs):
+    """
+    Un nouveau sujet ou une nouvelle réponse change les compteurs de tous.
+    Flux temps réel : un nouveau sujet est non lu pour tous sauf son auteur,
+    une nouvelle réponse l'est pour l'auteur du sujet.
+    """
+    if not created:
+        return
+    notifications.invalider_forum()
+    if sender is Sujet:
+        diffusion.diffuser(diffusion.CANAL_FORUM, {'forum': 1, 'sauf': instance.auteur_id})
+    elif instance.sujet.auteur_id != instance.auteur_id:
+        diffusion.diffuser(diffusion.canal_utilisateur(instance.sujet.auteur_id), {'forum': 1})
+
+
+@receiver(post_delete, sender=Sujet)
+@receiver(post_delete, sender=Reponse)
+def forum_supprime(sender, instance, origin=None, **kwargs):
+    if _sujets_supprimes_en_masse(origin):
+        return
+    notifications.invalider_forum()
+    diffusion.diffuser(diffusion.CANAL_FORUM, diffusion.RESYNCHRONISER)
+
+
+def _destinataires(message):
+    destinataires = list(message.conversation.participants.exclude(
+        pk=message.sender_id
+    ).values_list('pk', flat=True))
+    notifications.invalider_messages(*destinataires)
+    return destinataires
+
+
+@receiver(post_save, sender=Message)
+def message_envoye(sender, instance, created, **kwargs):
+    """
+    Invalide le compteur de messages non lus des destinataires et signale
+    le message aux pages ouvertes sur la conversation
+    """
+    if created:
+        for pk in _destinataires(instance):
+            diffusion.diffuser(diffusion.canal_utilisateur(pk), {'messages': 1})
+        diffusion.diffuser(diffusion.canal_conversation(instance.conversation_id), {'message': instance.pk})
+
+
+@receiver(post_delete, sender=Message)
+def message_supprime(sender, instance, origin=None, **kwargs):
+    """
+    Retire un message supprimé du compteur des destinataires qui ne l'avaient
+    pas lu (les pointeurs d'une conversation supprimée disparaissent avec elle)
+    """
+    if _conversation_supprimee(instance, origin):
+        return
+    non_lu = LectureConversation.objects.filter(
+        conversation_id=instance.conversation_id,
+        dernier_lu__lt=instance.pk,
+        nb_non_lus__gt=0
+    ).exclude(utilisateur_id=instance.sender_id)
+    destinataires = list(non_lu.values_list('utilisateur_id', flat=True))
+    if destinataires:
+        non_lu.filter(utilisateur_id__in=destinataires).update(nb_non_lus=F('nb_non_lus') - 1)
+        notifications.invalider_messages(*destinataires)
+        diffusion.resynchroniser(*destinataires)
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def participants_modifies(sender, instance, action, reverse, pk_set, **kwargs):
+    """Crée ou supprime les pointeurs de lecture avec les participants"""
+    # instance est la conversation, ou l'utilisateur côté inverse
+    champ, autre = ('utilisateur', 'conversation') if reverse else ('conversation', 'utilisateur')
+    if action == 'post_add':
+        LectureConversation.ouvrir([
+            (pk, instance.pk) if reverse else (instance.pk, pk)
+            for pk in pk_set
+        ])
+    elif action == 'post_remove':
+        LectureConversation.objects.filter(**{champ: instance, f'{autre}__in': pk_set}).delete()
+    elif action == 'post_clear':
+        LectureConversation.objects.filter(**{champ: instance}).delete()
+
+
+@receiver(post_delete, sender=LectureConversation)
+def lecture_conversation_supprimee(sender, instance, **kwargs):
+    """Les messages non lus d'un pointeur supprimé sortent du compteur"""
+    if instance.nb_non_lus:
+        notifications.invalider_messages(instance.utilisateur_id)
+        diffusion.resynchroniser(instance.utilisateur_id)
@@ -1,3 +1,1168 @@
-from django.test import TestCase
+import base64
+import json
+import re
+import threading
+import unittest
+from unittest import mock
+from datetime import date, time, timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection, models
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from .models import (
+    BannissementTuteur, Conversation, ConversationQuerySet, DejaInscrit, Inscription, LectureConversation,
+    LectureSujet, Matiere, Message, Reponse, Seance, SeanceComplete, Sujet, User,
+)
+from . import notifications, recherche
+from .forms import FiltreSeancesForm
+from .pagination import encoder_curseur
+from .services import inscrire_etudiant, supprimer_sujets
+
+
+def curseur_forge(valeurs):
+    """Curseur fabriqué à la main, hors encoder_curseur"""
+    return base64.urlsafe_b64encode(json.dumps(valeurs).encode()).decode()
+
+
+# Curseurs mal formés : base64 ou JSON illisible, mauvais nombre de valeurs,
+# valeurs non convertibles, nulles ou non textuelles
+CURSEURS_INVALIDES = (
+    '!!!', 'W10', encoder_curseur(['2026-01-01']), encoder_curseur(['pas une date', '1']),
+    curseur_forge([None, None]), curseur_forge([[1], [2]]), curseur_forge({'pk': 1}),
+)
+
+
+@unittest.skipIf(
+    connection.vendor == 'sqlite' and connection.is_in_memory_db(),
+    "Nécessite une base de test partagée entre threads (pas SQLite en mémoire)"
+)
+class InscriptionConcurrenteTests(TransactionTestCase):
+    """
+    Stress test : des centaines de threads s'inscrivent en même temps
+    à la même séance
+    """
+    NB_THREADS = 200
+    PLACES_MAX = 10
+
+    def setUp(self):
+        tuteur = User.objects.create_user('tuteur', role='tuteur')
+        matiere = Matiere.objects.create(nom='Algèbre', code='ALG1')
+        self.seance = Seance.objects.create(
+            tuteur=tuteur,
+            matiere=matiere,
+            titre='Séance populaire',
+            description='',
+            date=timezone.now().date() + timedelta(days=1),
+            heure_debut=time(10, 0),
+            heure_fin=time(12, 0),
+            lieu='G103',
+            places_max=self.PLACES_MAX,
+        )
+
+    def lancer_en_parallele(self, etudiants):
+        """
+        Inscrit chaque étudiant depuis son propre thread, tous les threads
+        démarrant au même instant. Retourne les résultats par catégorie.
+        """
+        depart = threading.Barrier(len(etudiants))
+        verrou = threading.Lock()
+        resultats = {'inscrits': 0, 'complet': 0, 'deja_inscrit': 0, 'erreurs': []}
+
+        def inscrire(etudiant):
+            try:
+                depart.wait()
+                inscrire_etudiant(etudiant, self.seance)
+                cle = 'inscrits'
+            except SeanceComplete:
+                cle = 'complet'
+            except DejaInscrit:
+                cle = 'deja_inscrit'
+            except Exception as exc:
+                with verrou:
+                    resultats['erreurs'].append(exc)
+                return
+            finally:
+                connection.close()
+            with verrou:
+                resultats[cle] += 1
+
+        threads = [threading.Thread(target=inscrire, args=(e,)) for e in etudiants]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return resultats
+
+    def test_jamais_plus_de_places_max(self):
+        etudiants = [
+            User.objects.create_user(f'etudiant{i}', role='etudiant')
+            for i in range(self.NB_THREADS)
+        ]
+
+        resultats = self.lancer_en_parallele(etudiants)
+
+        self.assertEqual(resultats['erreurs'], [])
+        self.assertEqual(resultats['inscrits'], self.PLACES_MAX)
+        self.assertEqual(resultats['complet'], self.NB_THREADS - self.PLACES_MAX)
+        self.seance.refresh_from_db()
+        self.assertEqual(self.seance.nb_inscrits, self.PLACES_MAX)
+        self.assertEqual(
+            Inscription.objects.filter(seance=self.seance, statut='confirmee').count(),
+            self.PLACES_MAX
+        )
+
+    def test_double_inscription_concurrente(self):
+        etudiant = User.objects.create_user('etudiant', role='etudiant')
+
+        resultats = self.lancer_en_parallele([etudiant] * 50)
+
+        self.assertEqual(resultats['erreurs'], [])
+        self.assertEqual(resultats['inscrits'], 1)
+        self.assertEqual(resultats['deja_inscrit'], 49)
+        self.seance.refresh_from_db()
+        self.assertEqual(self.seance.nb_inscrits, 1)
+
+
+class CompteurInscritsTests(TestCase):
+    """
+    Seance.nb_inscrits tenu à jour par Inscription.save et le signal
+    post_delete
+    """
+
+    def setUp(self):
+        tuteur = User.objects.create_user('tuteur', role='tuteur')
+        matiere = Matiere.objects.create(nom='Algèbre', code='ALG1')
+        self.etudiant = User.objects.create_user('etudiant', role='etudiant')
+        self.seance, self.autre_seance = [
+            Seance.objects.create(
+                tuteur=tuteur,
+                matiere=matiere,
+                titre=titre,
+                description='',
+                date=timezone.now().date() + timedelta(days=1),
+                heure_debut=time(10, 0),
+                heure_fin=time(12, 0),
+                lieu='G103',
+                places_max=2,
+            )
+            for titre in ('Séance', 'Autre séance')
+        ]
+
+    def assertInscrits(self, seance, nombre):
+        seance.refresh_from_db()
+        self.assertEqual(seance.nb_inscrits, nombre)
+
+    def test_creation_modification_suppression(self):
+        inscription = Inscription.objects.create(etudiant=self.etudiant, seance=self.seance)
+        self.assertInscrits(self.seance, 1)
+
+        inscription.statut = 'annulee'
+        inscription.save()
+        self.assertInscrits(self.seance, 0)
+
+        inscription.statut = 'confirmee'
+        inscription.save()
+        self.assertInscrits(self.seance, 1)
+
+        inscription.seance = self.autre_seance
+        inscription.save()
+        self.assertInscrits(self.seance, 0)
+        self.assertInscrits(self.autre_seance, 1)
+
+        inscription.delete()
+        self.assertInscrits(self.autre_seance, 0)
+
+    def test_suppression_en_masse(self):
+        Inscription.objects.create(etudiant=self.etudiant, seance=self.seance)
+        Inscription.objects.create(
+            etudiant=User.objects.create_user('autre', role='etudiant'),
+            seance=self.seance,
+            statut='annulee'
+        )
+        Inscription.objects.all().delete()
+        self.assertInscrits(self.seance, 0)
+
+    def test_seance_complete(self):
+        Inscription.objects.create(etudiant=self.etudiant, seance=self.seance)
+        Inscription.objects.create(etudiant=User.objects.create_user('e2', role='etudiant'), seance=self.seance)
+        with self.assertRaises(SeanceComplete):
+            Inscription.objects.create(etudiant=User.objects.create_user('e3', role='etudiant'), seance=self.seance)
+        self.assertInscrits(self.seance, 2)
+
+    def test_reactivation_dans_la_limite_des_places(self):
+        autres = [User.objects.create_user(f'etudiant{i}', role='etudiant') for i in range(3)]
+        inscrire_etudiant(self.etudiant, self.seance)
+        annulees = [
+            Inscription.objects.create(etudiant=etudiant, seance=self.seance, statut='annulee')
+            for etudiant in autres
+        ]
+
+        resultat = Seance.objects.filter(pk=self.seance.pk).actualiser_statuts()
+
+        self.assertEqual(resultat['inscriptions_reactivees'], 1)
+        self.assertEqual(
+            [i.statut for i in Inscription.objects.filter(pk__in=[i.pk for i in annulees]).order_by('pk')],
+            ['confirmee', 'annulee', 'annulee']
+        )
+        self.assertInscrits(self.seance, 2)
+
+    def test_champs_differes(self):
+        """Un objet chargé sans statut ni séance relit son état en base"""
+        inscription = Inscription.objects.create(etudiant=self.etudiant, seance=self.seance)
+
+        partielle = Inscription.objects.only('commentaire').get(pk=inscription.pk)
+        partielle.commentaire = 'Présent'
+        partielle.save()
+        self.assertInscrits(self.seance, 1)
+
+        partielle = Inscription.objects.defer('seance').get(pk=inscription.pk)
+        partielle.statut = 'annulee'
+        partielle.save()
+        self.assertInscrits(self.seance, 0)
+
+
+class LectureForumTests(TestCase):
+    """
+    Pointeurs de lecture du forum (LectureSujet) et filigrane
+    User.derniere_visite_forum
+    """
+
+    def setUp(self):
+        self.maintenant = timezone.now()
+        self.auteur = User.objects.create_user('auteur', role='etudiant')
+        self.lecteur = User.objects.create_user('lecteur', role='etudiant')
+        self.matiere = Matiere.objects.create(nom='Analyse', code='ANA1')
+        User.objects.filter(pk=self.lecteur.pk).update(derniere_visite_forum=self.il_y_a(90))
+        self.lecteur.refresh_from_db()
+
+    def il_y_a(self, jours):
+        return self.maintenant - timedelta(days=jours)
+
+    def sujet(self, titre, jours=60):
+        sujet = Sujet.objects.create(matiere=self.matiere, auteur=self.auteur, titre=titre, contenu='')
+        Sujet.objects.filter(pk=sujet.pk).update(
+            date_creation=self.il_y_a(jours), derniere_activite=self.il_y_a(jours)
+        )
+        sujet.refresh_from_db()
+        return sujet
+
+    def repondre(self, sujet, jours):
+        reponse = Reponse.objects.create(sujet=sujet, auteur=self.auteur, contenu='')
+        Reponse.objects.filter(pk=reponse.pk).update(date_creation=self.il_y_a(jours))
+        Sujet.objects.filter(pk=sujet.pk).update(derniere_activite=self.il_y_a(jours))
+
+    def lire(self, sujet, jours):
+        LectureSujet.objects.create(utilisateur=self.lecteur, sujet=sujet, date_lecture=self.il_y_a(jours))
+
+    def non_lus(self):
+        self.lecteur.refresh_from_db()
+        return set(Sujet.objects.avec_lecture(self.lecteur, self.lecteur.filigrane_forum()).filter(
+            derniere_activite__gt=models.F('lu_jusqu_a')
+        ).values_list('titre', flat=True))
+
+    def test_marquer_lu(self):
+        sujet = self.sujet('A')
+        self.assertTrue(LectureSujet.marquer_lu(self.lecteur, sujet, sujet.derniere_activite))
+        self.assertFalse(LectureSujet.marquer_lu(self.lecteur, sujet, sujet.derniere_activite))
+        self.assertEqual(self.non_lus(), set())
+        Sujet.objects.filter(pk=sujet.pk).update(derniere_activite=timezone.now())
+        self.assertEqual(self.non_lus(), {'A'})
+
+    def test_compacter_sans_non_lu(self):
+        self.lire(self.sujet('A'), 50)
+        self.lire(self.sujet('B'), 45)
+        self.assertEqual(LectureSujet.compacter(self.il_y_a(30)), (1, 2))
+        self.lecteur.refresh_from_db()
+        self.assertEqual(self.lecteur.derniere_visite_forum, self.il_y_a(30))
+        self.assertEqual(self.non_lus(), set())
+
+    def test_compacter_conserve_les_non_lus(self):
+        self.lire(self.sujet('A'), 50)
+        # Réponse postérieure à la lecture de B
+        b = self.sujet('B')
+        self.lire(b, 55)
+        self.repondre(b, 52)
+        self.lire(self.sujet('C'), 45)
+        # Nouveau sujet après la limite
+        self.sujet('D', 10)
+        avant = self.non_lus()
+        compteurs = Sujet.objects.compter_non_lus(self.lecteur, self.lecteur.filigrane_forum())
+        self.assertEqual(avant, {'B', 'D'})
+
+        LectureSujet.compacter(self.il_y_a(30))
+
+        self.lecteur.refresh_from_db()
+        self.assertEqual(
+            self.lecteur.derniere_visite_forum, self.il_y_a(52) - timedelta(microseconds=1)
+        )
+        self.assertEqual(self.non_lus(), avant)
+        self.assertEqual(
+            Sujet.objects.compter_non_lus(self.lecteur, self.lecteur.filigrane_forum()), compteurs
+        )
+        self.assertEqual(
+            set(LectureSujet.objects.values_list('sujet__titre', flat=True)), {'A', 'C'}
+        )
+
+
+class CacheNotificationsTests(TestCase):
+    """
+    Compteurs mis en cache par notifications.compteurs, invalidés après
+    validation de la transaction d'écriture
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.expediteur = User.objects.create_user('expediteur', role='etudiant')
+        self.destinataire = User.objects.create_user('destinataire', role='etudiant')
+        self.conversation, _ = Conversation.objects.obtenir_ou_creer(self.expediteur, self.destinataire)
+
+    def test_compteur_apres_validation(self):
+        self.assertEqual(notifications.compteurs(self.destinataire)[0], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Message.objects.create(conversation=self.conversation, sender=self.expediteur, content='Bonjour')
+            # Lecture concurrente avant la validation : remet en cache l'ancien compteur
+            cache.set(notifications._cle_messages(self.destinataire.pk), 0)
+        self.assertEqual(notifications.compteurs(self.destinataire)[0], 1)
+
+    def test_forum_apres_validation(self):
+        self.assertEqual(notifications.compteurs(self.destinataire)[1], 0)
+        matiere = Matiere.objects.create(nom='Physique', code='PHY1')
+        with self.captureOnCommitCallbacks(execute=True):
+            Sujet.objects.create(matiere=matiere, auteur=self.expediteur, titre='Question', contenu='')
+        self.assertEqual(notifications.compteurs(self.destinataire)[1], 1)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_cache_local_au_processus(self):
+        # Rien n'est mis en cache : une invalidation n'atteindrait pas les autres processus
+        self.assertFalse(notifications.cache_partage())
+        self.assertEqual(notifications.compteurs(self.destinataire)[0], 0)
+        Message.objects.create(conversation=self.conversation, sender=self.expediteur, content='Bonjour')
+        self.assertEqual(notifications.compteurs(self.destinataire)[0], 1)
+
+    def test_pas_d_invalidation_sans_validation(self):
+        notifications.compteurs(self.destinataire)
+        with self.captureOnCommitCallbacks() as rappels:
+            notifications.invalider_messages(self.destinataire.pk)
+        self.assertIsNotNone(cache.get(notifications._cle_messages(self.destinataire.pk)))
+        self.assertEqual(len(rappels), 1)
+
+
+class ActiviteSujetTests(TestCase):
+    """
+    Activité dénormalisée de Sujet (nb_reponses, dernière réponse,
+    derniere_activite) tenue à jour par Reponse.save et le signal post_delete
+    """
+
+    def setUp(self):
+        self.auteur = User.objects.create_user('auteur', role='etudiant')
+        self.tuteur = User.objects.create_user('tuteur', role='tuteur')
+        matiere = Matiere.objects.create(nom='Chimie', code='CHI1')
+        self.sujet = Sujet.objects.create(matiere=matiere, auteur=self.auteur, titre='Question', contenu='')
+
+    def assertActivite(self, nb_reponses, derniere=None):
+        self.sujet.refresh_from_db()
+        self.assertEqual(self.sujet.nb_reponses, nb_reponses)
+        if derniere is None:
+            self.assertIsNone(self.sujet.derniere_reponse_date)
+            self.assertIsNone(self.sujet.dernier_repondant_id)
+            # À la création, le défaut timezone.now précède de peu auto_now_add
+            self.assertAlmostEqual(
+                self.sujet.derniere_activite, self.sujet.date_creation, delta=timedelta(seconds=1)
+            )
+        else:
+            self.assertEqual(self.sujet.derniere_reponse_date, derniere.date_creation)
+            self.assertEqual(self.sujet.dernier_repondant_id, derniere.auteur_id)
+            self.assertEqual(self.sujet.derniere_activite, derniere.date_creation)
+
+    def test_creation_modification_suppression(self):
+        self.assertActivite(0)
+        premiere = Reponse.objects.create(sujet=self.sujet, auteur=self.tuteur, contenu='Voir le cours')
+        self.assertActivite(1, premiere)
+        seconde = Reponse.objects.create(sujet=self.sujet, auteur=self.auteur, contenu='Merci')
+        self.assertActivite(2, seconde)
+
+        premiere.contenu = 'Voir le chapitre 2'
+        premiere.save()
+        self.assertActivite(2, seconde)
+
+        seconde.delete()
+        self.assertActivite(1, premiere)
+        premiere.delete()
+        self.assertActivite(0)
+
+    def test_reponses_validees_dans_le_desordre(self):
+        recente = Reponse.objects.create(sujet=self.sujet, auteur=self.tuteur, contenu='Voir le cours')
+        # Réponse datée avant, validée après
+        with mock.patch('django.utils.timezone.now', return_value=recente.date_creation - timedelta(seconds=5)):
+            Reponse.objects.create(sujet=self.sujet, auteur=self.auteur, contenu='Merci')
+        self.assertActivite(2, recente)
+
+    def test_suppression_en_masse(self):
+        for contenu in ('a', 'b', 'c'):
+            derniere = Reponse.objects.create(sujet=self.sujet, auteur=self.tuteur, contenu=contenu)
+        Reponse.objects.exclude(pk=derniere.pk).delete()
+        self.assertActivite(1, derniere)
+
+    def test_suppression_du_sujet(self):
+        Reponse.objects.create(sujet=self.sujet, auteur=self.tuteur, contenu='a')
+        self.sujet.delete()
+        self.assertFalse(Reponse.objects.exists())
+
+
+class ActiviteConversationTests(TestCase):
+    """
+    Dernier message dénormalisé de Conversation (derniere_activite,
+    dernier_apercu) tenu à jour par Message.save et le signal post_delete
+    """
+
+    def setUp(self):
+        self.etudiant = User.objects.create_user('etudiant', role='etudiant')
+        self.tuteur = User.objects.create_user('tuteur', role='tuteur')
+        self.conversation, _ = Conversation.objects.obtenir_ou_creer(self.etudiant, self.tuteur)
+
+    def envoyer(self, expediteur, contenu):
+        return Message.objects.create(conversation=self.conversation, sender=expediteur, content=contenu)
+
+    def assertDernier(self, message):
+        self.conversation.refresh_from_db()
+        if message is None:
+            self.assertEqual(self.conversation.derniere_activite, self.conversation.created_at)
+            self.assertEqual(self.conversation.dernier_apercu, '')
+        else:
+            self.assertEqual(self.conversation.derniere_activite, message.created_at)
+            self.assertEqual(
+                self.conversation.dernier_apercu, message.content[:Conversation.LONGUEUR_APERCU]
+            )
+
+    def test_envoi_et_suppression(self):
+        premier = self.envoyer(self.etudiant, 'Bonjour')
+        self.assertDernier(premier)
+        second = self.envoyer(self.tuteur, 'x' * (Conversation.LONGUEUR_APERCU + 50))
+        self.assertDernier(second)
+
+        premier.content = 'Bonjour !'
+        premier.save()
+        self.assertDernier(second)
+
+        second.delete()
+        self.assertDernier(premier)
+        Message.objects.all().delete()
+        self.assertDernier(None)
+
+    def test_messages_valides_dans_le_desordre(self):
+        recent = self.envoyer(self.etudiant, 'Bonjour')
+        # Message daté avant, validé après
+        with mock.patch('django.utils.timezone.now', return_value=recent.created_at - timedelta(seconds=5)):
+            self.envoyer(self.tuteur, 'Bonjour, que puis-je faire ?')
+        self.assertDernier(recent)
+
+    def test_boite_de_reception(self):
+        self.envoyer(self.etudiant, 'Bonjour')
+        dernier = self.envoyer(self.tuteur, 'Bonjour, que puis-je faire ?')
+        conversation = Conversation.objects.boite_de_reception(self.etudiant).get()
+        self.assertEqual(conversation.autre_id, self.tuteur.pk)
+        self.assertEqual(conversation.derniere_activite, dernier.created_at)
+        self.assertEqual(conversation.dernier_apercu, dernier.content)
+
+    def test_suppression_de_la_conversation(self):
+        self.envoyer(self.etudiant, 'Bonjour')
+        self.conversation.delete()
+        self.assertFalse(Message.objects.exists())
+        self.assertFalse(LectureConversation.objects.exists())
+
+
+class MessagesNonLusTests(TestCase):
+    """
+    LectureConversation.nb_non_lus tenu à jour par Message.save, les
+    signaux post_delete et m2m_changed, et marquer_lu
+    """
+
+    def setUp(self):
+        self.etudiant = User.objects.create_user('etudiant', role='etudiant')
+        self.tuteur = User.objects.create_user('tuteur', role='tuteur')
+        self.autre = User.objects.create_user('autre', role='tuteur')
+        self.conversation, _ = Conversation.objects.obtenir_ou_creer(self.etudiant, self.tuteur)
+
+    def envoyer(self, expediteur, contenu='Bonjour'):
+        return Message.objects.create(conversation=self.conversation, sender=expediteur, content=contenu)
+
+    def non_lus(self, utilisateur):
+        return LectureConversation.objects.get(
+            utilisateur=utilisateur, conversation=self.conversation
+        ).nb_non_lus
+
+    def test_envoi(self):
+        self.envoyer(self.tuteur)
+        self.envoyer(self.tuteur)
+        self.envoyer(self.etudiant)
+        self.assertEqual(self.non_lus(self.etudiant), 2)
+        self.assertEqual(self.non_lus(self.tuteur), 1)
+        self.assertEqual(notifications.compter_messages_non_lus(self.etudiant), 2)
+        conversation = Conversation.objects.boite_de_reception(self.etudiant).get()
+        self.assertEqual(conversation.nb_non_lus, 2)
+
+    def test_marquer_lu(self):
+        premier = self.envoyer(self.tuteur)
+        self.envoyer(self.etudiant)
+        dernier = self.envoyer(self.tuteur)
+        self.assertTrue(LectureConversation.marquer_lu(self.etudiant, self.conversation, premier))
+        self.assertEqual(self.non_lus(self.etudiant), 1)
+        self.assertTrue(LectureConversation.marquer_lu(self.etudiant, self.conversation, dernier))
+        self.assertEqual(self.non_lus(self.etudiant), 0)
+        # Le pointeur ne recule pas
+        self.assertFalse(LectureConversation.marquer_lu(self.etudiant, self.conversation, premier))
+        self.assertEqual(self.non_lus(self.etudiant), 0)
+
+    def test_suppression(self):
+        lu = self.envoyer(self.tuteur)
+        LectureConversation.marquer_lu(self.etudiant, self.conversation, lu)
+        non_lu = self.envoyer(self.tuteur)
+        self.envoyer(self.tuteur)
+        self.assertEqual(self.non_lus(self.etudiant), 2)
+
+        # Un message déjà lu ne change pas le compteur
+        lu.delete()
+        self.assertEqual(self.non_lus(self.etudiant), 2)
+        non_lu.delete()
+        self.assertEqual(self.non_lus(self.etudiant), 1)
+        # Son propre message ne compte pas
+        self.envoyer(self.etudiant).delete()
+        self.assertEqual(self.non_lus(self.etudiant), 1)
+        Message.objects.all().delete()
+        self.assertEqual(self.non_lus(self.etudiant), 0)
+
+    def test_participants(self):
+        self.envoyer(self.tuteur)
+        # Un nouveau participant a lu la conversation jusqu'au dernier message
+        self.conversation.participants.add(self.autre)
+        self.assertEqual(self.non_lus(self.autre), 0)
+        self.envoyer(self.tuteur)
+        self.assertEqual(self.non_lus(self.autre), 1)
+        self.assertEqual(self.non_lus(self.etudiant), 2)
+
+        self.conversation.participants.remove(self.autre)
+        self.assertFalse(LectureConversation.objects.filter(utilisateur=self.autre).exists())
+        self.assertEqual(notifications.compter_messages_non_lus(self.autre), 0)
+        # Côté inverse de la relation
+        self.etudiant.conversations.remove(self.conversation)
+        self.assertFalse(LectureConversation.objects.filter(utilisateur=self.etudiant).exists())
+        self.conversation.participants.clear()
+        self.assertFalse(LectureConversation.objects.exists())
+
+    def test_cache_apres_envoi(self):
+        cache.clear()
+        self.assertEqual(notifications.compteurs(self.etudiant)[0], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.envoyer(self.tuteur)
+        self.assertEqual(notifications.compteurs(self.etudiant)[0], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conversation.participants.remove(self.etudiant)
+        self.assertEqual(notifications.compteurs(self.etudiant)[0], 0)
+
+
+class CalendrierTestCase(TestCase):
+    """
+    Une séance modifiée pour la dernière fois il y a longtemps : une
+    inscription doit invalider le cache du client même quand aucune
+    date_modification n'avance
+    """
+
+    def setUp(self):
+        self.tuteur = User.objects.create_user('tuteur', role='tuteur')
+        self.etudiant = User.objects.create_user('etudiant', role='etudiant')
+        matiere = Matiere.objects.create(nom='Algèbre', code='ALG1')
+        self.seance = Seance.objects.create(
+            tuteur=self.tuteur,
+            matiere=matiere,
+            titre='Séance',
+            description='',
+            date=timezone.now().date() + timedelta(days=1),
+            heure_debut=time(10, 0),
+            heure_fin=time(12, 0),
+            lieu='G103',
+            places_max=2,
+        )
+        # Séance modifiée pour la dernière fois il y a longtemps
+        Seance.objects.filter(pk=self.seance.pk).update(
+            date_modification=timezone.now() - timedelta(days=30)
+        )
+
+
+class CalendrierIcsTests(CalendrierTestCase):
+    """Validateurs HTTP du flux iCalendar"""
+
+    def url(self, utilisateur):
+        return reverse('calendrier_ics', args=[utilisateur.get_jeton_calendrier()])
+
+    def test_inscription_apres_if_modified_since(self):
+        url = self.url(self.etudiant)
+        reponse = self.client.get(url)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertNotIn('Last-Modified', reponse)
+
+        inscrire_etudiant(self.etudiant, self.seance)
+        reponse = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(reponse.status_code, 200)
+        self.assertIn('Séance', b''.join(reponse.streaming_content).decode())
+
+    def test_etag(self):
+        url = self.url(self.tuteur)
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        inscrire_etudiant(self.etudiant, self.seance)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CalendrierApiTests(CalendrierTestCase):
+    """Validateurs HTTP des flux JSON des calendriers"""
+
+    def test_inscription_apres_if_modified_since(self):
+        self.client.force_login(self.etudiant)
+        url = reverse('api_seances_etudiant')
+        reponse = self.client.get(url)
+        self.assertEqual(reponse.json(), [])
+        self.assertNotIn('Last-Modified', reponse)
+
+        inscrire_etudiant(self.etudiant, self.seance)
+        reponse = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(len(reponse.json()), 1)
+
+    def test_etag_tuteur(self):
+        self.client.force_login(self.tuteur)
+        url = reverse('api_seances_tuteur')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        inscrire_etudiant(self.etudiant, self.seance)
+        reponse = self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(reponse.status_code, 200)
+
+
+class SuppressionSujetsTests(TestCase):
+    """Suppression groupée de la modération (services.supprimer_sujets)"""
+
+    def setUp(self):
+        self.auteur = User.objects.create_user('auteur', role='etudiant')
+        self.tuteur = User.objects.create_user('tuteur', role='tuteur')
+        matiere = Matiere.objects.create(nom='Biologie', code='BIO1')
+        self.sujets = []
+        for titre in ('Cellule', 'Mitose', 'Photosynthese'):
+            sujet = Sujet.objects.create(matiere=matiere, auteur=self.auteur, titre=titre, contenu=titre)
+            Reponse.objects.create(sujet=sujet, auteur=self.tuteur, contenu=f'{titre} voir cours')
+            LectureSujet.objects.create(utilisateur=self.tuteur, sujet=sujet, date_lecture=timezone.now())
+            self.sujets.append(sujet)
+
+    def test_supprimer_sujets(self):
+        garde = self.sujets[2]
+        with self.captureOnCommitCallbacks(execute=True) as rappels:
+            nombre = supprimer_sujets(Sujet.objects.exclude(pk=garde.pk))
+        self.assertEqual(nombre, 2)
+        self.assertEqual(list(Sujet.objects.all()), [garde])
+        self.assertEqual(list(Reponse.objects.values_list('sujet', flat=True)), [garde.pk])
+        self.assertEqual(list(LectureSujet.objects.values_list('sujet', flat=True)), [garde.pk])
+        # Invalidation et diffusion une seule fois pour le lot
+        self.assertEqual(len(rappels), 2)
+        garde.refresh_from_db()
+        self.assertEqual(garde.nb_reponses, 1)
+
+    def test_index_de_recherche(self):
+        if not recherche.index_fts_disponible():
+            self.skipTest("index FTS5 indisponible")
+        supprimer_sujets(Sujet.objects.filter(titre='Cellule'))
+        self.assertFalse(Sujet.objects.filter(recherche.condition('cellule', 'sujet')).exists())
+        self.assertFalse(Reponse.objects.filter(recherche.condition('cellule', 'reponse')).exists())
+        self.assertTrue(Sujet.objects.filter(recherche.condition('mitose', 'sujet')).exists())
+        with connection.cursor() as curseur:
+            curseur.execute(f'SELECT COUNT(*) FROM {recherche.TABLE}')
+            self.assertEqual(curseur.fetchone()[0], 4)
+
+
+class CreationSerieTests(TestCase):
+    """Création d'une série de séances (creer_seance, SeanceForm.save_serie)"""
+
+    def setUp(self):
+        self.tuteur = User.objects.create_user('tuteur', role='tuteur')
+        self.matiere = Matiere.objects.create(nom='Algèbre', code='ALG1')
+        self.client.force_login(self.tuteur)
+        aujourdhui = date.today()
+        # Prochain lundi (jamais aujourd'hui ni un dimanche)
+        self.lundi = aujourdhui + timedelta(days=(7 - aujourdhui.weekday()) or 7)
+
+    def creer(self, **donnees):
+        return self.client.post(reverse('creer_seance'), {
+            'matiere': self.matiere.pk,
+            'titre': 'Révision',
+            'description': '',
+            'date': self.lundi.isoformat(),
+            'heure_debut': '10:00',
+            'heure_fin': '12:00',
+            'lieu': 'G103',
+            'places_max': 10,
+            'statut': 'planifiee',
+            **donnees,
+        })
+
+    def assertErreur(self, reponse, message):
+        self.assertEqual(reponse.status_code, 200)
+        self.assertIn(message, reponse.context['form'].non_field_errors()[0])
+        self.assertFalse(Seance.objects.exists())
+
+    def test_serie_hebdomadaire(self):
+        reponse = self.creer(repetition='hebdomadaire', date_fin_repetition=(self.lundi + timedelta(weeks=3)).isoformat())
+        self.assertRedirects(reponse, reverse('liste_seances_tuteur'))
+        self.assertEqual(
+            list(Seance.objects.order_by('debut').values_list('date', flat=True)),
+            [self.lundi + timedelta(weeks=n) for n in range(4)]
+        )
+        seance = Seance.objects.first()
+        self.assertEqual(seance.debut, Seance.instant(seance.date, time(10, 0)))
+
+    def test_serie_bihebdomadaire(self):
+        self.creer(repetition='bihebdomadaire', date_fin_repetition=(self.lundi + timedelta(weeks=5)).isoformat())
+        self.assertEqual(Seance.objects.count(), 3)
+
+    def test_fin_absente(self):
+        self.assertErreur(self.creer(repetition='hebdomadaire'), "jusqu'à quelle date")
+
+    def test_fin_avant_le_debut(self):
+        reponse = self.creer(repetition='hebdomadaire', date_fin_repetition=(self.lundi - timedelta(days=1)).isoformat())
+        self.assertErreur(reponse, 'après la première séance')
+
+    def test_fin_au_dela_de_six_mois(self):
+        reponse = self.creer(
+            repetition='hebdomadaire', date_fin_repetition=(date.today() + timedelta(days=181)).isoformat()
+        )
+        self.assertErreur(reponse, '6 mois')
+
+    def test_une_occurrence_en_conflit(self):
+        existante = Seance.objects.create(
+            tuteur=self.tuteur, matiere=self.matiere, titre='Existante', description='',
+            date=self.lundi + timedelta(weeks=2), heure_debut=time(11, 0), heure_fin=time(13, 0),
+            lieu='G103', places_max=10,
+        )
+        reponse = self.creer(repetition='hebdomadaire', date_fin_repetition=(self.lundi + timedelta(weeks=3)).isoformat())
+        self.assertEqual(reponse.status_code, 200)
+        self.assertIn('Existante', reponse.context['form'].non_field_errors()[0])
+        # Aucune occurrence de la série n'est créée
+        self.assertEqual(list(Seance.objects.all()), [existante])
+
+    def test_annulation_de_toute_la_serie(self):
+        with mock.patch('tutorat.forms.recherche.indexer', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.creer(repetition='hebdomadaire', date_fin_repetition=(self.lundi + timedelta(weeks=3)).isoformat())
+        self.assertFalse(Seance.objects.exists())
+
+
+class SeancesDisponiblesTests(TestCase):
+    """
+    Séances ouvertes à un étudiant (SeanceQuerySet.disponibles_pour), filtres
+    et pagination par curseur de la liste étudiante
+    """
+
+    def setUp(self):
+        self.etudiant = User.objects.create_user('etudiant', role='etudiant')
+        self.tuteur = User.objects.create_user('tuteur', role='tuteur')
+        self.autre_tuteur = User.objects.create_user('autre', role='tuteur')
+        self.matiere = Matiere.objects.create(nom='Algèbre', code='ALG1')
+        self.autre_matiere = Matiere.objects.create(nom='Physique', code='PHY1')
+        self.demain = date.today() + timedelta(days=1)
+
+    def seance(self, titre, jours=1, heure=10, **champs):
+        valeurs = {
+            'tuteur': self.tuteur, 'matiere': self.matiere, 'description': '', 'lieu': 'G103',
+            'date': date.today() + timedelta(days=jours),
+            'heure_debut': time(heure, 0), 'heure_fin': time(heure + 1, 0), 'places_max': 2,
+            **champs,
+        }
+        return Seance.objects.create(titre=titre, **valeurs)
+
+    def disponibles(self, **filtres):
+        seances = Seance.objects.disponibles_pour(self.etudiant)
+        if filtres:
+            seances = FiltreSeancesForm(filtres).filtrer(seances)
+        return set(seances.values_list('titre', flat=True))
+
+    def test_exclusions(self):
+        self.seance('Ouverte')
+        self.seance('Passée', jours=-1)
+        self.seance('Annulée', statut='annulee')
+        self.seance('Bannie', tuteur=self.autre_tuteur)
+        BannissementTuteur.objects.create(tuteur=self.autre_tuteur, etudiant=self.etudiant, raison='')
+        inscrire_etudiant(self.etudiant, self.seance('Inscrite'))
+        desinscrite = self.seance('Désinscrite')
+        Inscription.objects.create(etudiant=self.etudiant, seance=desinscrite, statut='annulee')
+
+        self.assertEqual(self.disponibles(), {'Ouverte', 'Désinscrite'})
+
+    def test_places_libres(self):
+        seance = self.seance('Presque pleine')
+        inscrire_etudiant(User.objects.create_user('autre_etudiant', role='etudiant'), seance)
+        self.assertEqual(Seance.objects.disponibles_pour(self.etudiant).get().places_libres, 1)
+        inscrire_etudiant(User.objects.create_user('dernier', role='etudiant'), seance)
+        self.assertEqual(self.disponibles(places_libres='on'), set())
+        self.assertEqual(self.disponibles(), {'Presque pleine'})
+
+    def test_filtres(self):
+        self.seance('Demain')
+        self.seance('Dans une semaine', jours=7)
+        self.seance('Autre tuteur', tuteur=self.autre_tuteur)
+        self.seance('Autre matière', matiere=self.autre_matiere)
+
+        self.assertEqual(self.disponibles(matiere=self.autre_matiere.pk), {'Autre matière'})
+        self.assertEqual(self.disponibles(tuteur=self.autre_tuteur.pk), {'Autre tuteur'})
+        semaine = (date.today() + timedelta(days=7)).isoformat()
+        self.assertEqual(self.disponibles(date_min=semaine), {'Dans une semaine'})
+        # Borne de fin incluse : toute la journée
+        self.assertEqual(
+            self.disponibles(date_max=self.demain.isoformat()),
+            {'Demain', 'Autre tuteur', 'Autre matière'}
+        )
+        # Filtre invalide ignoré
+        self.assertEqual(len(self.disponibles(date_min='pas une date')), 4)
+
+    def parcourir(self, url, **parametres):
+        """Titres de chaque page en suivant le curseur jusqu'à la fin"""
+        pages = []
+        while True:
+            reponse = self.client.get(url, parametres)
+            self.assertEqual(reponse.status_code, 200)
+            page = reponse.context['seances']
+            pages.append([seance.titre for seance in page])
+            if not page.a_suivante:
+                return pages
+            parametres['curseur'] = page.curseur_suivant
+
+    @mock.patch('tutorat.views.SEANCES_PAR_PAGE', 2)
+    def test_pagination_par_curseur(self):
+        # Trois séances au même horaire : départagées par la clé primaire
+        for titre in ('A', 'B', 'C'):
+            self.seance(titre, heure=10, tuteur=User.objects.create_user(f'tuteur_{titre}', role='tuteur'))
+        self.seance('D', heure=9)
+        self.seance('E', jours=2)
+        self.client.force_login(self.etudiant)
+
+        pages = self.parcourir(reverse('liste_seances_etudiant'))
+
+        self.assertEqual(pages, [['D', 'A'], ['B', 'C'], ['E']])
+
+    @mock.patch('tutorat.views.SEANCES_PAR_PAGE', 2)
+    def test_pagination_avec_filtre(self):
+        for titre in ('A', 'B', 'C'):
+            self.seance(titre)
+        self.seance('Physique', matiere=self.autre_matiere)
+        self.client.force_login(self.etudiant)
+
+        pages = self.parcourir(reverse('liste_seances_etudiant'), matiere=self.matiere.pk)
+
+        self.assertEqual(pages, [['A', 'B'], ['C']])
+
+    def test_curseur_invalide(self):
+        self.seance('A')
+        self.client.force_login(self.etudiant)
+        url = reverse('liste_seances_etudiant')
+        for curseur in CURSEURS_INVALIDES:
+            reponse = self.client.get(url, {'curseur': curseur})
+            # Retour à la première page plutôt qu'une erreur
+            self.assertEqual(reponse.status_code, 200)
+            self.assertEqual([seance.titre for seance in reponse.context['seances']], ['A'])
+
+
+class PaginationReponsesTests(TestCase):
+    """
+    Réponses d'un sujet paginées par curseur (date_creation, pk) :
+    forum_sujet et le fragment JSON forum_sujet_reponses
+    """
+
+    def setUp(self):
+        self.debut = timezone.now() - timedelta(hours=1)
+        self.auteur = User.objects.create_user('auteur', role='etudiant')
+        self.lecteur = User.objects.create_user('lecteur', role='etudiant')
+        matiere = Matiere.objects.create(nom='Analyse', code='ANA1')
+        self.sujet = Sujet.objects.create(matiere=matiere, auteur=self.auteur, titre='Limites', contenu='')
+        self.client.force_login(self.lecteur)
+
+    def repondre(self, contenu, minutes):
+        reponse = Reponse.objects.create(sujet=self.sujet, auteur=self.auteur, contenu=contenu)
+        Reponse.objects.filter(pk=reponse.pk).update(date_creation=self.debut + timedelta(minutes=minutes))
+        return reponse
+
+    def parcourir(self):
+        """Contenus de chaque page de forum_sujet en suivant le curseur"""
+        url = reverse('forum_sujet', args=[self.sujet.pk])
+        pages, parametres = [], {}
+        while True:
+            reponse = self.client.get(url, parametres)
+            self.assertEqual(reponse.status_code, 200)
+            page = reponse.context['reponses']
+            pages.append([r.contenu for r in page])
+            if not page.a_suivante:
+                return pages
+            parametres['curseur'] = page.curseur_suivant
+
+    @mock.patch('tutorat.views.REPONSES_PAR_PAGE', 2)
+    def test_egalites_sur_la_date(self):
+        self.repondre('A', 1)
+        # Trois réponses à la même date : départagées par la clé primaire
+        for contenu in ('B', 'C', 'D'):
+            self.repondre(contenu, 2)
+        self.repondre('E', 3)
+
+        self.assertEqual(self.parcourir(), [['A', 'B'], ['C', 'D'], ['E']])
+
+    @mock.patch('tutorat.views.REPONSES_PAR_PAGE', 2)
+    def test_derniere_page_complete(self):
+        self.assertEqual(self.parcourir(), [[]])
+        for minutes, contenu in enumerate('ABCD'):
+            self.repondre(contenu, minutes)
+
+        # Pas de page vide après une dernière page pleine
+        self.assertEqual(self.parcourir(), [['A', 'B'], ['C', 'D']])
+
+    @mock.patch('tutorat.views.REPONSES_PAR_PAGE', 2)
+    def test_reponses_suivantes_json(self):
+        reponses = [self.repondre(contenu, 1) for contenu in 'ABCDE']
+        page = self.client.get(reverse('forum_sujet', args=[self.sujet.pk])).context['reponses']
+        url = reverse('forum_sujet_reponses', args=[self.sujet.pk])
+
+        pks, curseur = [], page.curseur_suivant
+        while curseur:
+            donnees = self.client.get(url, {'curseur': curseur}).json()
+            pks.append([int(pk) for pk in re.findall(r'id="reponse-(\d+)"', donnees['html'])])
+            curseur = donnees['curseur_suivant']
+
+        self.assertEqual(pks, [[reponses[2].pk, reponses[3].pk], [reponses[4].pk]])
+
+    def test_curseur_invalide(self):
+        self.repondre('A', 1)
+        for curseur in CURSEURS_INVALIDES:
+            with self.subTest(curseur=curseur):
+                # Page complète : retour à la première page
+                reponse = self.client.get(reverse('forum_sujet', args=[self.sujet.pk]), {'curseur': curseur})
+                self.assertEqual(reponse.status_code, 200)
+                self.assertEqual([r.contenu for r in reponse.context['reponses']], ['A'])
+                # Fragment : erreur client
+                reponse = self.client.get(
+                    reverse('forum_sujet_reponses', args=[self.sujet.pk]), {'curseur': curseur}
+                )
+                self.assertEqual(reponse.status_code, 400)
+
+
+class PaginationMessagesTests(TestCase):
+    """
+    Historique d'une conversation paginé par curseur (created_at, id), du
+    plus récent au plus ancien : messagerie_conversation_detail puis le
+    fragment JSON messagerie_historique
+    """
+
+    def setUp(self):
+        self.debut = timezone.now() - timedelta(hours=1)
+        self.etudiant = User.objects.create_user('etudiant', role='etudiant')
+        self.tuteur = User.objects.create_user('tuteur', role='tuteur')
+        self.conversation, _ = Conversation.objects.obtenir_ou_creer(self.etudiant, self.tuteur)
+        self.client.force_login(self.etudiant)
+
+    def envoyer(self, contenu, minutes):
+        message = Message.objects.create(conversation=self.conversation, sender=self.tuteur, content=contenu)
+        Message.objects.filter(pk=message.pk).update(created_at=self.debut + timedelta(minutes=minutes))
+        return message
+
+    def parcourir(self):
+        """Contenus de chaque page, de la plus récente à la plus ancienne"""
+        reponse = self.client.get(reverse('messagerie_conversation_detail', args=[self.conversation.pk]))
+        self.assertEqual(reponse.status_code, 200)
+        pages = [[message.content for message in reponse.context['messages_list']]]
+        url = reverse('messagerie_historique', args=[self.conversation.pk])
+        curseur = reponse.context['curseur_historique']
+        while curseur:
+            reponse = self.client.get(url, {'curseur': curseur})
+            self.assertEqual(reponse.status_code, 200)
+            donnees = reponse.json()
+            pks = [int(pk) for pk in re.findall(r'data-message="(\d+)"', donnees['html'])]
+            pages.append([Message.objects.get(pk=pk).content for pk in pks])
+            curseur = donnees['curseur_suivant']
+        return pages
+
+    @mock.patch('tutorat.views.MESSAGES_PAR_PAGE', 2)
+    def test_egalites_sur_la_date(self):
+        self.envoyer('A', 1)
+        # Trois messages à la même date : départagés par la clé primaire
+        for contenu in ('B', 'C', 'D'):
+            self.envoyer(contenu, 2)
+        self.envoyer('E', 3)
+
+        # Chaque page dans l'ordre chronologique
+        self.assertEqual(self.parcourir(), [['D', 'E'], ['B', 'C'], ['A']])
+
+    @mock.patch('tutorat.views.MESSAGES_PAR_PAGE', 2)
+    def test_derniere_page_complete(self):
+        self.assertEqual(self.parcourir(), [[]])
+        for minutes, contenu in enumerate('ABCD'):
+            self.envoyer(contenu, minutes)
+
+        # Pas de page vide après une dernière page pleine
+        self.assertEqual(self.parcourir(), [['C', 'D'], ['A', 'B']])
+
+    def test_curseur_invalide(self):
+        self.envoyer('A', 1)
+        url = reverse('messagerie_historique', args=[self.conversation.pk])
+        for curseur in CURSEURS_INVALIDES:
+            with self.subTest(curseur=curseur):
+                self.assertEqual(self.client.get(url, {'curseur': curseur}).status_code, 400)
+
+    def test_conversation_d_un_autre(self):
+        self.envoyer('A', 1)
+        self.client.force_login(User.objects.create_user('intrus', role='etudiant'))
+        url = reverse('messagerie_historique', args=[self.conversation.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class PaireConversationTests(TestCase):
+    """
+    Clé canonique (participant_min, participant_max) d'une conversation et
+    ConversationQuerySet.obtenir_ou_creer
+    """
+
+    def setUp(self):
+        self.etudiant = User.objects.create_user('etudiant', role='etudiant')
+        self.tuteur = User.objects.create_user('tuteur', role='tuteur')
+
+    def test_obtenir_ou_creer(self):
+        conversation, creee = Conversation.objects.obtenir_ou_creer(self.tuteur, self.etudiant)
+        self.assertTrue(creee)
+        self.assertEqual(
+            (conversation.participant_min_id, conversation.participant_max_id),
+            (self.etudiant.pk, self.tuteur.pk)
+        )
+        self.assertEqual(set(conversation.participants.all()), {self.etudiant, self.tuteur})
+        # Même paire dans l'autre sens
+        self.assertEqual(
+            Conversation.objects.obtenir_ou_creer(self.etudiant, self.tuteur), (conversation, False)
+        )
+
+    def test_creation_concurrente(self):
+        existante, _ = Conversation.objects.obtenir_ou_creer(self.etudiant, self.tuteur)
+        # Requête concurrente : la conversation n'existait pas encore à la lecture
+        with mock.patch.object(ConversationQuerySet, 'first', return_value=None):
+            conversation, creee = Conversation.objects.obtenir_ou_creer(self.tuteur, self.etudiant)
+
+        self.assertEqual((conversation, creee), (existante, False))
+        self.assertEqual(Conversation.objects.count(), 1)
+        self.assertEqual(existante.participants.count(), 2)
+
+
+class MigrationPaireConversationTests(TransactionTestCase):
+    """
+    Migration 0013_conversation_paire : fusion des conversations en double
+    pour une même paire avant la contrainte d'unicité
+    """
+
+    avant = [('tutorat', '0012_message_indexes')]
+    apres = [('tutorat', '0013_conversation_paire')]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.avant)
+        self.executor.loader.build_graph()
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_fusion_des_doublons(self):
+        apps = self.executor.loader.project_state(self.avant).apps
+        Conversation = apps.get_model('tutorat', 'Conversation')
+        Message = apps.get_model('tutorat', 'Message')
+        a, b, c = (apps.get_model('tutorat', 'User').objects.create(username=nom) for nom in 'abc')
+        maintenant = timezone.now()
+
+        def conversation(jours, *participants, messages=()):
+            conv = Conversation.objects.create()
+            Conversation.objects.filter(pk=conv.pk).update(created_at=maintenant - timedelta(days=jours))
+            conv.participants.add(*participants)
+            for heures, contenu in messages:
+                Message.objects.create(conversation=conv, sender=participants[0], content=contenu)
+                Message.objects.filter(content=contenu).update(
+                    created_at=maintenant - timedelta(hours=heures)
+                )
+            return conv.pk
+
+        plus_ancienne = conversation(10, a, b, messages=[(50, 'premier')])
+        doublon = conversation(5, b, a, messages=[(2, 'dernier'), (30, 'milieu')])
+        autre_paire = conversation(3, a, c)
+        groupe = conversation(1, a, b, c)
+
+        self.executor.migrate(self.apres)
+
+        apps = self.executor.loader.project_state(self.apres).apps
+        Conversation = apps.get_model('tutorat', 'Conversation')
+        Message = apps.get_model('tutorat', 'Message')
+        self.assertEqual(
+            set(Conversation.objects.values_list('pk', flat=True)), {plus_ancienne, autre_paire, groupe}
+        )
+        self.assertEqual(
+            set(Message.objects.filter(conversation_id=plus_ancienne).values_list('content', flat=True)),
+            {'premier', 'milieu', 'dernier'}
+        )
+        fusionnee = Conversation.objects.get(pk=plus_ancienne)
+        self.assertEqual((fusionnee.participant_min_id, fusionnee.participant_max_id), (a.pk, b.pk))
+        self.assertEqual(fusionnee.derniere_activite, maintenant - timedelta(hours=2))
+        self.assertEqual(fusionnee.dernier_apercu, 'dernier')
+        self.assertEqual(
+            Conversation.objects.filter(pk=autre_paire).values_list('participant_min', 'participant_max').get(),
+            (a.pk, c.pk)
+        )
+        # Hors paire (plus de deux participants) : pas de clé
+        self.assertIsNone(Conversation.objects.get(pk=groupe).participant_min_id)
+
+
+class DestinatairesTests(TestCase):
+    """
+    Autocomplétion des destinataires (messagerie_destinataires) : filtre par
+    rôle, recherche par préfixe et longueur minimale
+    """
+
+    def setUp(self):
+        self.etudiant = User.objects.create_user('etudiant', role='etudiant', first_name='Paul', last_name='Durand')
+        self.autre_etudiant = User.objects.create_user('pauline', role='etudiant')
+        self.tuteur = User.objects.create_user('tuteur', role='tuteur', first_name='Paule', last_name='Martin')
+        self.admin = User.objects.create_user('admin', role='admin', first_name='Pascal', last_name='Roux')
+
+    def rechercher(self, utilisateur, q):
+        self.client.force_login(utilisateur)
+        reponse = self.client.get(reverse('messagerie_destinataires'), {'q': q})
+        self.assertEqual(reponse.status_code, 200)
+        return {resultat['id'] for resultat in reponse.json()['resultats']}
+
+    def test_etudiant_ne_voit_que_les_tuteurs(self):
+        self.assertEqual(self.rechercher(self.etudiant, 'pa'), {self.tuteur.pk})
+
+    def test_tuteur_voit_tout_le_monde_sauf_lui(self):
+        self.assertEqual(
+            self.rechercher(self.tuteur, 'pa'), {self.etudiant.pk, self.autre_etudiant.pk, self.admin.pk}
+        )
+        self.assertEqual(self.rechercher(self.tuteur, 'mart'), set())
+
+    def test_prefixe(self):
+        # Nom d'utilisateur, prénom ou nom, sans tenir compte de la casse ;
+        # chaque mot doit commencer l'un des champs
+        self.assertEqual(self.rechercher(self.admin, 'DUR'), {self.etudiant.pk})
+        self.assertEqual(self.rechercher(self.admin, 'paul dur'), {self.etudiant.pk})
+        self.assertEqual(self.rechercher(self.admin, 'paule'), {self.tuteur.pk})
+        self.assertEqual(self.rechercher(self.admin, 'aul'), set())
+
+    def test_longueur_minimale(self):
+        for q in ('', '   ', 'p', ' p '):
+            with self.subTest(q=q):
+                self.assertEqual(self.rechercher(self.admin, q), set())
+        self.assertEqual(len(self.rechercher(self.admin, 'pa')), 3)
+
+    @mock.patch('tutorat.views.DESTINATAIRES_LIMITE', 2)
+    def test_limite(self):
+        self.assertEqual(len(self.rechercher(self.admin, 'pa')), 2)
@@ -36,21 +36,37 @@ urlpatterns = [
     path('etudiant/calendrier/', views.calendrier_etudiant, name='calendrier_etudiant'),
     path('etudiant/api/seances/', views.api_seances_etudiant, name='api_seances_etudiant'),
     
+    # Abonnement iCalendar (tuteurs et étudiants)
+    path('calendrier/<str:jeton>.ics', views.calendrier_ics, name='calendrier_ics'),
+    
     # URLs Forum
     path('forum/', views.forum_liste, name='forum_liste'),
     path('forum/sujet/<int:pk>/', views.forum_sujet, name='forum_sujet'),
+    path('forum/sujet/<int:pk>/reponses/', views.forum_sujet_reponses, name='forum_sujet_reponses'),
     path('forum/nouveau/', views.forum_nouveau_sujet, name='forum_nouveau_sujet'),
+    path('forum/tout-lu/', views.forum_tout_lu, name='forum_tout_lu'),
     path('forum/supprimer-sujet/<int:pk>/', views.forum_supprimer_sujet, name='forum_supprimer_sujet'),
     path('forum/supprimer-reponse/<int:pk>/', views.forum_supprimer_reponse, name='forum_supprimer_reponse'),
 
+    # Recherche plein texte (séances et forum)
+    path('recherche/', views.recherche, name='recherche'),
+
+    # Notifications temps réel (Server-Sent Events, ASGI)
+    path('notifications/flux/', views.flux_notifications, name='flux_notifications'),
+
     # Messagerie privée
     path('messages/', views.messagerie_liste, name='messagerie_liste'),
     path('messages/nouveau/', views.messagerie_nouvelle, name='messagerie_nouvelle'),
-    path('messages/conversation/<int:pk>/', views.messagerie_conversation_detail, name='messagerie_conversation_detail'),  
+    path('messages/destinataires/', views.messagerie_destinataires, name='messagerie_destinataires'),
+    path('messages/conversation/<int:pk>/', views.messagerie_conversation_detail, name='messagerie_conversation_detail'),
+    path('messages/conversation/<int:pk>/historique/', views.messagerie_historique, name='messagerie_historique'),
+    path('messages/conversation/<int:pk>/envoyer/', views.messagerie_envoyer, name='messagerie_envoyer'),
+    path('messages/conversation/<int:pk>/flux/', views.flux_conversation, name='flux_conversation'),
 
     # URLs Admin
     path('admin-custom/bannissements/', views.gestion_bannissements_admin, name='gestion_bannissements_admin'),
     path('admin-custom/debannir/<int:pk>/', views.debannir_admin, name='debannir_admin'),
     path('admin-custom/seances/', views.liste_seances_admin, name='liste_seances_admin'),
     path('admin-custom/moderation-forum/', views.moderation_forum_admin, name='moderation_forum_admin'),
+    path('admin-custom/moderation-forum/action/', views.moderation_forum_action, name='moderation_forum_action'),
 ]
\ No newline at end of file
@@ -3,15 +3,60 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
 from django.contrib.auth import logout
 from django.contrib import messages
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
-from django.http import JsonResponse
-from .models import Seance, Inscription, Matiere, Sujet, Reponse, BannissementTuteur, Conversation, Message, User
-from .forms import SeanceForm, InscriptionEtudiantForm, ChangementMotDePasseForm, SujetForm, ReponseForm, ProfilForm, ChangerMotDePasseProfilForm
-from django.views.decorators.cache import never_cache
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, Http404
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from .models import Seance, Inscription, Matiere, Sujet, Reponse, LectureSujet, BannissementTuteur, Conversation, Message, LectureConversation, User, SeanceComplete, DejaInscrit
+from .services import inscrire_etudiant, supprimer_sujets
+from . import diffusion, notifications
+from .ical import generer_calendrier, generer_calendrier_async
+from .pagination import paginer, encoder_curseur, condition_apres, CurseurInvalide
+from .recherche import rechercher, TYPES as TYPES_RECHERCHE
+from .forms import SeanceForm, FiltreSeancesForm, InscriptionEtudiantForm, ChangementMotDePasseForm, SujetForm, ReponseForm, FiltreModerationForm, ActionModerationForm, ProfilForm, ChangerMotDePasseProfilForm
+from django.views.decorators.cache import never_cache, cache_control
+from django.views.decorators.http import condition, require_POST
 from django.utils.decorators import method_decorator
-from django.db.models import Count
+from django.template.loader import render_to_string
+from django.db.models import Count, Q, Sum
 from django.db import models
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime
+import json
+
+# Taille des pages de la liste des séances disponibles (étudiant)
+SEANCES_PAR_PAGE = 20
+
+# Taille des pages de résultats de la recherche plein texte
+RESULTATS_PAR_PAGE = 20
+
+# Taille des pages de l'index du forum
+SUJETS_PAR_PAGE = 30
+
+# Nombre de réponses affichées (ou chargées) à la fois dans un sujet
+REPONSES_PAR_PAGE = 50
+ORDRE_REPONSES = ['date_creation', 'pk']
+
+# Taille des pages de la file de modération du forum
+MODERATION_PAR_PAGE = 50
+
+# Taille des pages de la boîte de réception
+CONVERSATIONS_PAR_PAGE = 30
+
+# Nombre de messages affichés (ou chargés) à la fois dans une conversation
+MESSAGES_PAR_PAGE = 50
+ORDRE_MESSAGES = ['-created_at', '-pk']
+
+# Intervalle (secondes) des commentaires de maintien des flux SSE
+FLUX_PING_SECONDES = 25
+
+# Nombre maximal de suggestions de l'autocomplétion des destinataires
+DESTINATAIRES_LIMITE = 10
+
+# Longueur minimale de la recherche : un préfixe d'une lettre couvre une
+# grande partie des comptes sans rien apporter à l'utilisateur
+DESTINATAIRES_LONGUEUR_MIN = 2
 
 # ========== VUES GÉNÉRALES ==========
 
@@ -111,24 +156,26 @@ def dashboard_tuteur(request):
     if request.user.doit_changer_mdp:
         return redirect('changer_mot_de_passe_obligatoire')
     
+    aujourdhui = Seance.instant(timezone.localdate())
+    
     # Statistique 1 : Séances planifiées (à venir)
     seances_planifiees_count = Seance.objects.filter(
         tuteur=request.user,
         statut='planifiee',
-        date__gte=timezone.now().date()
+        debut__gte=aujourdhui
     ).count()
     
     # Statistique 2 : Total d'inscrits (toutes séances à venir)
     total_inscrits_count = Inscription.objects.filter(
         seance__tuteur=request.user,
-        seance__date__gte=timezone.now().date(),
+        seance__debut__gte=aujourdhui,
         statut='confirmee'
     ).count()
     
     # Statistique 3 : Séances terminées
     seances_terminees_count = Seance.objects.filter(
         tuteur=request.user,
-        date__lt=timezone.now().date()
+        debut__lt=aujourdhui
     ).count()
     
     # Statistique 4 : Étudiants bannis
@@ -140,15 +187,8 @@ def dashboard_tuteur(request):
     prochaines_seances = Seance.objects.filter(
         tuteur=request.user,
         statut='planifiee',
-        date__gte=timezone.now().date()
-    ).select_related('matiere').order_by('date', 'heure_debut')[:5]
-    
-    # Ajouter le nombre d'inscrits pour chaque séance
-    for seance in prochaines_seances:
-        seance.inscrits_count = Inscription.objects.filter(
-            seance=seance,
-            statut='confirmee'
-        ).count()
+        debut__gte=aujourdhui
+    ).select_related('matiere').order_by('debut')[:5]
     
     context = {
         'seances_planifiees_count': seances_planifiees_count,
@@ -175,35 +215,18 @@ def dashboard_etudiant(request):
     mes_inscriptions_count = Inscription.objects.filter(
         etudiant=request.user,
         statut='confirmee',
-        seance__date__gte=timezone.now().date()
+        seance__debut__gte=Seance.instant(timezone.localdate())
     ).count()
     
-    # Statistique 2 : Séances disponibles
-    # Exclure les tuteurs qui ont banni l'étudiant
-    tuteurs_bannis = BannissementTuteur.objects.filter(
-        etudiant=request.user
-    ).values_list('tuteur_id', flat=True)
-    
-    # Exclure les séances où l'étudiant est déjà inscrit
-    seances_inscrites = Inscription.objects.filter(
-        etudiant=request.user,
-        statut='confirmee'
-    ).values_list('seance_id', flat=True)
-    
-    seances_disponibles_count = Seance.objects.filter(
-        statut='planifiee',
-        date__gte=timezone.now().date()
-    ).exclude(
-        id__in=seances_inscrites
-    ).exclude(
-        tuteur_id__in=tuteurs_bannis
-    ).count()
+    # Statistique 2 : Séances disponibles (hors tuteurs bannissant l'étudiant
+    # et séances déjà réservées)
+    seances_disponibles_count = Seance.objects.disponibles_pour(request.user).count()
     
     # Statistique 3 : Séances terminées
     seances_terminees_count = Inscription.objects.filter(
         etudiant=request.user,
         statut='confirmee',
-        seance__date__lt=timezone.now().date()
+        seance__debut__lt=Seance.instant(timezone.localdate())
     ).count()
     
     # Statistique 4 : Mes sujets forum
@@ -220,6 +243,19 @@ def dashboard_etudiant(request):
 
 # ========== VUES TUTEUR ==========
 
+def _filtrer_statut(request, seances):
+    """
+    Annote le statut réel des séances et applique le filtre ?statut=
+    (ignoré s'il ne correspond à aucun statut connu)
+    """
+    seances = seances.avec_statut_reel()
+    statut = request.GET.get('statut', '')
+    if statut in dict(Seance.STATUT_CHOICES):
+        seances = seances.filter(statut_reel=statut)
+    else:
+        statut = ''
+    return seances, statut
+
 @login_required
 @never_cache
 def liste_seances_tuteur(request):
@@ -229,16 +265,16 @@ def liste_seances_tuteur(request):
     
     # Si admin, afficher toutes les séances, sinon uniquement celles du tuteur
     if request.user.is_admin():
-        seances = Seance.objects.all().order_by('-date')
+        seances = Seance.objects.all().order_by('-debut')
     else:
-        seances = Seance.objects.filter(tuteur=request.user).order_by('-date')
+        seances = Seance.objects.filter(tuteur=request.user).order_by('-debut')
     
     # Rediriger si tuteur doit changer mot de passe
     if request.user.is_tuteur() and request.user.doit_changer_mdp:
         return redirect('changer_mot_de_passe_obligatoire')
     
-    for seance in seances:
-        seance.actualiser_statut()
+    # Statut réel calculé en SQL (CASE sur debut/fin), filtrable par ?statut=
+    seances, statut_filtre = _filtrer_statut(request, seances.select_related('matiere'))
     
     # Compter les étudiants bannis (seulement pour les tuteurs)
     nb_bannis = 0
@@ -248,6 +284,8 @@ def liste_seances_tuteur(request):
     context = {
         'seances': seances,
         'nb_bannis': nb_bannis,
+        'statuts': Seance.STATUT_CHOICES,
+        'statut_filtre': statut_filtre,
     }
     
     return render(request, 'tutorat/tuteur_liste_seances.html', context)
@@ -266,6 +304,11 @@ def creer_seance(request):
     if request.method == 'POST':
         form = SeanceForm(request.POST, tuteur=request.user)
         if form.is_valid():
+            if len(form.dates_occurrences()) > 1:
+                # Série hebdomadaire / bimensuelle : insertion groupée
+                seances = form.save_serie(request.user)
+                messages.success(request, f'{len(seances)} séances "{seances[0].titre}" ont été créées avec succès !')
+                return redirect('liste_seances_tuteur')
             seance = form.save(commit=False)
             seance.tuteur = request.user
             seance.save()
@@ -445,24 +488,127 @@ def calendrier_tuteur(request):
     if request.user.doit_changer_mdp:
         return redirect('changer_mot_de_passe_obligatoire')
     
-    return render(request, 'tutorat/calendrier_tuteur.html')
+    url_ics = request.build_absolute_uri(
+        reverse('calendrier_ics', args=[request.user.get_jeton_calendrier()])
+    )
+    return render(request, 'tutorat/calendrier_tuteur.html', {'url_ics': url_ics})
+
+def _fenetre_calendrier(request):
+    """
+    Lit les paramètres start/end envoyés par FullCalendar (ISO 8601).
+    Retourne (debut, fin) en datetimes avec fuseau, None pour une borne absente.
+    Lève ValueError si une borne est mal formée.
+    """
+    bornes = []
+    for nom in ('start', 'end'):
+        valeur = request.GET.get(nom)
+        if not valeur:
+            bornes.append(None)
+            continue
+        # Un "+01:00" non encodé arrive sous la forme " 01:00"
+        valeur = valeur.strip().replace(' ', '+')
+        moment = parse_datetime(valeur)
+        if moment is None:
+            jour = parse_date(valeur)
+            if jour is None:
+                raise ValueError(f"Paramètre {nom} invalide : {valeur}")
+            moment = datetime.combine(jour, datetime.min.time())
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        bornes.append(moment)
+    return tuple(bornes)
+
+def _filtrer_fenetre(seances, debut, fin):
+    """
+    Restreint les séances à celles qui chevauchent la fenêtre visible
+    du calendrier (requête par plage sur debut/fin)
+    """
+    if fin:
+        seances = seances.filter(debut__lt=fin)
+    if debut:
+        seances = seances.filter(fin__gt=debut)
+    return seances
+
+def _seances_calendrier_tuteur(request):
+    """
+    Séances du tuteur dans la fenêtre demandée par FullCalendar
+    """
+    debut, fin = _fenetre_calendrier(request)
+    return _filtrer_fenetre(
+        Seance.objects.filter(tuteur=request.user),
+        debut,
+        fin
+    )
+
+def _seances_calendrier_etudiant(request):
+    """
+    Séances de la fenêtre auxquelles l'étudiant a une inscription confirmée
+    """
+    debut, fin = _fenetre_calendrier(request)
+    return _filtrer_fenetre(
+        Seance.objects.filter(
+            inscriptions__etudiant=request.user,
+            inscriptions__statut='confirmee'
+        ),
+        debut,
+        fin
+    )
+
+def _empreinte_calendrier(request):
+    """
+    Empreinte des séances visibles par l'utilisateur (une requête agrégée),
+    mémorisée sur la requête
+    """
+    if not hasattr(request, '_empreinte_calendrier'):
+        empreinte = None
+        try:
+            if request.user.is_tuteur():
+                empreinte = _seances_calendrier_tuteur(request).empreinte()
+            elif request.user.is_etudiant():
+                # La plus grande inscription détecte un échange désinscription/inscription
+                empreinte = _seances_calendrier_etudiant(request).empreinte(
+                    derniere_inscription=models.Max('inscriptions__pk')
+                )
+        except ValueError:
+            pass
+        request._empreinte_calendrier = empreinte
+    return request._empreinte_calendrier
+
+def _etag_depuis_empreinte(empreinte):
+    """
+    Transforme une empreinte (SeanceQuerySet.empreinte) en valeur d'ETag
+    """
+    modification = empreinte['derniere_modification']
+    valeurs = {**empreinte, 'derniere_modification': modification.timestamp() if modification else 0}
+    return '-'.join(str(valeurs[cle] or 0) for cle in sorted(valeurs))
+
+def _etag_calendrier(request):
+    empreinte = _empreinte_calendrier(request)
+    return _etag_depuis_empreinte(empreinte) if empreinte else None
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_etag_calendrier)
 def api_seances_tuteur(request):
     if not request.user.is_tuteur():
         return JsonResponse({'error': 'Accès refusé'}, status=403)
     
-    seances = Seance.objects.filter(tuteur=request.user)
-    for seance in seances:
-        seance.actualiser_statut()
+    try:
+        seances = _seances_calendrier_tuteur(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    # Une seule requête : les places viennent du compteur nb_inscrits
+    seances = seances.select_related('matiere')
     
     events = []
     for seance in seances:
-        if seance.statut == 'planifiee':
+        statut = seance.statut_actuel
+        if statut == 'planifiee':
             color = '#0d6efd'
-        elif seance.statut == 'en_cours':
+        elif statut == 'en_cours':
             color = '#198754'
-        elif seance.statut == 'terminee':
+        elif statut == 'terminee':
             color = '#6c757d'
         else:
             color = '#dc3545'
@@ -478,8 +624,8 @@ def api_seances_tuteur(request):
                 'matiere': str(seance.matiere),
                 'lieu': seance.lieu,
                 'description': seance.description,
-                'statut': seance.get_statut_display(),
-                'inscrits': seance.inscriptions.filter(statut='confirmee').count(),
+                'statut': seance.get_statut_actuel_display(),
+                'inscrits': seance.nb_inscrits,
             }
         })
     
@@ -494,28 +640,28 @@ def liste_seances_etudiant(request):
         messages.error(request, "Accès réservé aux étudiants.")
         return redirect('home')
     
-    # Récupérer les tuteurs qui ont banni cet étudiant
-    tuteurs_bannis = BannissementTuteur.objects.filter(
-        etudiant=request.user
-    ).values_list('tuteur_id', flat=True)
-    
-    # Récupérer les IDs des séances auxquelles l'étudiant est déjà inscrit
-    seances_inscrites = Inscription.objects.filter(
-        etudiant=request.user,
-        statut='confirmee'
-    ).values_list('seance_id', flat=True)
-    
-    # Afficher uniquement les séances disponibles (non inscrites et tuteurs non bannis)
-    seances = Seance.objects.filter(
-        statut='planifiee',
-        date__gte=timezone.now().date()
-    ).exclude(
-        id__in=seances_inscrites
-    ).exclude(
-        tuteur_id__in=tuteurs_bannis
-    ).order_by('date', 'heure_debut')
-    
-    return render(request, 'tutorat/etudiant_liste_seances.html', {'seances': seances})
+    # Séances disponibles (non inscrites et tuteurs non bannis) en une requête
+    filtres = FiltreSeancesForm(request.GET or None)
+    seances = filtres.filtrer(
+        Seance.objects.disponibles_pour(request.user).select_related('matiere', 'tuteur')
+    )
+    
+    # Pagination par curseur sur (debut, pk) : coût constant à toute profondeur
+    try:
+        page = paginer(seances, ['debut', 'pk'], request.GET.get('curseur'), SEANCES_PAR_PAGE)
+    except CurseurInvalide:
+        page = paginer(seances, ['debut', 'pk'], None, SEANCES_PAR_PAGE)
+    
+    # Paramètres de filtre à conserver dans le lien "page suivante"
+    parametres = request.GET.copy()
+    parametres.pop('curseur', None)
+    
+    return render(request, 'tutorat/etudiant_liste_seances.html', {
+        'seances': page,
+        'filtres': filtres,
+        'parametres': parametres.urlencode(),
+        'premiere_page': not request.GET.get('curseur'),
+    })
 
 @login_required
 def inscrire_seance(request, pk):
@@ -538,7 +684,17 @@ def inscrire_seance(request, pk):
         messages.error(request, "Cette séance est complète.")
         return redirect('liste_seances_etudiant')
     
-    Inscription.objects.create(etudiant=request.user, seance=seance, statut='confirmee')
+    # Les vérifications ci-dessus évitent un aller-retour inutile ; la capacité
+    # et l'unicité sont garanties de façon atomique par le service
+    try:
+        inscrire_etudiant(request.user, seance)
+    except SeanceComplete:
+        messages.error(request, "Cette séance est complète.")
+        return redirect('liste_seances_etudiant')
+    except DejaInscrit:
+        messages.warning(request, "Vous êtes déjà inscrit à cette séance.")
+        return redirect('liste_seances_etudiant')
+    
     messages.success(request, f'Vous êtes inscrit à la séance "{seance.titre}" !')
     return redirect('mes_inscriptions')
 
@@ -551,16 +707,13 @@ def mes_inscriptions(request):
     
     inscriptions = Inscription.objects.filter(
         etudiant=request.user
-    ).select_related('seance', 'seance__matiere', 'seance__tuteur').order_by('seance__date', 'seance__heure_debut')
+    ).select_related('seance', 'seance__matiere', 'seance__tuteur').order_by('seance__debut')
     
-    # Actualiser tous les statuts et séparer les inscriptions
+    # Séparer les inscriptions selon le statut actualisé (sans écriture)
     inscriptions_actives = []
     inscriptions_historique = []
     
     for inscription in inscriptions:
-        inscription.seance.actualiser_statut()
-        inscription.actualiser_statut_selon_seance()
-        
         # Séparer selon le statut affiché
         if inscription.statut_affichage == 'confirmee':
             inscriptions_actives.append(inscription)
@@ -592,33 +745,35 @@ def calendrier_etudiant(request):
     if not request.user.is_etudiant():
         messages.error(request, "Accès réservé aux étudiants.")
         return redirect('home')
-    return render(request, 'tutorat/calendrier_etudiant.html')
+    url_ics = request.build_absolute_uri(
+        reverse('calendrier_ics', args=[request.user.get_jeton_calendrier()])
+    )
+    return render(request, 'tutorat/calendrier_etudiant.html', {'url_ics': url_ics})
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_etag_calendrier)
 def api_seances_etudiant(request):
     if not request.user.is_etudiant():
         return JsonResponse({'error': 'Accès refusé'}, status=403)
     
-    # Récupérer TOUTES les inscriptions de l'étudiant
-    inscriptions = Inscription.objects.filter(
-        etudiant=request.user
-    ).select_related('seance', 'seance__matiere', 'seance__tuteur')
+    try:
+        seances = _seances_calendrier_etudiant(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    # Séances de la fenêtre visible auxquelles l'inscription est active (confirmée)
+    seances = seances.select_related('matiere', 'tuteur')
     
     events = []
-    for inscription in inscriptions:
-        seance = inscription.seance
-        seance.actualiser_statut()
-        
-        # Afficher uniquement si l'inscription est active (confirmée)
-        if inscription.statut != 'confirmee':
-            continue
-        
+    for seance in seances:
         # Couleur selon le statut de la séance
-        if seance.statut == 'planifiee':
+        statut = seance.statut_actuel
+        if statut == 'planifiee':
             color = '#0d6efd'  # Bleu
-        elif seance.statut == 'en_cours':
+        elif statut == 'en_cours':
             color = '#198754'  # Vert
-        elif seance.statut == 'terminee':
+        elif statut == 'terminee':
             color = '#6c757d'  # Gris
         else:  # annulee
             color = '#dc3545'  # Rouge
@@ -635,48 +790,115 @@ def api_seances_etudiant(request):
                 'tuteur': seance.tuteur.get_full_name() or seance.tuteur.username,
                 'lieu': seance.lieu,
                 'description': seance.description,
-                'statut': seance.get_statut_display(),
+                'statut': seance.get_statut_actuel_display(),
             }
         })
     
     return JsonResponse(events, safe=False)
 
+# ========== FLUX ICALENDAR ==========
+
+def _abonnement_ics(request, jeton):
+    """
+    Utilisateur du jeton, séances de son flux et empreinte de ces séances.
+    Mémorisé sur la requête : utilisé pour l'ETag et la vue.
+    """
+    if not hasattr(request, '_abonnement_ics'):
+        abonnement = None
+        utilisateur = User.objects.filter(jeton_calendrier=jeton).first()
+        if utilisateur and utilisateur.is_tuteur():
+            seances = Seance.objects.filter(tuteur=utilisateur)
+            abonnement = (utilisateur, seances, seances.empreinte())
+        elif utilisateur and utilisateur.is_etudiant():
+            seances = Seance.objects.filter(
+                inscriptions__etudiant=utilisateur,
+                inscriptions__statut='confirmee'
+            )
+            abonnement = (utilisateur, seances, seances.empreinte(
+                derniere_inscription=models.Max('inscriptions__pk')
+            ))
+        request._abonnement_ics = abonnement
+    return request._abonnement_ics
+
+def _etag_ics(request, jeton):
+    abonnement = _abonnement_ics(request, jeton)
+    return 'ics-' + _etag_depuis_empreinte(abonnement[2]) if abonnement else None
+
+@cache_control(private=True, no_cache=True)
+# Pas de Last-Modified : les inscriptions et suppressions ne font pas
+# avancer Max(date_modification), seul l'ETag couvre tout le contenu
+@condition(etag_func=_etag_ics)
+def calendrier_ics(request, jeton):
+    """
+    Flux iCalendar d'abonnement (Google Agenda, Outlook, Apple Calendrier...)
+    authentifié par le jeton personnel de l'utilisateur.
+    Réponse en streaming : l'historique complet n'est jamais chargé en mémoire.
+    """
+    abonnement = _abonnement_ics(request, jeton)
+    if abonnement is None:
+        raise Http404("Calendrier introuvable")
+    
+    utilisateur, seances, _ = abonnement
+    seances = seances.select_related('matiere', 'tuteur').order_by('debut')
+    nom = f"Tutorat - {utilisateur.get_full_name() or utilisateur.username}"
+    
+    # Sous ASGI, un itérateur synchrone serait chargé entièrement en mémoire
+    generer = generer_calendrier_async if isinstance(request, ASGIRequest) else generer_calendrier
+    response = StreamingHttpResponse(
+        generer(seances, nom, request.get_host(), avec_tuteur=utilisateur.is_etudiant()),
+        content_type='text/calendar; charset=utf-8'
+    )
+    response['Content-Disposition'] = 'inline; filename="tutorat.ics"'
+    return response
+
 # ========== VUES FORUM ==========
 
 
+@login_required
 @never_cache
 def forum_liste(request):
     """
-    Liste des sujets du forum avec filtre par matière
+    Liste des sujets du forum avec filtre par matière.
+    Une seule requête annotée par page (total de réponses, réponses et
+    sujets non lus selon les pointeurs de lecture), paginée par curseur.
+    L'affichage de la liste ne marque rien comme lu.
     """
-    matiere_id = request.GET.get('matiere')
-    
+    matiere_id = request.GET.get('matiere', '')
+    if not matiere_id.isdigit():
+        matiere_id = ''
+    # Tri par dernière activité (défaut) ou par date de création
+    tri = request.GET.get('tri', 'activite')
+    if tri not in ('activite', 'recent'):
+        tri = 'activite'
+    sans_reponse = request.GET.get('sans_reponse') == '1'
+    
+    sujets = Sujet.objects.select_related('auteur', 'matiere', 'dernier_repondant').avec_compteurs(
+        request.user,
+        filigrane=request.user.filigrane_forum()
+    )
     if matiere_id:
-        sujets = Sujet.objects.filter(matiere_id=matiere_id).select_related('auteur', 'matiere')
+        sujets = sujets.filter(matiere_id=matiere_id)
+    if sans_reponse:
+        sujets = sujets.filter(nb_reponses=0)
+    
+    if tri == 'activite':
+        ordre = ['-derniere_activite', '-pk']
     else:
-        sujets = Sujet.objects.all().select_related('auteur', 'matiere')
-    
-    # Ajouter le nombre de nouvelles réponses pour chaque sujet
-    for sujet in sujets:
-        # Compter les nouvelles réponses sur MES sujets depuis la dernière visite
-        if request.user.derniere_visite_forum and sujet.auteur == request.user:
-            nb_nouvelles = sujet.reponses.filter(
-                date_creation__gt=request.user.derniere_visite_forum
-            ).exclude(auteur=request.user).count()
-            sujet.nb_nouvelles_reponses = nb_nouvelles
-        else:
-            sujet.nb_nouvelles_reponses = 0
+        ordre = ['-date_creation', '-pk']
+    try:
+        page = paginer(sujets, ordre, request.GET.get('curseur'), SUJETS_PAR_PAGE)
+    except CurseurInvalide:
+        page = paginer(sujets, ordre, None, SUJETS_PAR_PAGE)
     
     matieres = Matiere.objects.all()
     
-    # Mettre à jour la dernière visite du forum
-    request.user.derniere_visite_forum = timezone.now()
-    request.user.save(update_fields=['derniere_visite_forum'])
-    
     context = {
-        'sujets': sujets,
+        'sujets': page,
         'matieres': matieres,
         'matiere_selectionnee': matiere_id,
+        'tri': tri,
+        'sans_reponse': sans_reponse,
+        'premiere_page': not request.GET.get('curseur'),
     }
     return render(request, 'tutorat/forum_liste.html', context)
 
@@ -684,10 +906,14 @@ def forum_liste(request):
 @never_cache
 def forum_sujet(request, pk):
     """
-    Détail d'un sujet avec ses réponses
+    Détail d'un sujet, réponses paginées par curseur (date_creation, pk)
     """
-    sujet = get_object_or_404(Sujet, pk=pk)
-    reponses = sujet.reponses.select_related('auteur').all()
+    sujet = get_object_or_404(
+        Sujet.objects.select_related('auteur', 'matiere').avec_lecture(
+            request.user, request.user.filigrane_forum()
+        ),
+        pk=pk
+    )
     
     if request.method == 'POST':
         form = ReponseForm(request.POST)
@@ -697,17 +923,122 @@ def forum_sujet(request, pk):
             reponse.auteur = request.user
             reponse.save()
             messages.success(request, 'Votre réponse a été ajoutée !')
-            return redirect('forum_sujet', pk=pk)
+            return redirect(_url_reponse(reponse))
     else:
         form = ReponseForm()
     
+    curseur = request.GET.get('curseur')
+    try:
+        reponses = _page_reponses(request, sujet, curseur)
+    except CurseurInvalide:
+        curseur = None
+        reponses = _page_reponses(request, sujet)
+    
     context = {
         'sujet': sujet,
         'reponses': reponses,
+        'curseur': curseur,
+        'premier_non_lu': _premier_non_lu(request, sujet, reponses, curseur),
         'form': form,
     }
     return render(request, 'tutorat/forum_sujet.html', context)
 
+@login_required
+@never_cache
+def forum_sujet_reponses(request, pk):
+    """
+    Page suivante des réponses d'un sujet en fragment HTML (JSON),
+    pour le bouton « Charger plus »
+    """
+    sujet = get_object_or_404(
+        Sujet.objects.avec_lecture(request.user, request.user.filigrane_forum()),
+        pk=pk
+    )
+    try:
+        reponses = _page_reponses(request, sujet, request.GET.get('curseur'))
+    except CurseurInvalide as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    html = render_to_string(
+        'tutorat/forum_reponses.html', {'reponses': reponses}, request=request
+    )
+    return JsonResponse({'html': html, 'curseur_suivant': reponses.curseur_suivant})
+
+def _page_reponses(request, sujet, curseur=None):
+    """
+    Une page de réponses, puis avance du pointeur de lecture jusqu'à la
+    dernière réponse affichée (jusqu'à maintenant sur la dernière page)
+    """
+    reponses = paginer(
+        sujet.reponses.select_related('auteur'), ORDRE_REPONSES, curseur, REPONSES_PAR_PAGE
+    )
+    if reponses:
+        derniere_activite = reponses.elements[-1].date_creation
+    else:
+        derniere_activite = sujet.date_creation
+    avance = LectureSujet.marquer_lu(
+        request.user,
+        sujet,
+        derniere_activite,
+        moment=derniere_activite if reponses.a_suivante else None,
+        lu_jusqu_a=sujet.lu_jusqu_a
+    )
+    if avance:
+        notifications.invalider_forum(request.user)
+        diffusion.resynchroniser(request.user.pk)
+    return reponses
+
+def _premier_non_lu(request, sujet, reponses, curseur):
+    """
+    URL (avec ancre) de la première réponse d'un autre utilisateur postérieure
+    au pointeur de lecture, ou None si tout est lu
+    """
+    if sujet.derniere_activite <= sujet.lu_jusqu_a:
+        return None
+    non_lues = (
+        reponse for reponse in reponses
+        if reponse.date_creation > sujet.lu_jusqu_a and reponse.auteur_id != request.user.pk
+    )
+    # Sans curseur, la page commence au début : la première trouvée est la bonne
+    premiere = next(non_lues, None) if not curseur else None
+    if premiere is not None:
+        return f'#reponse-{premiere.pk}'
+    premiere = sujet.reponses.filter(
+        date_creation__gt=sujet.lu_jusqu_a
+    ).exclude(auteur=request.user).order_by(*ORDRE_REPONSES).first()
+    if premiere is None:
+        return None
+    if premiere in reponses.elements:
+        return f'#reponse-{premiere.pk}'
+    return _url_reponse(premiere)
+
+def _url_reponse(reponse):
+    """
+    URL de la page du sujet qui commence à cette réponse : le curseur est
+    celui de la réponse précédente
+    """
+    url = reverse('forum_sujet', args=[reponse.sujet_id])
+    precedente = Reponse.objects.filter(
+        sujet_id=reponse.sujet_id
+    ).filter(
+        condition_apres(['-date_creation', '-pk'], [reponse.date_creation, reponse.pk])
+    ).order_by('-date_creation', '-pk').values_list('date_creation', 'pk').first()
+    if precedente:
+        url += f'?curseur={encoder_curseur(precedente)}'
+    return f'{url}#reponse-{reponse.pk}'
+
+@login_required
+def forum_tout_lu(request):
+    """
+    Marque tout le forum comme lu en avançant le filigrane de l'utilisateur
+    """
+    if request.method == 'POST':
+        User.objects.filter(pk=request.user.pk).update(derniere_visite_forum=timezone.now())
+        notifications.invalider_forum(request.user)
+        diffusion.resynchroniser(request.user.pk)
+        messages.success(request, 'Tous les sujets ont été marqués comme lus.')
+    return redirect('forum_liste')
+
 @login_required
 @never_cache
 def forum_nouveau_sujet(request):
@@ -767,6 +1098,43 @@ def forum_supprimer_reponse(request, pk):
     
     return render(request, 'tutorat/forum_supprimer_reponse.html', {'reponse': reponse})
 
+# ========== RECHERCHE ==========
+
+@login_required
+@never_cache
+def recherche(request):
+    """
+    Recherche plein texte classée dans les séances et le forum
+    """
+    texte = request.GET.get('q', '').strip()
+    type_filtre = request.GET.get('type', '')
+    if type_filtre not in TYPES_RECHERCHE:
+        type_filtre = ''
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    
+    resultats = []
+    if texte:
+        # Un résultat de plus pour savoir s'il existe une page suivante
+        resultats = rechercher(
+            texte,
+            types=[type_filtre] if type_filtre else None,
+            limite=RESULTATS_PAR_PAGE + 1,
+            decalage=(page - 1) * RESULTATS_PAR_PAGE
+        )
+    
+    context = {
+        'texte': texte,
+        'type_filtre': type_filtre,
+        'resultats': resultats[:RESULTATS_PAR_PAGE],
+        'page': page,
+        'page_suivante': page + 1 if len(resultats) > RESULTATS_PAR_PAGE else None,
+        'page_precedente': page - 1 if page > 1 else None,
+    }
+    return render(request, 'tutorat/recherche.html', context)
+
 # ========== VUES PROFIL ==========
 
 @login_required
@@ -850,9 +1218,9 @@ def dashboard_admin(request):
     
     # Statistiques du mois en cours
     from django.utils import timezone
-    debut_mois = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    seances_ce_mois = Seance.objects.filter(date__gte=debut_mois).count()
-    tuteurs_actifs = Seance.objects.filter(date__gte=debut_mois).values('tuteur').distinct().count()
+    debut_mois = Seance.instant(timezone.localdate().replace(day=1))
+    seances_ce_mois = Seance.objects.filter(debut__gte=debut_mois).count()
+    tuteurs_actifs = Seance.objects.filter(debut__gte=debut_mois).values('tuteur').distinct().count()
     etudiants_inscrits_mois = Inscription.objects.filter(
         date_inscription__gte=debut_mois,
         statut='confirmee'
@@ -934,29 +1302,77 @@ def moderation_forum_admin(request):
         messages.error(request, "Accès réservé aux administrateurs.")
         return redirect('home')
     
-    # Récupérer tous les sujets avec statistiques
-    sujets = Sujet.objects.select_related('auteur', 'matiere').prefetch_related('reponses').order_by('-date_creation')
-    
-    # Statistiques
-    total_sujets = sujets.count()
-    total_reponses = Reponse.objects.count()
-    sujets_sans_reponse = sujets.filter(reponses__isnull=True).count()
+    # File de modération : filtres, puis page par curseur (aucune réponse chargée)
+    filtres = FiltreModerationForm(request.GET or None)
+    sujets = filtres.filtrer(Sujet.objects.select_related('auteur', 'matiere'))
+    try:
+        sujets = paginer(sujets, ['-date_creation', '-pk'], request.GET.get('curseur'), MODERATION_PAR_PAGE)
+    except CurseurInvalide:
+        sujets = paginer(sujets, ['-date_creation', '-pk'], taille=MODERATION_PAR_PAGE)
+    
+    # Statistiques en un agrégat sur les compteurs dénormalisés
+    stats = Sujet.objects.aggregate(
+        total_sujets=Count('pk'),
+        total_reponses=Sum('nb_reponses', default=0),
+        sujets_sans_reponse=Count('pk', filter=Q(nb_reponses=0)),
+    )
     
     # Sujets par matière (exclure les annonces générales sans matière)
-    sujets_par_matiere = sujets.filter(matiere__isnull=False).values('matiere__nom').annotate(
+    sujets_par_matiere = Sujet.objects.filter(matiere__isnull=False).values('matiere__nom').annotate(
     count=models.Count('id')
     ).order_by('-count')[:5]
     
+    # Paramètres de filtre à conserver dans les liens et après une action
+    parametres = request.GET.copy()
+    parametres.pop('curseur', None)
+    
     context = {
         'sujets': sujets,
-        'total_sujets': total_sujets,
-        'total_reponses': total_reponses,
-        'sujets_sans_reponse': sujets_sans_reponse,
+        'filtres': filtres,
+        'parametres': parametres.urlencode(),
+        'action_form': ActionModerationForm(),
         'sujets_par_matiere': sujets_par_matiere,
+        **stats,
     }
     
     return render(request, 'tutorat/admin_moderation_forum.html', context)
 
+@login_required
+def moderation_forum_action(request):
+    """
+    Action groupée de la file de modération (POST) : chaque action est un
+    seul UPDATE / DELETE ensembliste sur les sujets sélectionnés
+    """
+    if not request.user.is_admin():
+        messages.error(request, "Accès réservé aux administrateurs.")
+        return redirect('home')
+    
+    url = reverse('moderation_forum_admin')
+    if request.POST.get('parametres'):
+        url += '?' + request.POST['parametres']
+    if request.method != 'POST':
+        return redirect(url)
+    
+    form = ActionModerationForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, "Sélectionnez au moins un sujet et une action.")
+        return redirect(url)
+    
+    action = form.cleaned_data['action']
+    # Queryset filtré sur les clés sélectionnées (Sujet.objects.filter(pk__in=...))
+    sujets = form.cleaned_data['sujets']
+    if action == 'resoudre':
+        nombre = sujets.update(est_resolu=True)
+        messages.success(request, f"{nombre} sujet(s) marqué(s) comme résolu(s).")
+    elif action == 'deplacer':
+        matiere = form.cleaned_data['matiere']
+        nombre = sujets.update(matiere=matiere)
+        messages.success(request, f"{nombre} sujet(s) déplacé(s) vers « {matiere or 'Annonce générale'} ».")
+    else:
+        nombre = supprimer_sujets(sujets)
+        messages.success(request, f"{nombre} sujet(s) supprimé(s).")
+    return redirect(url)
+
 
 @login_required
 @never_cache
@@ -968,12 +1384,66 @@ def liste_seances_admin(request):
         messages.error(request, "Accès réservé aux administrateurs.")
         return redirect('home')
     
-    seances = Seance.objects.all().select_related('tuteur', 'matiere').order_by('-date', '-heure_debut')
-    
-    for seance in seances:
-        seance.actualiser_statut()
+    seances, statut_filtre = _filtrer_statut(
+        request,
+        Seance.objects.all().select_related('tuteur', 'matiere').order_by('-debut')
+    )
     
-    return render(request, 'tutorat/admin_liste_seances.html', {'seances': seances})
+    return render(request, 'tutorat/admin_liste_seances.html', {
+        'seances': seances,
+        'statuts': Seance.STATUT_CHOICES,
+        'statut_filtre': statut_filtre,
+    })
+
+# ========== NOTIFICATIONS TEMPS RÉEL ==========
+
+def _evenement_sse(nom, donnees):
+    return f'event: {nom}\ndata: {json.dumps(donnees)}\n\n'
+
+async def _flux_compteurs(utilisateur):
+    """
+    Flux SSE des compteurs de l'utilisateur : valeurs complètes à
+    l'ouverture et après une resynchronisation, deltas ensuite
+    """
+    abonnement = diffusion.get_diffuseur().abonner(
+        [diffusion.canal_utilisateur(utilisateur.pk), diffusion.CANAL_FORUM]
+    )
+    try:
+        # Abonné avant la lecture : aucun événement ne se perd entre les deux
+        messages_non_lus, forum = await sync_to_async(notifications.compteurs)(utilisateur)
+        yield _evenement_sse('compteurs', {'messages': messages_non_lus, 'forum': forum})
+        while True:
+            evenement = await abonnement.recevoir(FLUX_PING_SECONDES)
+            if evenement is None:
+                yield ': ping\n\n'
+            elif evenement.get('resync'):
+                nouveaux = await sync_to_async(notifications.compteurs)(utilisateur)
+                if nouveaux != (messages_non_lus, forum):
+                    messages_non_lus, forum = nouveaux
+                    yield _evenement_sse('compteurs', {'messages': messages_non_lus, 'forum': forum})
+            elif evenement.get('sauf') != utilisateur.pk:
+                delta = {cle: evenement.get(cle, 0) for cle in ('messages', 'forum')}
+                messages_non_lus += delta['messages']
+                forum += delta['forum']
+                yield _evenement_sse('delta', delta)
+    finally:
+        abonnement.fermer()
+
+@login_required
+@never_cache
+async def flux_notifications(request):
+    """
+    Flux Server-Sent Events des badges de notification (servi en ASGI).
+    Sous WSGI, 204 : le navigateur n'ouvre pas de flux et les badges ne
+    changent qu'au rechargement.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    utilisateur = await request.auser()
+    reponse = StreamingHttpResponse(_flux_compteurs(utilisateur), content_type='text/event-stream')
+    # Pas de mise en tampon par un proxy (nginx)
+    reponse['X-Accel-Buffering'] = 'no'
+    return reponse
 
 # ===== MESSAGERIE PRIVÉE =====
 
@@ -981,35 +1451,23 @@ def liste_seances_admin(request):
 @never_cache
 def messagerie_liste(request):
     """
-    Liste toutes les conversations de l'utilisateur
+    Liste toutes les conversations de l'utilisateur, de la plus récemment
+    active à la plus ancienne, paginée par curseur
     """
-    conversations_queryset = request.user.conversations.all().order_by('-created_at')
-    
-    # Enrichir chaque conversation avec des infos utiles
-    conversations = []
-    for conv in conversations_queryset:
-        autre_user = conv.other_participant(request.user)
-        dernier_msg = conv.last_message()
-        
-        # Compter messages non lus dans cette conversation
-        nb_non_lus = conv.messages.filter(is_read=False).exclude(sender=request.user).count()
-        
-        conversations.append({
-            'pk': conv.pk,
-            'other': autre_user,
-            'last_message': dernier_msg.content if dernier_msg else None,
-            'last_message_time': dernier_msg.created_at if dernier_msg else conv.created_at,
-            'nb_non_lus': nb_non_lus
-        })
+    conversations = Conversation.objects.boite_de_reception(request.user)
+    ordre = ['-derniere_activite', '-pk']
+    try:
+        conversations = paginer(conversations, ordre, request.GET.get('curseur'), CONVERSATIONS_PAR_PAGE)
+    except CurseurInvalide:
+        conversations = paginer(conversations, ordre, taille=CONVERSATIONS_PAR_PAGE)
     
-    # Trier par date du dernier message
-    conversations.sort(key=lambda x: x['last_message_time'], reverse=True)
+    # Autres participants de la page en une requête
+    autres = User.objects.in_bulk([conv.autre_id for conv in conversations if conv.autre_id])
+    for conv in conversations:
+        conv.autre = autres.get(conv.autre_id)
     
-    # Total messages non lus
-    total_non_lus = Message.objects.filter(
-        conversation__participants=request.user,
-        is_read=False
-    ).exclude(sender=request.user).count()
+    # Total messages non lus (compteur en cache, voir tutorat.notifications)
+    total_non_lus, _ = notifications.compteurs(request.user)
     
     context = {
         'conversations': conversations,
@@ -1023,17 +1481,12 @@ def messagerie_liste(request):
 @never_cache
 def messagerie_conversation_detail(request, pk):
     """
-    Affiche une conversation spécifique avec tous ses messages
+    Affiche une conversation : les derniers messages (page par curseur sur
+    (created_at, id)), l'historique plus ancien étant chargé à la demande
     """
     conversation = get_object_or_404(Conversation, pk=pk, participants=request.user)
     autre_user = conversation.other_participant(request.user)
     
-    # Récupérer tous les messages
-    messages_list = conversation.messages.all().order_by('created_at')
-    
-    # Marquer comme lus les messages reçus
-    conversation.messages.filter(is_read=False).exclude(sender=request.user).update(is_read=True)
-    
     # Envoyer un nouveau message
     if request.method == 'POST':
         contenu = request.POST.get('content')
@@ -1046,15 +1499,148 @@ def messagerie_conversation_detail(request, pk):
             messages.success(request, 'Message envoyé !')
             return redirect('messagerie_conversation_detail', pk=pk)
     
+    # Derniers messages (ordre chronologique pour l'affichage)
+    page = _page_messages(conversation)
+    messages_list = page.elements[::-1]
+    
+    # Avancer le pointeur de lecture jusqu'au dernier message affiché
+    if messages_list:
+        if LectureConversation.marquer_lu(request.user, conversation, messages_list[-1]):
+            notifications.invalider_messages(request.user.pk)
+            diffusion.resynchroniser(request.user.pk)
+    
     context = {
         'conversation': conversation,
         'autre_user': autre_user,
-        'messages_list': messages_list
+        'messages_list': messages_list,
+        'curseur_historique': page.curseur_suivant,
     }
     
     return render(request, 'tutorat/messagerie_conversation_detail.html', context)
 
 
+@login_required
+@never_cache
+def messagerie_historique(request, pk):
+    """
+    Messages plus anciens d'une conversation en fragment HTML (JSON),
+    à partir du curseur ?curseur= (le plus ancien message affiché)
+    """
+    conversation = get_object_or_404(Conversation, pk=pk, participants=request.user)
+    try:
+        page = _page_messages(conversation, request.GET.get('curseur'))
+    except CurseurInvalide as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    html = render_to_string(
+        'tutorat/messagerie_messages.html',
+        {'messages_list': page.elements[::-1]},
+        request=request
+    )
+    return JsonResponse({'html': html, 'curseur_suivant': page.curseur_suivant})
+
+def _page_messages(conversation, curseur=None):
+    """Page de messages du plus récent au plus ancien, à partir du curseur"""
+    return paginer(
+        conversation.messages.select_related('sender'),
+        ORDRE_MESSAGES,
+        curseur,
+        MESSAGES_PAR_PAGE
+    )
+
+
+@login_required
+@require_POST
+def messagerie_envoyer(request, pk):
+    """
+    Envoi d'un message sans rechargement : retourne le message en fragment
+    HTML (JSON) ; les autres pages ouvertes le reçoivent par flux_conversation
+    """
+    conversation = get_object_or_404(Conversation, pk=pk, participants=request.user)
+    contenu = request.POST.get('content', '').strip()
+    if not contenu:
+        return JsonResponse({'error': 'Le message est vide.'}, status=400)
+    
+    message = Message.objects.create(
+        conversation=conversation,
+        sender=request.user,
+        content=contenu
+    )
+    html = render_to_string(
+        'tutorat/messagerie_messages.html',
+        {'messages_list': [message]},
+        request=request
+    )
+    return JsonResponse({'id': message.pk, 'html': html})
+
+def _messages_depuis(utilisateur, conversation_id, depuis):
+    """
+    Messages postés après l'identifiant `depuis`, en fragment HTML, et
+    identifiant du dernier ; la conversation étant affichée, le pointeur de
+    lecture avance jusqu'à lui. None si aucun nouveau message.
+    """
+    nouveaux = list(
+        Message.objects.filter(conversation_id=conversation_id, pk__gt=depuis)
+        .select_related('sender').order_by('pk')[:MESSAGES_PAR_PAGE]
+    )
+    if not nouveaux:
+        return None
+    dernier = nouveaux[-1]
+    if LectureConversation.marquer_lu(utilisateur, conversation_id, dernier):
+        notifications.invalider_messages(utilisateur.pk)
+        diffusion.resynchroniser(utilisateur.pk)
+    html = render_to_string(
+        'tutorat/messagerie_messages.html',
+        {'messages_list': nouveaux, 'user': utilisateur}
+    )
+    return html, dernier.pk
+
+async def _flux_messages(utilisateur, conversation_id, depuis):
+    """
+    Flux SSE des nouveaux messages d'une conversation : chaque événement
+    porte l'identifiant du dernier message transmis, que le navigateur
+    renvoie (Last-Event-ID) en cas de reconnexion
+    """
+    abonnement = diffusion.get_diffuseur().abonner([diffusion.canal_conversation(conversation_id)])
+    lire = sync_to_async(_messages_depuis)
+    try:
+        # Abonné avant la lecture : aucun message ne se perd entre les deux
+        while True:
+            # Par pages : un client en retard rattrape sans tout charger d'un coup
+            while (nouveaux := await lire(utilisateur, conversation_id, depuis)) is not None:
+                html, depuis = nouveaux
+                yield f'id: {depuis}\n' + _evenement_sse('messages', {'html': html})
+            # Tout événement du canal (nouveau message, resynchronisation) relance la lecture
+            while await abonnement.recevoir(FLUX_PING_SECONDES) is None:
+                yield ': ping\n\n'
+    finally:
+        abonnement.fermer()
+
+@login_required
+@never_cache
+async def flux_conversation(request, pk):
+    """
+    Flux Server-Sent Events des messages d'une conversation ouverte (servi
+    en ASGI), à partir de ?depuis= (dernier message affiché). Sous WSGI,
+    204 : les nouveaux messages n'apparaissent qu'au rechargement.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    utilisateur = await request.auser()
+    participe = await Conversation.objects.filter(pk=pk, participants=utilisateur).aexists()
+    if not participe:
+        raise Http404
+    depuis = request.headers.get('Last-Event-ID') or request.GET.get('depuis') or '0'
+    try:
+        depuis = int(depuis)
+    except ValueError:
+        return HttpResponse(status=400)
+    reponse = StreamingHttpResponse(_flux_messages(utilisateur, pk, depuis), content_type='text/event-stream')
+    # Pas de mise en tampon par un proxy (nginx)
+    reponse['X-Accel-Buffering'] = 'no'
+    return reponse
+
+
 @login_required
 @never_cache
 def messagerie_nouvelle(request):
@@ -1066,56 +1652,59 @@ def messagerie_nouvelle(request):
         contenu = request.POST.get('content')
         
         if destinataire_id and contenu:
-            destinataire = get_object_or_404(User, pk=destinataire_id)
+            # Mêmes règles que l'autocomplétion (rôle, pas soi-même)
+            destinataire = get_object_or_404(User.objects.destinataires(request.user), pk=destinataire_id)
             
-            # Vérifier si une conversation existe déjà entre ces 2 utilisateurs
-            conversation_existante = Conversation.objects.filter(
-                participants=request.user
-            ).filter(
-                participants=destinataire
-            ).first()
+            # Conversation existante entre ces 2 utilisateurs, ou nouvelle
+            conversation, creee = Conversation.objects.obtenir_ou_creer(request.user, destinataire)
+            Message.objects.create(
+                conversation=conversation,
+                sender=request.user,
+                content=contenu
+            )
             
-            if conversation_existante:
-                # Utiliser la conversation existante
-                Message.objects.create(
-                    conversation=conversation_existante,
-                    sender=request.user,
-                    content=contenu
-                )
-                messages.success(request, 'Message envoyé !')
-                return redirect('messagerie_conversation_detail', pk=conversation_existante.pk)
-            else:
-                # Créer une nouvelle conversation
-                nouvelle_conv = Conversation.objects.create()
-                nouvelle_conv.participants.add(request.user, destinataire)
-                
-                # Créer le premier message
-                Message.objects.create(
-                    conversation=nouvelle_conv,
-                    sender=request.user,
-                    content=contenu
-                )
-                
+            if creee:
                 messages.success(request, 'Conversation créée et message envoyé !')
-                return redirect('messagerie_conversation_detail', pk=nouvelle_conv.pk)
-    
-    # Filtrer les utilisateurs selon le rôle
-    if request.user.is_etudiant():
-        # Les étudiants ne peuvent contacter que les tuteurs
-        utilisateurs = User.objects.filter(role='tuteur').order_by('first_name', 'last_name', 'username')
-    else:
-        # Admin et tuteurs peuvent contacter tout le monde (sauf eux-mêmes)
-        utilisateurs = User.objects.exclude(pk=request.user.pk).order_by('first_name', 'last_name', 'username')
+            else:
+                messages.success(request, 'Message envoyé !')
+            return redirect('messagerie_conversation_detail', pk=conversation.pk)
     
-    # Destinataire pré-sélectionné ?
+    # Destinataire pré-sélectionné ? (les autres sont proposés par
+    # l'autocomplétion, voir messagerie_destinataires)
     destinataire_preselectionne = None
-    if 'destinataire' in request.GET:
-        destinataire_id = request.GET.get('destinataire')
-        destinataire_preselectionne = User.objects.filter(pk=destinataire_id).first()
+    destinataire_id = request.GET.get('destinataire', '')
+    if destinataire_id.isdigit():
+        destinataire_preselectionne = User.objects.destinataires(request.user).filter(pk=destinataire_id).first()
     
     context = {
-        'utilisateurs': utilisateurs,
-        'destinataire_preselectionne': destinataire_preselectionne
+        'destinataire_preselectionne': destinataire_preselectionne,
+        'longueur_min': DESTINATAIRES_LONGUEUR_MIN,
     }
     
-    return render(request, 'tutorat/messagerie_nouvelle.html', context)
\ No newline at end of file
+    return render(request, 'tutorat/messagerie_nouvelle.html', context)
+
+
+@login_required
+@cache_control(private=True, max_age=60)
+def messagerie_destinataires(request):
+    """
+    Autocomplétion des destinataires (JSON) : les utilisateurs contactables
+    dont le nom d'utilisateur, le prénom ou le nom commence par ?q=
+    (au moins DESTINATAIRES_LONGUEUR_MIN caractères)
+    """
+    recherche = request.GET.get('q', '').strip()
+    if len(recherche) < DESTINATAIRES_LONGUEUR_MIN:
+        return JsonResponse({'resultats': []})
+    
+    utilisateurs = User.objects.destinataires(request.user).prefixe(recherche).only(
+        'username', 'first_name', 'last_name', 'role'
+    ).order_by('last_name', 'first_name', 'username')[:DESTINATAIRES_LIMITE]
+    
+    return JsonResponse({'resultats': [
+        {
+            'id': utilisateur.pk,
+            'nom': utilisateur.get_full_name() or utilisateur.username,
+            'role': utilisateur.get_role_display(),
+        }
+        for utilisateur in utilisateurs
+    ]})
\ No newline at end of file